@@ -188,6 +188,123 @@ const configSchema = {
                                         'Whether to use an RDS Proxy for the vector store connection.',
                                     type: 'boolean',
                                 },
+                                rdsDriver: {
+                                    description:
+                                        'Python driver of the database connections; psycopg transfers vectors in the binary format.',
+                                    type: 'string',
+                                    enum: ['pg8000', 'psycopg'],
+                                    default: 'pg8000',
+                                },
+                                indexConfig: {
+                                    description:
+                                        'Approximate nearest neighbor index built for each collection of the vector store.',
+                                    type: 'object',
+                                    properties: {
+                                        indexType: {
+                                            description: 'Type of the pgvector index',
+                                            type: 'string',
+                                            enum: ['hnsw', 'ivfflat'],
+                                        },
+                                        m: {
+                                            description:
+                                                'HNSW: maximum number of connections per layer',
+                                            type: 'integer',
+                                            default: 16,
+                                        },
+                                        efConstruction: {
+                                            description:
+                                                'HNSW: size of the dynamic candidate list used to build the graph',
+                                            type: 'integer',
+                                            default: 64,
+                                        },
+                                        lists: {
+                                            description: 'IVFFlat: number of inverted lists',
+                                            type: 'integer',
+                                            default: 100,
+                                        },
+                                        efSearch: {
+                                            description:
+                                                'HNSW: size of the dynamic candidate list used at query time',
+                                            type: 'integer',
+                                        },
+                                        probes: {
+                                            description:
+                                                'IVFFlat: number of lists probed at query time',
+                                            type: 'integer',
+                                        },
+                                        quantization: {
+                                            description:
+                                                'Index a quantized copy of the embeddings and re-rank the candidates on the full precision embeddings',
+                                            type: 'string',
+                                            enum: ['halfvec', 'binary'],
+                                        },
+                                        rerankFactor: {
+                                            description:
+                                                'Quantization: number of candidates re-ranked per requested document',
+                                            type: 'integer',
+                                            default: 4,
+                                        },
+                                    },
+                                    required: ['indexType'],
+                                },
+                                hybridSearchConfig: {
+                                    description:
+                                        'Hybrid retrieval fusing full-text and vector search with reciprocal rank fusion.',
+                                    type: 'object',
+                                    properties: {
+                                        vectorWeight: {
+                                            description: 'Weight of the vector search ranking',
+                                            type: 'number',
+                                            default: 1.0,
+                                        },
+                                        textWeight: {
+                                            description: 'Weight of the full-text search ranking',
+                                            type: 'number',
+                                            default: 1.0,
+                                        },
+                                        rrfK: {
+                                            description: 'Rank constant of the reciprocal rank fusion',
+                                            type: 'integer',
+                                            default: 60,
+                                        },
+                                        fetchK: {
+                                            description:
+                                                'Number of candidates retrieved by each search before fusion',
+                                            type: 'integer',
+                                            default: 50,
+                                        },
+                                    },
+                                },
+                                retrievalCacheConfig: {
+                                    description:
+                                        'Cache of vector search results, invalidated by each ingestion.',
+                                    type: 'object',
+                                    properties: {
+                                        maxEntries: {
+                                            description:
+                                                'Maximum number of results cached in memory by each Lambda container',
+                                            type: 'integer',
+                                            default: 256,
+                                        },
+                                        ttlSeconds: {
+                                            description: 'Lifetime of a cached result, in seconds',
+                                            type: 'integer',
+                                            default: 3600,
+                                        },
+                                        generationTtlSeconds: {
+                                            description:
+                                                'Seconds during which the generation of a collection is reused before being read again',
+                                            type: 'integer',
+                                            default: 30,
+                                        },
+                                        sharedCache: {
+                                            description:
+                                                'Share cached results between Lambda containers through a DynamoDB table',
+                                            type: 'boolean',
+                                            default: false,
+                                        },
+                                    },
+                                },
                             },
                         },
                     },
@@ -240,6 +357,24 @@ const configSchema = {
                         required: ['provider', 'modelId', 'modelRefKey', 'dimensions'],
                     },
                 },
+                embeddingCacheConfig: {
+                    description:
+                        'Cache of embeddings keyed by model and text content, shared by the ingestion pipeline and the corpus API.',
+                    type: 'object',
+                    properties: {
+                        maxEntries: {
+                            description:
+                                'Maximum number of embeddings cached in memory by each Lambda container',
+                            type: 'integer',
+                            default: 4096,
+                        },
+                        ttlDays: {
+                            description: 'Days after which a cached embedding expires',
+                            type: 'integer',
+                            default: 30,
+                        },
+                    },
+                },
             },
             required: ['vectorStoreConfig', 'embeddingsModels'],
         },
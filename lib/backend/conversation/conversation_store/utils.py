@@ -3,7 +3,7 @@
 import os
 
 from francis_toolkit.clients import dynamodb_resource_client
-from francis_toolkit.utils import get_rds_connection_string, load_config_from_dynamodb
+from francis_toolkit.utils import get_rds_engine, load_config_from_dynamodb
 
 from .base import BaseChatHistoryStore
 from .dynamodb_store import DynamoDBChatHistoryStore
@@ -22,7 +22,7 @@ def get_chat_history_store() -> BaseChatHistoryStore:
 
         chat_history_config = system_config.get("chatHistoryConfig", {})
         if chat_history_config.get("storeType") == "aurora_postgres":
-            _chat_history_store = PostgresChatHistoryStore(connection=get_rds_connection_string())
+            _chat_history_store = PostgresChatHistoryStore(connection=get_rds_engine())
         else:
             _chat_history_store = DynamoDBChatHistoryStore(dynamodb_resource_client, table_name=table_name, index_name=index_name)
     return _chat_history_store
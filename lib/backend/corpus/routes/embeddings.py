@@ -7,6 +7,7 @@ from francis_toolkit.types import (
     EmbedDocumentsResponse,
     EmbedQueryRequest,
     EmbedQueryResponse,
+    encode_embeddings,
 )
 from francis_toolkit.utils import find_embedding_model_by_ref_key, get_embeddings
 
@@ -28,7 +29,9 @@ def embed_query() -> dict:
 
     query_embedding = embeddings.embed_query(request.text)
 
-    return EmbedQueryResponse(embedding=query_embedding, model=embedding_model.modelId).dict()  # type: ignore
+    return EmbedQueryResponse(
+        embedding=encode_embeddings(query_embedding, request.encodingFormat), model=embedding_model.modelId
+    ).dict()  # type: ignore
 
 
 @router.post("/corpus/embedding/embed-documents")
@@ -42,4 +45,6 @@ def embed_documents() -> dict:
     embeddings = get_embeddings(embedding_model)
     document_embeddings = embeddings.embed_documents(request.texts)
 
-    return EmbedDocumentsResponse(embeddings=document_embeddings, model=embedding_model.modelId).dict()  # type: ignore
+    return EmbedDocumentsResponse(
+        embeddings=encode_embeddings(document_embeddings, request.encodingFormat), model=embedding_model.modelId
+    ).dict()  # type: ignore
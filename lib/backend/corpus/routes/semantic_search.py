@@ -1,10 +1,10 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.event_handler.api_gateway import Router
-from francis_toolkit.utils import get_retriever
+from francis_toolkit.utils import batch_similarity_search, get_retriever
 from pydantic import BaseModel
 
 tracer = Tracer()
@@ -14,12 +14,17 @@ logger = Logger()
 
 class SimilaritySearchRequest(BaseModel):
     modelRefKey: str
-    question: str
+    question: Optional[str] = None
+    questions: Optional[List[str]] = None
     limit: Optional[int] = None
     threshold: Optional[float] = None
     filter: Optional[dict] = None
 
 
+def _format_documents(response: list) -> list:
+    return [{"pageContent": doc.page_content, "metadata": doc.metadata} for doc in response]
+
+
 @router.post("/corpus/search")
 @tracer.capture_method(capture_response=False)
 def similarity_search_handler() -> Dict:
@@ -33,15 +38,23 @@ def similarity_search_handler() -> Dict:
     if request.threshold:
         kw_params["score_threshold"] = float(request.threshold)
 
+    if request.questions is not None:
+        batch_response = batch_similarity_search(request.modelRefKey, request.questions, **kw_params)
+
+        return {
+            "data": {
+                "results": [{"documents": _format_documents(response)} for response in batch_response],
+            }
+        }
+
+    if not request.question:
+        raise ValueError("InvalidPayload: either question or questions is required.")
+
     retriever = get_retriever(request.modelRefKey, **kw_params)
     response = retriever.invoke(request.question)
 
-    documents = []
-    for doc in response:
-        documents.append({"pageContent": doc.page_content, "metadata": doc.metadata})
-
     return {
         "data": {
-            "documents": documents,
+            "documents": _format_documents(response),
         }
     }
@@ -7,22 +7,28 @@ from typing import Any, List, Optional
 import requests
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from francis_toolkit.types import EmbeddingModel
+from francis_toolkit.types import EmbeddingModel, VectorIndexConfig
 from francis_toolkit.utils import get_vector_store
 
 tracer = Tracer()
 logger = Logger()
 
 
-def setup_pgvector(embedding_models: List) -> None:
+def setup_pgvector(embedding_models: List, index_config: Optional[dict] = None) -> None:
     logger.info("Setting up PG vector extension and tables")
 
-    vector_store = get_vector_store(EmbeddingModel(**embedding_models[0]))
+    vector_store = get_vector_store(
+        EmbeddingModel(**embedding_models[0]),
+        index_config=VectorIndexConfig(**index_config) if index_config else None,
+    )
 
     vector_store.create_vector_extension()
     vector_store.create_tables_if_not_exists()
     vector_store.create_collection()
 
+    if index_config:
+        vector_store.create_index()
+
 
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler()
@@ -30,14 +36,15 @@ def handler(event: dict, context: LambdaContext) -> None:
     request_type = event["RequestType"]
     resource_properties = event["ResourceProperties"]
     embedding_models = json.loads(resource_properties["embeddingModels"])
+    index_config = json.loads(resource_properties.get("indexConfig") or "null")
 
     try:
         if request_type == "Create":
             physical_resource_id = str(uuid.uuid4())
-            setup_pgvector(embedding_models)
+            setup_pgvector(embedding_models, index_config)
         elif request_type == "Update":
             physical_resource_id = event["PhysicalResourceId"]
-            setup_pgvector(embedding_models)
+            setup_pgvector(embedding_models, index_config)
         elif request_type == "Delete":
             physical_resource_id = event["PhysicalResourceId"]
             logger.info("No action required for delete request")
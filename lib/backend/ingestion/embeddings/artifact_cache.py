@@ -0,0 +1,43 @@
+import gzip
+import json
+from typing import Any, Optional
+
+from botocore.exceptions import ClientError
+
+ARTIFACT_PREFIX = "derived-artifacts"
+
+
+def get_etag(s3, bucket_name: str, file_key: str) -> str:
+    """Return the ETag of an object, which changes with its content."""
+    return s3.head_object(Bucket=bucket_name, Key=file_key)["ETag"].strip('"')
+
+
+def artifact_key(file_key: str, etag: str, stage: str, version: str) -> str:
+    """Key of the artifact of a processing stage, for a version of the source object and of the stage."""
+    return f"{ARTIFACT_PREFIX}/{file_key}/{etag}/{stage}-v{version}.json.gz"
+
+
+def load_artifact(s3, bucket_name: str, key: str) -> Optional[Any]:
+    """Return a stored artifact, or None if it does not exist or cannot be read."""
+    try:
+        response = s3.get_object(Bucket=bucket_name, Key=key)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return None
+        raise
+
+    try:
+        return json.loads(gzip.decompress(response["Body"].read()))
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable artifact {key}: {e}")
+        return None
+
+
+def save_artifact(s3, bucket_name: str, key: str, artifact: Any) -> None:
+    """Store an artifact as compressed JSON."""
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=key,
+        Body=gzip.compress(json.dumps(artifact).encode("utf-8")),
+        ContentType="application/gzip",
+    )
@@ -0,0 +1,190 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Streaming ingestion of CSV files, in batches of rows whose progress is checkpointed in the cache table."""
+
+import csv
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+import boto3
+from langchain.docstore.document import Document
+
+# Number of documents embedded and inserted together
+CSV_BATCH_SIZE = int(os.getenv("CSV_BATCH_SIZE", 500))
+# Size of the reads of the S3 object
+S3_READ_CHUNK_SIZE = 1024 * 1024
+UTF8_BOM = b"\xef\xbb\xbf"
+# Sort key of the checkpoint item, next to the metadata item of the file in the cache table
+CHECKPOINT_SK = "csv_checkpoint"
+
+
+class IngestionIncompleteError(Exception):
+    """Raised when the Lambda stops before its timeout, to be invoked again and resume from the checkpoint."""
+
+
+@dataclass
+class CsvCheckpoint:
+    """Progress of the ingestion of a version of a CSV file.
+
+    `offset` is the position in the object of the first row not ingested yet, and
+    `documents` the number of documents ingested, which numbers the next ones.
+    """
+
+    etag: str
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    offset: int = 0
+    documents: int = 0
+    fieldnames: Optional[List[str]] = None
+
+    def document_id(self, file_uri: str, index: int) -> str:
+        """Id of a document, the same when a batch is inserted again after a timeout."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_uri}#{self.run_id}#{index}"))
+
+
+@dataclass
+class CsvBatch:
+    """Documents of consecutive rows, with the position of the row following them."""
+
+    documents: List[Document]
+    offset: int
+
+
+def _cache_table():
+    return boto3.resource("dynamodb").Table(os.getenv("CACHE_TABLE_NAME"))
+
+
+def load_checkpoint(file_uri: str, etag: str) -> Optional[CsvCheckpoint]:
+    """Return the checkpoint of the ingestion of the current version of a file, if any."""
+    item = _cache_table().get_item(Key={"PK": f"source_location#{file_uri}", "SK": CHECKPOINT_SK}).get("Item")
+    if not item or item.get("ETag") != etag:
+        return None
+
+    return CsvCheckpoint(
+        etag=etag,
+        run_id=item["RunId"],
+        offset=int(item["ByteOffset"]),
+        documents=int(item["DocumentsIngested"]),
+        fieldnames=item.get("Fieldnames"),
+    )
+
+
+def save_checkpoint(file_uri: str, checkpoint: CsvCheckpoint) -> None:
+    _cache_table().put_item(
+        Item={
+            "PK": f"source_location#{file_uri}",
+            "SK": CHECKPOINT_SK,
+            "ETag": checkpoint.etag,
+            "RunId": checkpoint.run_id,
+            "ByteOffset": checkpoint.offset,
+            "DocumentsIngested": checkpoint.documents,
+            "Fieldnames": checkpoint.fieldnames,
+            "UpdatedAt": int(time.time()),
+        }
+    )
+
+
+def delete_checkpoint(file_uri: str) -> None:
+    _cache_table().delete_item(Key={"PK": f"source_location#{file_uri}", "SK": CHECKPOINT_SK})
+
+
+class S3LineStream:
+    """Lines of an S3 object read incrementally from an offset, tracking the position of the next line.
+
+    A CSV reader pulls lines one at a time, so after it returns a row `offset` is
+    the position of the next row, where a later read can resume.
+    """
+
+    def __init__(self, body, offset: int = 0) -> None:
+        self.body = body
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[str]:
+        pending = b""
+        for chunk in self.body.iter_chunks(S3_READ_CHUNK_SIZE):
+            if self.offset == 0 and chunk.startswith(UTF8_BOM):
+                # The byte order mark is not part of the first field name
+                chunk = chunk[len(UTF8_BOM) :]
+                self.offset = len(UTF8_BOM)
+            # A newline byte is never part of a multi-byte UTF-8 character, so lines are split before decoding
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                self.offset += len(line) + 1
+                yield line.decode("utf-8") + "\n"
+        if pending:
+            self.offset += len(pending)
+            yield pending.decode("utf-8")
+
+
+def row_text(row: dict) -> str:
+    return "\n".join([f"{key}: {value}" for key, value in row.items()])
+
+
+def iter_csv_batches(
+    bucket_name: str,
+    object_key: str,
+    checkpoint: CsvCheckpoint,
+    batch_size: int = CSV_BATCH_SIZE,
+    concat_rows: bool = False,
+    max_document_chars: int = 1000,
+) -> Iterator[CsvBatch]:
+    """Stream the rows of a CSV object from a checkpoint and yield their documents in batches.
+
+    Only the rows of the current batch are held in memory. The header read from
+    the start of the object is stored in `checkpoint.fieldnames`, for the reads
+    resuming after it.
+
+    Args:
+    ----
+        bucket_name: Bucket of the CSV object.
+        object_key: Key of the CSV object.
+        checkpoint: Position and header of the first row to read, the object is read
+            only if its ETag is still that of the checkpoint.
+        batch_size: Number of documents of each batch.
+        concat_rows: Whether consecutive rows are concatenated in documents of up to
+            `max_document_chars` characters, instead of a document per row.
+        max_document_chars: Maximum number of characters of concatenated rows.
+    """
+    s3_client = boto3.client("s3")
+    if_match = f'"{checkpoint.etag}"'
+    size = s3_client.head_object(Bucket=bucket_name, Key=object_key, IfMatch=if_match)["ContentLength"]
+    if checkpoint.offset >= size:
+        return
+
+    response = s3_client.get_object(Bucket=bucket_name, Key=object_key, Range=f"bytes={checkpoint.offset}-", IfMatch=if_match)
+    lines = S3LineStream(response["Body"], checkpoint.offset)
+    reader = csv.DictReader(lines, fieldnames=checkpoint.fieldnames)
+
+    documents: List[Document] = []
+    concatenated: List[str] = []
+    concatenated_chars = 0
+    # Position of the current row, where a batch of concatenated rows ends when the row starts a new document
+    row_offset = checkpoint.offset
+    for row in reader:
+        checkpoint.fieldnames = reader.fieldnames
+        text = row_text(row)
+        if not concat_rows:
+            documents.append(Document(page_content=text))
+            if len(documents) >= batch_size:
+                yield CsvBatch(documents=documents, offset=lines.offset)
+                documents = []
+        else:
+            if concatenated and concatenated_chars + len(text) > max_document_chars:
+                documents.append(Document(page_content="\n".join(concatenated)))
+                concatenated = []
+                concatenated_chars = 0
+                if len(documents) >= batch_size:
+                    # The current row is read again on resume
+                    yield CsvBatch(documents=documents, offset=row_offset)
+                    documents = []
+            concatenated.append(text)
+            concatenated_chars += len(text) + 1
+        row_offset = lines.offset
+
+    if concatenated:
+        documents.append(Document(page_content="\n".join(concatenated)))
+    if documents:
+        yield CsvBatch(documents=documents, offset=lines.offset)
@@ -1,7 +1,5 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-import csv
-import io
 import json
 import os
 import time
@@ -9,6 +7,7 @@ from typing import List, Optional
 
 import boto3
 from aws_lambda_powertools import Logger, Metrics, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from botocore.exceptions import ClientError
 from francis_toolkit.utils import find_embedding_model_by_ref_key, get_vector_store
@@ -16,7 +15,16 @@ from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from process_pdf import create_documents_from_pdf
 from pydantic import BaseModel
+from artifact_cache import get_etag
 from aws_utils import retrieve_source_url_metadata
+from csv_ingestion import (
+    CsvCheckpoint,
+    IngestionIncompleteError,
+    delete_checkpoint,
+    iter_csv_batches,
+    load_checkpoint,
+    save_checkpoint,
+)
 
 logger = Logger()
 tracer = Tracer()
@@ -26,6 +34,9 @@ metrics = Metrics(namespace=os.getenv("METRICS_NAMESPACE"))
 CHUNK_SIZE_DOC_SPLIT = int(os.getenv("CHUNK_SIZE_DOC_SPLIT", 1000))
 OVERLAP_FOR_DOC_SPLIT = int(os.getenv("OVERLAP_FOR_DOC_SPLIT", 200))
 CONCAT_CSV_ROWS = os.getenv("CONCAT_CSV_ROWS", "false").lower() == "true"
+BULK_LOAD_BATCH_SIZE = int(os.getenv("BULK_LOAD_BATCH_SIZE", 500))
+# Time left before the Lambda timeout under which no new CSV batch is started
+CSV_TIME_MARGIN_SECONDS = int(os.getenv("CSV_TIME_MARGIN_SECONDS", 60))
 
 
 class FileEmbeddingsRequest(BaseModel):
@@ -84,22 +95,64 @@ def process_text_embeddings(content: str) -> List[Document]:
     return [Document(page_content=document_content)]
     
 
-def process_csv_embeddings(content: str) -> List[Document]:
-    csv_stream = io.StringIO(content)
+def process_csv_embeddings(vector_store, file_uri: str, context: LambdaContext) -> int:
+    """Embed and insert the rows of a CSV file batch by batch, streaming the file from S3.
 
-    # Create a CSV reader object from the BytesIO object
-    csv_reader = csv.DictReader(csv_stream)
-    text_list = []
+    The progress is checkpointed in the cache table after each batch. When the time
+    left is too short for another batch, IngestionIncompleteError is raised for the
+    step function to invoke the Lambda again, which resumes from the checkpoint.
 
-    for row in csv_reader:
-        text_list.append("\n".join([f"{key}: {value}" for key, value in row.items()]))
+    :return: The number of documents of the file
+    """
+    bucket_name, object_key = file_uri.replace("s3://", "").split("/", 1)
+    etag = get_etag(boto3.client("s3"), bucket_name, object_key)
 
-    if CONCAT_CSV_ROWS:
-        documents = [Document(page_content="\n".join(text_list))]
+    checkpoint = load_checkpoint(file_uri, etag)
+    if checkpoint is not None:
+        logger.info(f"Resuming {file_uri} at byte {checkpoint.offset} after {checkpoint.documents} documents")
     else:
-        documents = [Document(page_content=text) for text in text_list]
+        checkpoint = CsvCheckpoint(etag=etag)
+
+    longest_batch_seconds = 0.0
+    batches = iter_csv_batches(
+        bucket_name, object_key, checkpoint, concat_rows=CONCAT_CSV_ROWS, max_document_chars=CHUNK_SIZE_DOC_SPLIT
+    )
+    for batch in batches:
+        start_time = time.perf_counter()
+        ids = [checkpoint.document_id(file_uri, checkpoint.documents + i) for i in range(len(batch.documents))]
+        # Only the first batch replaces the embeddings of the previous version of the file
+        vector_store.add_documents(
+            documents=batch.documents, ids=ids, document_source_uri=file_uri, deactivate_source=checkpoint.documents == 0
+        )
+
+        checkpoint.offset = batch.offset
+        checkpoint.documents += len(batch.documents)
+        save_checkpoint(file_uri, checkpoint)
+
+        longest_batch_seconds = max(longest_batch_seconds, time.perf_counter() - start_time)
+        logger.info(f"Ingested {checkpoint.documents} documents of {file_uri} up to byte {checkpoint.offset}")
+        if context.get_remaining_time_in_millis() < (CSV_TIME_MARGIN_SECONDS + longest_batch_seconds) * 1000:
+            raise IngestionIncompleteError(f"Stopped {file_uri} at byte {checkpoint.offset}, to be resumed")
+
+    delete_checkpoint(file_uri)
+    return checkpoint.documents
+
 
-    return documents
+def log_embedding_stats(vector_store) -> None:
+    cache_stats = getattr(vector_store.embeddings, "cache_stats", None)
+    if cache_stats is not None:
+        logger.info(f"Embedding cache: {cache_stats.hits} hits, {cache_stats.misses} misses")
+        metrics.add_metric(name="EmbeddingCacheHits", unit=MetricUnit.Count, value=cache_stats.hits)
+        metrics.add_metric(name="EmbeddingCacheMisses", unit=MetricUnit.Count, value=cache_stats.misses)
+
+    executor_stats = getattr(vector_store.embeddings, "executor_stats", None)
+    if executor_stats is not None and executor_stats.items:
+        logger.info(
+            f"Embedded {executor_stats.items} chunks in {executor_stats.calls} calls at {executor_stats.throughput:.1f}/s "
+            f"with {executor_stats.throttles} throttles"
+        )
+        metrics.add_metric(name="EmbeddingThroughput", unit=MetricUnit.CountPerSecond, value=executor_stats.throughput)
+        metrics.add_metric(name="EmbeddingThrottles", unit=MetricUnit.Count, value=executor_stats.throttles)
 
 
 def update_ingested_time(file_uri: str) -> bool:
@@ -147,7 +200,6 @@ def handler(event: dict, context: LambdaContext) -> dict:
         raise ValueError(f"Embedding model {request.model_ref_key} not found")
 
     bucket_name, object_key = file_uri.replace("s3://", "").split("/", 1)
-    raw_content = read_from_s3(bucket_name, object_key)
 
     documents = []
     metadata = load_metadata(bucket_name, object_key)
@@ -163,7 +215,7 @@ def handler(event: dict, context: LambdaContext) -> dict:
         documents = create_documents_from_pdf(file_uri, content_type, source_url)
 
     elif content_type == "text/plain":
-        content_str = raw_content.decode("utf-8")
+        content_str = read_from_s3(bucket_name, object_key).decode("utf-8")
         
         # Check if content is empty
         if not content_str or not content_str.strip():
@@ -188,7 +240,18 @@ def handler(event: dict, context: LambdaContext) -> dict:
             return {"FileURI": file_uri, "EmbeddingsGenerated": 0}
 
     elif content_type in ["text/csv", "application/csv"]:
-        documents = process_csv_embeddings(raw_content.decode("utf-8"))
+        # Rows are embedded and inserted batch by batch as the file is read
+        vector_store = get_vector_store(embedding_model, bulk_load_batch_size=BULK_LOAD_BATCH_SIZE)
+        embeddings_generated = process_csv_embeddings(vector_store, file_uri, context)
+        if not embeddings_generated:
+            logger.warning(f"No valid documents to embed for {file_uri}")
+            update_ingested_time(file_uri)
+            return {"FileURI": file_uri, "EmbeddingsGenerated": 0}
+
+        log_embedding_stats(vector_store)
+        vector_store.bump_generation()
+        update_ingested_time(file_uri)
+        return {"FileURI": file_uri, "EmbeddingsGenerated": embeddings_generated}
 
     else:
         # This shouldn't occur since unsupported types are filtered out in the ingestion pipeline.
@@ -199,7 +262,7 @@ def handler(event: dict, context: LambdaContext) -> dict:
         return {"FileURI": file_uri, "EmbeddingsGenerated": 0}
 
     # don't create tables in the ingesiton pipeline as it may lead to race condition due to Map iterations
-    vector_store = get_vector_store(embedding_model)
+    vector_store = get_vector_store(embedding_model, bulk_load_batch_size=BULK_LOAD_BATCH_SIZE)
     # Takes in Document, and adds embeddings to store
 
     # Validate no empty documents
@@ -219,6 +282,10 @@ def handler(event: dict, context: LambdaContext) -> dict:
         return {"FileURI": file_uri, "EmbeddingsGenerated": 0}
     embeddings = vector_store.add_documents(documents=documents, document_source_uri=file_uri)
 
+    log_embedding_stats(vector_store)
+    # Invalidate the retrieval results cached for the previous content of the collection
+    vector_store.bump_generation()
+
     update_ingested_time(file_uri)
 
     return {"FileURI": file_uri, "EmbeddingsGenerated": len(embeddings)}
\ No newline at end of file
@@ -0,0 +1,278 @@
+"""Extraction of the layout of born-digital PDF pages from their text layer, without Textract.
+
+The items of each page follow the markup of the Textract linearization in
+process_document (titles, section headers, lists and tables), so the chunker
+handles both the same way.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+import pdfplumber
+import pypdfium2 as pdfium
+from table_tools import TABLE_IMAGES, save_table_images_to_s3, table_layout_item, table_to_markdown
+
+# A page with fewer characters and any image is considered scanned
+MIN_PAGE_CHARS = 50
+# Maximum share of characters without Unicode mapping, extracted as "(cid:N)", of a usable text layer
+MAX_UNMAPPED_CHAR_RATIO = 0.05
+# Minimum font size of titles and section headers, relative to the body text
+TITLE_SIZE_RATIO = 1.6
+HEADER_SIZE_RATIO = 1.15
+# Maximum number of words of a title or section header line
+MAX_HEADING_WORDS = 15
+# Share of the page height of the top and bottom margins, holding running headers, footers and page numbers
+MARGIN_RATIO = 0.06
+# Minimum share of the pages a margin line appears on to be dropped as a running header or footer
+RUNNING_LINE_PAGE_RATIO = 0.3
+
+BULLET_PATTERN = re.compile(r"^(?:[•●○◦▪■‣∙·\-–*]|\(?\d{1,2}[.)]|\(?[a-zA-Z][.)])\s+")
+PAGE_NUMBER_PATTERN = re.compile(r"^(?:page\s+)?\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+DIGITS_PATTERN = re.compile(r"\d+")
+# Glyph without Unicode mapping, such as the bullets of symbol fonts
+UNMAPPED_GLYPH_PATTERN = re.compile(r"\(cid:\d+\)")
+BOLD_FONT_PATTERN = re.compile(r"bold|black|heavy|demi", re.IGNORECASE)
+
+
+class BoundingBox(NamedTuple):
+    """Bounding box as shares of the page size, like those of Textract."""
+
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class TextLine(NamedTuple):
+    """A line of text of a page, with the style used to find headings."""
+
+    text: str
+    top: float
+    x0: float
+    size: float
+    bold: bool
+    in_margin: bool
+
+
+class PageTable(NamedTuple):
+    """A table of a page, whose image is cropped from the page."""
+
+    top: float
+    index: int
+
+
+def has_text_layer(page) -> bool:
+    """Whether the text layer of a page can be used instead of analyzing its image."""
+    chars = page.chars
+    if len(chars) < MIN_PAGE_CHARS:
+        # A page without text nor images is blank, not scanned
+        return not page.images
+
+    unmapped = sum(1 for char in chars if char["text"].startswith("(cid:") or char["text"] == "\ufffd")
+    return unmapped / len(chars) <= MAX_UNMAPPED_CHAR_RATIO
+
+
+def _read_lines(page, table_bboxes) -> List[TextLine]:
+    def outside_tables(obj):
+        x = (obj["x0"] + obj["x1"]) / 2
+        y = (obj["top"] + obj["bottom"]) / 2
+        return not any(x0 <= x <= x1 and top <= y <= bottom for x0, top, x1, bottom in table_bboxes)
+
+    page_top = page.bbox[1]
+    lines = []
+    for line in page.filter(outside_tables).extract_text_lines(return_chars=True):
+        chars = [char for char in line["chars"] if char["text"].strip()]
+        # A line starting with an unmapped glyph is a list item, other unmapped glyphs are dropped
+        text = line["text"].strip()
+        leading_glyph = UNMAPPED_GLYPH_PATTERN.match(text)
+        if leading_glyph:
+            text = "•" + text[leading_glyph.end() :]
+        text = UNMAPPED_GLYPH_PATTERN.sub("", text).strip()
+        if not chars or not text:
+            continue
+        top = line["top"] - page_top
+        lines.append(
+            TextLine(
+                text=text,
+                top=top,
+                x0=line["x0"],
+                size=Counter(round(char["size"], 1) for char in chars).most_common(1)[0][0],
+                bold=sum(1 for char in chars if BOLD_FONT_PATTERN.search(char["fontname"])) * 2 > len(chars),
+                in_margin=top < page.height * MARGIN_RATIO or line["bottom"] - page_top > page.height * (1 - MARGIN_RATIO),
+            )
+        )
+    return lines
+
+
+def _heading_kind(line: TextLine, body_size: float) -> Optional[str]:
+    if len(line.text.split()) > MAX_HEADING_WORDS or BULLET_PATTERN.match(line.text):
+        return None
+    if line.size >= body_size * TITLE_SIZE_RATIO:
+        return "title"
+    if line.size >= body_size * HEADER_SIZE_RATIO or (line.bold and line.size >= body_size):
+        return "header"
+    return None
+
+
+def unmerge_table_rows(rows: List[List[Optional[str]]]) -> List[List[str]]:
+    """Fill the cells covered by a merged cell, None in pdfplumber tables, with its text.
+
+    A covered cell takes the text of the cell on its left, or above it in the first column.
+    """
+    filled: List[List[str]] = []
+    for row in rows:
+        cells: List[str] = []
+        for column, cell in enumerate(row):
+            if cell is None:
+                if column:
+                    cell = cells[-1]
+                else:
+                    cell = filled[-1][0] if filled and filled[-1] else ""
+            cells.append(cell)
+        filled.append(cells)
+    return filled
+
+
+def _page_items(entries, body_size: float, table_items: List[str]) -> List[str]:
+    """Items of a page in reading order, marked up like the Textract linearization."""
+    items: List[str] = []
+    # Kind and text of the title, header or list being built, whose lines are merged
+    pending_kind: Optional[str] = None
+    pending: List[str] = []
+    list_x0 = 0.0
+
+    def flush():
+        if pending_kind == "title":
+            items.append(f"<titles><<title>><title>{' '.join(pending)}</title><</title>>")
+        elif pending_kind == "header":
+            items.append(f"<headers><<header>><header>{' '.join(pending)}</header><</header>>")
+        elif pending_kind == "list":
+            list_text = "\n".join(pending)
+            items.append(f"<<list>><list>{list_text}</list><</list>>")
+        pending.clear()
+
+    for entry in entries:
+        if isinstance(entry, PageTable):
+            flush()
+            pending_kind = None
+            items.append(table_items[entry.index])
+            continue
+
+        kind = _heading_kind(entry, body_size)
+        if kind is None and BULLET_PATTERN.match(entry.text):
+            kind = "list"
+        elif kind is None and pending_kind == "list" and entry.x0 > list_x0 + 2:
+            # Continuation of the last list item, indented after its bullet
+            pending[-1] += " " + entry.text
+            continue
+
+        if kind != pending_kind:
+            flush()
+            pending_kind = kind
+        if kind == "list":
+            list_x0 = entry.x0
+
+        if kind is None:
+            items.append(entry.text)
+        else:
+            pending.append(entry.text)
+
+    flush()
+    return items
+
+
+def extract_local_layout(local_pdf_path: str, bucket_name: str) -> Dict[int, Optional[List[str]]]:
+    """Extract the items of each page of a PDF with a text layer.
+
+    Section headers and titles are found by their font size and weight relative
+    to the body text, tables and their cells with pdfplumber, and their images are
+    uploaded as for Textract tables if enabled. Running headers, footers and page
+    numbers are dropped.
+
+    Args:
+    ----
+        local_pdf_path: Path of the downloaded PDF.
+        bucket_name: Bucket the table images are uploaded to.
+
+    Returns:
+    -------
+        The items of each page by page index, None for the pages without a usable
+        text layer, which are left to Textract.
+    """
+    page_entries: Dict[int, Optional[list]] = {}
+    tables = []
+    table_markdowns: List[str] = []
+    size_counts: Counter = Counter()
+    margin_counts: Counter = Counter()
+
+    with pdfplumber.open(local_pdf_path) as pdf:
+        for index, page in enumerate(pdf.pages):
+            if not has_text_layer(page):
+                page_entries[index] = None
+                page.close()
+                continue
+
+            page_left, page_top = page.bbox[0], page.bbox[1]
+            page_tables = page.find_tables()
+            table_bboxes = [table.bbox for table in page_tables]
+            entries: list = []
+            for table, (x0, top, x1, bottom) in zip(page_tables, table_bboxes, strict=True):
+                entries.append(PageTable(top=top - page_top, index=len(tables)))
+                table_markdowns.append(table_to_markdown(unmerge_table_rows(table.extract())))
+                tables.append(
+                    (
+                        index + 1,
+                        BoundingBox(
+                            x=(x0 - page_left) / page.width,
+                            y=(top - page_top) / page.height,
+                            width=(x1 - x0) / page.width,
+                            height=(bottom - top) / page.height,
+                        ),
+                    )
+                )
+
+            for line in _read_lines(page, table_bboxes):
+                entries.append(line)
+                size_counts[line.size] += len(line.text)
+                if line.in_margin:
+                    margin_counts[DIGITS_PATTERN.sub("#", line.text)] += 1
+
+            entries.sort(key=lambda entry: entry.top)
+            page_entries[index] = entries
+            # Free the parsed objects of the page
+            page.close()
+
+    table_uris = save_table_images_to_s3(local_pdf_path, tables, bucket_name) if TABLE_IMAGES else [None] * len(tables)
+    table_items = [table_layout_item(markdown, uri) for markdown, uri in zip(table_markdowns, table_uris, strict=True)]
+
+    body_size = size_counts.most_common(1)[0][0] if size_counts else 0.0
+    running_lines = {text for text, count in margin_counts.items() if count >= max(2, RUNNING_LINE_PAGE_RATIO * len(page_entries))}
+
+    def is_page_furniture(entry) -> bool:
+        return (
+            isinstance(entry, TextLine)
+            and entry.in_margin
+            and (PAGE_NUMBER_PATTERN.match(entry.text) is not None or DIGITS_PATTERN.sub("#", entry.text) in running_lines)
+        )
+
+    return {
+        index: (
+            None
+            if entries is None
+            else _page_items([entry for entry in entries if not is_page_furniture(entry)], body_size, table_items)
+        )
+        for index, entries in page_entries.items()
+    }
+
+
+def write_pdf_pages(local_pdf_path: str, page_indexes: List[int], output_path: str) -> None:
+    """Write a PDF with some pages of another one."""
+    source = pdfium.PdfDocument(local_pdf_path)
+    output = pdfium.PdfDocument.new()
+    try:
+        output.import_pages(source, pages=page_indexes)
+        output.save(output_path)
+    finally:
+        output.close()
+        source.close()
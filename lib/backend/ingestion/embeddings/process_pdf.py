@@ -1,14 +1,21 @@
+import bisect
+import hashlib
 import os
 import re
 import json
 import boto3
 from botocore.config import Config
-from typing import List, Dict, Tuple, Optional, Union, Any
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Dict, Iterable, Iterator, NamedTuple, Tuple, Optional, Union, Any
 from textractor.data.text_linearization_config import TextLinearizationConfig
+from textractor.entities.document import Document as TextractDocument
 from urllib.parse import urlparse
 from langchain.docstore.document import Document
 from aws_utils import *
 from table_tools import *
+from artifact_cache import artifact_key, get_etag, load_artifact, save_artifact
+from local_extraction import extract_local_layout, write_pdf_pages
 from francis_toolkit.utils import get_vector_store, find_embedding_model_by_ref_key
 
 config = Config(
@@ -21,28 +28,58 @@ config = Config(
 bedrock_runtime = boto3.client(service_name='bedrock-runtime', config=config)
 s3 = boto3.client("s3")
 
+# Patterns of the markup added by the linearization, compiled once for all the lines of all the documents
+TAG_PATTERN = re.compile(r'<<[^>]+>>')
+LIST_SPLIT_PATTERN = re.compile("(<<list>><list>|</list><</list>>)")
+TABLE_PATTERN = re.compile(r'<table>(.*?)(</table>)', re.DOTALL)
+TABLE_IMAGE_PATTERN = re.compile(r'<image>(.*?)</image>')
+TITLE_PATTERN = re.compile(r'<title>(.*?)</title>')
+HEADER_PATTERN = re.compile(r'<header>(.*?)</header>')
+LIST_PATTERN = re.compile(r'<list>(.*?)(?:</list>|$)', re.DOTALL)  ## Grab all list contents within the list xml tags
+MARKUP_PATTERN = re.compile(r'<[^>]+>')
+WORD_PATTERN = re.compile(r'\w+')
+
+# Versions of the artifacts derived from a PDF, to bump when the code producing them changes
+TEXTRACT_ARTIFACT_VERSION = "1"
+LAYOUT_ARTIFACT_VERSION = "2"
+CHUNKS_ARTIFACT_VERSION = "2"
+
+# Maximum number of words of a chunk
+CHUNK_MAX_WORDS = 200
+
+# Whether the pages with a text layer are extracted locally, leaving only the others to Textract
+LOCAL_PDF_EXTRACTION = os.getenv("LOCAL_PDF_EXTRACTION", "true").lower() == "true"
+
 
 def strip_newline(cell: Any) -> str:
     """Remove newline characters from a cell value."""
     return str(cell).strip()
 
-def sub_header_content_splitter(string: str) -> List[str]:
-    """Split content by XML tags and return relevant segments."""
-    pattern = re.compile(r'<<[^>]+>>')
-    segments = re.split(pattern, string)
+def sub_header_content_segments(string: str) -> List[Tuple[int, str]]:
+    """Split content by XML tags and return relevant segments with their offset in the content."""
     result = []
-    for segment in segments:
+    start = 0
+    for end, next_start in [(m.start(), m.end()) for m in TAG_PATTERN.finditer(string)] + [(len(string), len(string))]:
+        segment = string[start:end]
         if segment.strip():
             if "<header>" not in segment and "<list>" not in segment and "<table>" not in segment:
-                segment = [x.strip() for x in segment.split('\n') if x.strip()]
-                result.extend(segment)
+                line_start = start
+                for x in segment.split('\n'):
+                    if x.strip():
+                        result.append((line_start + len(x) - len(x.lstrip()), x.strip()))
+                    line_start += len(x) + 1
             else:
-                result.append(segment)
+                result.append((start, segment))
+        start = next_start
     return result
 
+def sub_header_content_splitter(string: str) -> List[str]:
+    """Split content by XML tags and return relevant segments."""
+    return [segment for _, segment in sub_header_content_segments(string)]
+
 def split_list_items_(items: str) -> List[str]:
     """Split a string into a list of items, handling nested lists."""
-    parts = re.split("(<<list>><list>|</list><</list>>)", items)
+    parts = LIST_SPLIT_PATTERN.split(items)
     output = []
 
     inside_list = False
@@ -63,8 +100,8 @@ def split_list_items_(items: str) -> List[str]:
             output.extend(p.split('\n'))
     return output
 
-def process_document(document, local_pdf_path: str, bucket_name: str) -> [Dict, Dict]:
-    """Process a document from textract, extract different items."""
+def process_document(document, local_pdf_path: str, bucket_name: str) -> Dict[int, List[str]]:
+    """Process a document from textract, extract different items of each page."""
 
     config = TextLinearizationConfig(
         hide_figure_layout=False,
@@ -83,44 +120,43 @@ def process_document(document, local_pdf_path: str, bucket_name: str) -> [Dict,
         hide_page_num_layout=True,
     )
 
-    csv_seperator = "|"  # "\t"
     document_holder = {}
     table_page = {}
     count = 0
-    table_strings = []
-    # Whether to handle merged cells by duplicating merged value across corresponding individual cells
-    unmerge_span_cells = True
+    # Serialize the cells of the tables, merged cells duplicated across the cells they span
+    table_markdowns = [table_to_markdown(*textract_table_rows(table)) for table in document.tables]
+    # Render the images of all the tables up front, each page once
+    if TABLE_IMAGES:
+        table_uris = save_table_images_to_s3(
+            local_pdf_path, [(table.page, table.bbox) for table in document.tables], bucket_name
+        )
+    else:
+        table_uris = [None] * len(document.tables)
     # Loop through each page in the document
     for ids, page in enumerate(document.pages):
-        table_count = len([word for word in page.get_text(config=config).split() if
+        # Linearize the page once, the most expensive step
+        page_text = page.get_text(config=config)
+        table_count = len([word for word in page_text.split() if
                            "<tables><table>" in word])
         assert table_count == len(page.tables)
-        content = page.get_text(config=config).split("<tables>")
+        content = page_text.split("<tables>")
         document_holder[ids] = []
         for idx, item in enumerate(content):
             if "<table>" in item:
-                table = document.tables[count]
-
-                bounding_box = table.bbox
-
-                table_pg_number = table.page
-
-                table_uri = save_table_image_to_s3(local_pdf_path, table_pg_number, bounding_box, bucket_name)
+                table_uri = table_uris[count]
 
                 if ids in table_page:
                     table_page[ids].append(table_uri)
                 else:
                     table_page[ids] = [table_uri]
 
-                
-                # Extract table data and remaining content
-                pattern = re.compile(r'<table>(.*?)(</table>)', re.DOTALL)
+                # Remaining content after the linearized table, whose text is taken from its cells instead
                 data = item
-                table_match = re.search(pattern, data)
-                table_data = table_match.group(1) if table_match else ''
+                table_match = TABLE_PATTERN.search(data)
                 remaining_content = data[table_match.end():] if table_match else data
 
-                content[idx] = f"<<table>><table>{table_uri}</table><</table>>"  ## attach xml tags to differentiate table from other text
+                ## attach xml tags to differentiate table from other text
+                content[idx] = table_layout_item(table_markdowns[count], table_uri)
                 count += 1
 
                 if "<<list>>" in remaining_content:
@@ -138,260 +174,358 @@ def process_document(document, local_pdf_path: str, bucket_name: str) -> [Dict,
                 else:
                     document_holder[ids].extend([x.strip() for x in item.split("\n") if x.strip()])
 
-    page_mapping = {}
-    current_page = 1
-    
-    for page in document.pages:
-        page_content = page.get_text(config=config)
-        page_mapping[current_page] = page_content
-        current_page += 1
+    return document_holder
 
+def flatten_pages(document_holder: Dict[int, List[str]]) -> Tuple[List[str], List[int]]:
+    """Join the items of the pages and split the result by title.
+
+    Also returns the offset at which each page starts in the joined text, so the
+    page of any line is found by bisection instead of searching the page texts.
+    """
     # Flatten the nested list document_holder into a single list and Join the flattened list by "\n"
-    flattened_list = [item for sublist in document_holder.values() for item in sublist]
+    flattened_list = []
+    page_offsets = []
+    offset = 0
+    for items in document_holder.values():
+        page_offsets.append(offset)
+        for item in items:
+            flattened_list.append(item)
+            offset += len(item) + 1
     result = "\n".join(flattened_list)
     header_split = result.split("<titles>")
 
-    return header_split, page_mapping
-
-def chunk_document(header_split, file, BUCKET, page_mapping):
-    """Document chunking"""
-    csv_seperator = "|"
-    max_words = 200
-    chunks = {}
-    table_header_dict = {}
-    chunk_header_mapping = {}
-    list_header_dict = {}
-
-    # Function to find the page number for a given content
-    def find_page_number(content):
-        for page_num, page_content in page_mapping.items():
-            if content in page_content:
-                return page_num
-        return None
-
-    # iterate through each title section
-    for title_ids, items in enumerate(header_split):
-        title_chunks = []
-        current_chunk = {"content": [], "metadata": {}}
-        num_words = 0
-        table_header_dict[title_ids] = {}
-        chunk_header_mapping[title_ids] = {}
-        list_header_dict[title_ids] = {}
-        chunk_counter = 0
-        last_known_page = 1
-
-        doc_id = os.path.basename(file)
-
-        for item_ids, item in enumerate(items.split('<headers>')):  # headers
-            lines = sub_header_content_splitter(item)
+    return header_split, page_offsets
+
+def page_number_at(page_offsets: List[int], offset: int) -> int:
+    """Return the page number, starting at 1, of the character at an offset of the joined text."""
+    return max(1, bisect.bisect_right(page_offsets, offset))
+
+class LayoutItem(NamedTuple):
+    """A line of a header section, typed by the markup of the linearization."""
+
+    kind: str  # "title", "header", "paragraph", "list" or "table"
+    line: str
+    page: int
+
+@dataclass
+class HeaderSection:
+    """Lines of a title section from a section header up to the next one."""
+
+    title_index: int
+    lines: List[str]
+    items: List[LayoutItem]
+
+    @cached_property
+    def plain_text(self) -> str:
+        return MARKUP_PATTERN.sub('', "".join(self.lines)).strip()
+
+def layout_kind(line: str) -> str:
+    """Type of a line, from the markup added by process_document."""
+    if "<title>" in line:
+        return "title"
+    if "<header>" in line:
+        return "header"
+    if "<table>" in line:
+        return "table"
+    if "<list>" in line:
+        return "list"
+    return "paragraph"
+
+def iter_header_sections(header_split: List[str], page_offsets: List[int]) -> Iterator[HeaderSection]:
+    """Yield the header sections of each title section in document order, with the page of each line."""
+    # Offset of the current title section and header item in the joined text of the pages
+    section_offset = 0
+    for title_index, items in enumerate(header_split):
+        item_offset = section_offset
+        for item in items.split('<headers>'):
+            segments = sub_header_content_segments(item)
+            yield HeaderSection(
+                title_index=title_index,
+                lines=[segment for _, segment in segments],
+                items=[
+                    LayoutItem(layout_kind(segment), segment, page_number_at(page_offsets, item_offset + offset))
+                    for offset, segment in segments
+                ],
+            )
+            item_offset += len(item) + len('<headers>')
+        section_offset += len(items) + len('<titles>')
+
+class Chunk:
+    """Content and metadata of a chunk being built, with a running count of its words."""
+
+    __slots__ = ("content", "metadata", "_length", "_content_words")
+
+    def __init__(self) -> None:
+        self.content: List[str] = []
+        self.metadata: Dict[str, Any] = {}
+        self._length = 0
+        self._content_words = 0
+
+    @staticmethod
+    def _repr_words(text: str, words: Optional[int] = None) -> int:
+        # The representation of a printable text only escapes quotes and backslashes, so it has the same words
+        if words is not None and text.isprintable():
+            return words
+        return len(WORD_PATTERN.findall(repr(text)))
+
+    def append(self, text: str, words: Optional[int] = None) -> None:
+        """Append a line, with its number of words if already counted."""
+        self.insert(len(self.content), text, words)
+
+    def extend(self, texts: List[str]) -> None:
+        for text in texts:
+            self.append(text)
+
+    def insert(self, index: int, text: str, words: Optional[int] = None) -> None:
+        self.content.insert(index, text)
+        self._length += len(text)
+        self._content_words += self._repr_words(text, words)
+
+    def pop(self) -> str:
+        text = self.content.pop()
+        self._length -= len(text)
+        self._content_words -= self._repr_words(text)
+        return text
+
+    def text_equals(self, text: Optional[str]) -> bool:
+        """Whether the stripped text of the chunk is `text`, which can only be for a chunk at least as long."""
+        if text is None or self._length < len(text):
+            return False
+        return "".join(self.content).strip() == text
+
+    def dict_words(self) -> int:
+        """Number of words of the representation of `to_dict()`, where the splitting of lists starts counting."""
+        # The words of the "content" and "metadata" keys, then those of the values
+        return 2 + self._content_words + len(WORD_PATTERN.findall(repr(self.metadata)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"content": self.content, "metadata": self.metadata}
+
+class DocumentChunker:
+    """Single pass chunker of the header sections of a document.
+
+    Paragraph lines are grouped in chunks of up to `max_words` words, tables are
+    split by rows in chunks of their own and lists are split in chunks of up to
+    `max_words` words, each following the line introducing the list or table. The
+    lines of the header section of each chunk and the lists it holds are recorded
+    in `chunk_header_mapping` and `list_header_dict`, by title section and chunk.
+    """
+
+    def __init__(self, max_words: int = 200) -> None:
+        self.max_words = max_words
+        self.chunk_header_mapping: Dict[int, Dict[int, List[str]]] = {}
+        self.list_header_dict: Dict[int, Dict[int, List[str]]] = {}
+        self._first_header_portion = False
+
+    def iter_chunks(self, sections: Iterable[HeaderSection]) -> Iterator[Tuple[int, Chunk]]:
+        """Yield each chunk with the index of its title section, as soon as it is complete."""
+        title_ids = None
+        lines: List[str] = []
+        current_chunk = Chunk()
+        for section in sections:
+            if section.title_index != title_ids:
+                if title_ids is not None and current_chunk.content:
+                    yield title_ids, current_chunk
+                    self.chunk_header_mapping[title_ids][chunk_counter] = lines
+                title_ids = section.title_index
+                self.chunk_header_mapping[title_ids] = {}
+                self.list_header_dict[title_ids] = {}
+                chunk_counter = 0
+                current_chunk = Chunk()
+
+            lines = section.lines
+            chunk_header_mapping = self.chunk_header_mapping[title_ids]
+            list_header_dict = self.list_header_dict[title_ids]
             SECTION_HEADER = None
             TITLES = None
             num_words = 0
-            for ids_line, line in enumerate(lines):  # header lines
-                if line.strip():
-                    # Find the page number for this line
-                    page_number = find_page_number(line)
-                    if page_number:
-                        last_known_page = page_number
-                    current_chunk["metadata"]["page"] = last_known_page
-
-                    if "<title>" in line:
-                        TITLES = re.findall(r'<title>(.*?)</title>', line)[0].strip()
-                        line = TITLES
-                        current_chunk["metadata"]["title"] = TITLES
-                        if re.sub(r'<[^>]+>', '', "".join(lines)).strip() == TITLES:
-                            chunk_header_mapping[title_ids][chunk_counter] = lines
-                            chunk_counter += 1
-                    if "<header>" in line:
-                        SECTION_HEADER = re.findall(r'<header>(.*?)</header>', line)[0].strip()
-                        line = SECTION_HEADER
-                        current_chunk["metadata"]["section_header"] = SECTION_HEADER
-                        first_header_portion = True
-                    next_num_words = num_words + len(re.findall(r'\w+', line))
-
-                    if "<table>" in line or "<list>" in line:
-                        # For tables and lists, we'll use the last known page number
-                        current_chunk["metadata"]["page"] = last_known_page
-
-                    if "<table>" not in line and "<list>" not in line:
-                        if next_num_words > max_words and "".join(current_chunk["content"]).strip() != SECTION_HEADER and current_chunk["content"] and "".join(current_chunk["content"]).strip() != TITLES:
-                            if SECTION_HEADER:
-                                if first_header_portion:
-                                    first_header_portion = False
-                                else:
-                                    current_chunk["content"].insert(0, SECTION_HEADER.strip())
-
-                            title_chunks.append(current_chunk)
-                            chunk_header_mapping[title_ids][chunk_counter] = lines
-
-                            current_chunk = {"content": [], "metadata": {}}
-                            if SECTION_HEADER:
-                                current_chunk["metadata"]["section_header"] = SECTION_HEADER
-                            if TITLES:
-                                current_chunk["metadata"]["title"] = TITLES
-                            num_words = 0
-                            chunk_counter += 1
-
-                        current_chunk["content"].append(line)
-                        num_words += len(re.findall(r'\w+', line))
-
-
-                    if "<table>" in line:
-                        # Get table header which is usually line before table in document
-                        line_index = lines.index(line)
-                        if line_index != 0 and "<table>" not in lines[line_index - 1] and "<list>" not in lines[line_index - 1]:
-                            header = lines[line_index - 1].replace("<header>", "").replace("</header>", "")
-                        else:
-                            header = ""
-
-                        # Extract the uri data
-                        table_uri = re.search(r'<table>(.*?)</table>', line).group(1)
-                        
-                        # Add the table as a whole to the current chunk
-                        current_chunk["content"].append(f"<table>{header}<base64>{table_uri}</base64></table>")
-                        
-                        # Reset num_words to 0 as we're not counting words in the table
+            for ids_line, item in enumerate(section.items):  # header lines
+                line = item.line
+                current_chunk.metadata["page"] = item.page
+
+                if item.kind == "title":
+                    TITLES = TITLE_PATTERN.findall(line)[0].strip()
+                    line = TITLES
+                    current_chunk.metadata["title"] = TITLES
+                    if section.plain_text == TITLES:
+                        chunk_header_mapping[chunk_counter] = lines
+                        chunk_counter += 1
+                elif item.kind == "header":
+                    SECTION_HEADER = HEADER_PATTERN.findall(line)[0].strip()
+                    line = SECTION_HEADER
+                    current_chunk.metadata["section_header"] = SECTION_HEADER
+                    self._first_header_portion = True
+
+                if item.kind not in ("table", "list"):
+                    line_words = len(WORD_PATTERN.findall(line))
+                    if (num_words + line_words > self.max_words and current_chunk.content
+                            and not current_chunk.text_equals(SECTION_HEADER) and not current_chunk.text_equals(TITLES)):
+                        self._prefix_section_header(current_chunk, SECTION_HEADER)
+                        yield title_ids, current_chunk
+                        chunk_header_mapping[chunk_counter] = lines
+
+                        current_chunk = Chunk()
+                        if SECTION_HEADER:
+                            current_chunk.metadata["section_header"] = SECTION_HEADER
+                        if TITLES:
+                            current_chunk.metadata["title"] = TITLES
                         num_words = 0
+                        chunk_counter += 1
 
-                    if "<list>" in line:
-                        # Get list header which is usually line before list in document
-                        line_index = lines.index(line)
-                        if line_index != 0 and "<table>" not in lines[line_index - 1] and "<list>" not in lines[
-                            line_index - 1]:  # Check if table or list is the previous item on the page, then they wont be a header
-                            header = lines[line_index - 1].replace("<header>", "").replace("</header>", "")
-                        else:
-                            header = ""
-                        list_pattern = re.compile(r'<list>(.*?)(?:</list>|$)',
-                                                  re.DOTALL)  ## Grab all list contents within the list xml tags
-                        list_match = re.search(list_pattern, line)
-                        list_ = list_match.group(1)
-                        list_lines = list_.split("\n")
+                    current_chunk.append(line, line_words)
+                    num_words += line_words
+                    continue
 
+                # Get table or list header which is usually line before it in document, unless it is a table or list too
+                previous = section.items[ids_line - 1] if ids_line != 0 else None
+                if previous is not None and previous.kind not in ("table", "list"):
+                    header = previous.line.replace("<header>", "").replace("</header>", "")
+                else:
+                    header = ""
+
+                if item.kind == "table":
+                    # The text before the table ends the current chunk, unless it is only its title or section header
+                    if (current_chunk.content and not current_chunk.text_equals(SECTION_HEADER)
+                            and not current_chunk.text_equals(TITLES)):
+                        self._prefix_section_header(current_chunk, SECTION_HEADER)
+                        yield title_ids, current_chunk
+                        chunk_header_mapping[chunk_counter] = lines
+                        chunk_counter += 1
+                        metadata = current_chunk.metadata
+                        current_chunk = Chunk()
+                        for key in ("title", "section_header"):
+                            if key in metadata:
+                                current_chunk.metadata[key] = metadata[key]
+                        num_words = 0
+
+                    for table_chunk in self._table_chunks(line, header, SECTION_HEADER, current_chunk.metadata, item.page):
+                        yield title_ids, table_chunk
+                        chunk_header_mapping[chunk_counter] = lines
+                        chunk_counter += 1
+                    continue
+
+                list_ = LIST_PATTERN.search(line).group(1)
+                is_last = ids_line == len(section.items) - 1
+
+                curr_chunk = []
+                words = current_chunk.dict_words()  # start word count from any existing chunk
+                # Iterate through the items in the list
+                for lyst_item in list_.split("\n"):
+                    curr_chunk.append(lyst_item)
+                    words += len(WORD_PATTERN.findall(lyst_item))
+                    if words >= self.max_words:
+                        list_header_dict.setdefault(chunk_counter, []).extend([header, list_])
+                        words = 0
+                        self._add_list_chunk(current_chunk, header, "\n".join(curr_chunk), SECTION_HEADER)
+                        yield title_ids, current_chunk
+                        chunk_header_mapping[chunk_counter] = lines
+                        chunk_counter += 1
+                        num_words = 0
+                        current_chunk = Chunk()
                         curr_chunk = []
-                        words = len(re.findall(r'\w+', str(current_chunk)))  # start word count from any existing chunk
-                        # Iterate through the items in the list
-                        for lyst_item in list_lines:
-                            curr_chunk.append(lyst_item)
-                            words += len(re.findall(r'\w+', lyst_item))
-                            if words >= max_words:  #
-                                if [x for x in list_header_dict[title_ids] if chunk_counter == x]:
-                                    list_header_dict[title_ids][chunk_counter].extend([header] + [list_])
-                                else:
-                                    list_header_dict[title_ids][chunk_counter] = [header] + [list_]
-                                words = 0
-                                list_chunk = "\n".join(curr_chunk)
-                                if header:  # attach list header
-                                    if current_chunk['content'] and current_chunk["content"][-1].strip().lower() == header.strip().lower():  # check if header is in the chunk and remove to avoid duplicacy of header in chunk
-                                        current_chunk["content"].pop()
-                                        # Append section content header to list
-                                    if SECTION_HEADER and SECTION_HEADER.lower().strip() != header.lower().strip():
-                                        if first_header_portion:
-                                            first_header_portion = False
-                                        else:
-                                            current_chunk["content"].insert(0, SECTION_HEADER.strip())
-
-                                    current_chunk["content"].extend([header.strip() + ':' if not header.strip().endswith(
-                                        ':') else header.strip()] + [list_chunk])
-                                    title_chunks.append(current_chunk)
-
-                                else:
-                                    if SECTION_HEADER:
-                                        if first_header_portion:
-                                            first_header_portion = False
-                                        else:
-                                            current_chunk["content"].insert(0, SECTION_HEADER.strip())
-
-                                    current_chunk["content"].extend([list_chunk])
-                                    title_chunks.append(current_chunk)
-                                chunk_header_mapping[title_ids][chunk_counter] = lines
-                                chunk_counter += 1
-                                num_words = 0
-                                current_chunk = {"content": [], "metadata": {}}
-                                curr_chunk = []
-                        if curr_chunk and lines.index(line) == len(
-                                lines) - 1:  # if list chunk still remaining and list is last item in page append as last chunk
-                            list_chunk = "\n".join(curr_chunk)
-                            if [x for x in list_header_dict[title_ids] if chunk_counter == x]:
-                                list_header_dict[title_ids][chunk_counter].extend([header] + [list_])
-                            else:
-                                list_header_dict[title_ids][chunk_counter] = [header] + [list_]
-                            if header:
-                                # Check if current_chunk["content"] is not empty before accessing its last element
-                                if current_chunk["content"] and current_chunk["content"][-1].strip().lower() == header.strip().lower():
-                                    current_chunk["content"].pop()
-                                if SECTION_HEADER and SECTION_HEADER.lower().strip() != header.lower().strip():
-                                    if first_header_portion:
-                                        first_header_portion = False
-                                    else:
-                                        current_chunk["content"].insert(0, SECTION_HEADER.strip())
-                                current_chunk["content"].extend(
-                                    [header.strip() + ':' if not header.strip().endswith(':') else header.strip()] + [
-                                        list_chunk])
-                                title_chunks.append(current_chunk)
-                            else:
-                                if SECTION_HEADER:
-                                    if first_header_portion:
-                                        first_header_portion = False
-                                    else:
-                                        current_chunk["content"].insert(0, SECTION_HEADER.strip())
-                                current_chunk["content"].extend([list_chunk])
-                                title_chunks.append(current_chunk)
-                            chunk_header_mapping[title_ids][chunk_counter] = lines
-                            chunk_counter += 1
-                            num_words = 0
-                            current_chunk = {"content": [], "metadata": {}}
-                        elif curr_chunk and lines.index(line) != len(
-                                lines) - 1:  # if list is not last item in page and max word threshold is not reached, send to next loop
-                            list_chunk = "\n".join(curr_chunk)
-                            if [x for x in list_header_dict[title_ids] if chunk_counter == x]:
-                                list_header_dict[title_ids][chunk_counter].extend([header] + [list_])
-                            else:
-                                list_header_dict[title_ids][chunk_counter] = [header] + [list_]
-                            if header:
-                                if current_chunk["content"] and current_chunk["content"][-1].strip().lower() == header.strip().lower():
-                                    current_chunk["content"].pop()
-                                current_chunk["content"].extend(
-                                    [header.strip() + ':' if not header.strip().endswith(':') else header.strip()] + [
-                                        list_chunk])
-                            else:
-                                current_chunk["content"].extend([list_chunk])
-                            num_words = words
-
-            if current_chunk["content"] and "".join(current_chunk["content"]).strip() != SECTION_HEADER and "".join(current_chunk["content"]).strip() != TITLES:
-                if SECTION_HEADER:
-                    if first_header_portion:
-                        first_header_portion = False
+
+                if curr_chunk:
+                    list_header_dict.setdefault(chunk_counter, []).extend([header, list_])
+                    if is_last:
+                        # The rest of a list ending the header section is a chunk of its own
+                        self._add_list_chunk(current_chunk, header, "\n".join(curr_chunk), SECTION_HEADER)
+                        yield title_ids, current_chunk
+                        chunk_header_mapping[chunk_counter] = lines
+                        chunk_counter += 1
+                        num_words = 0
+                        current_chunk = Chunk()
                     else:
-                        current_chunk["content"].insert(0, SECTION_HEADER.strip())
-                title_chunks.append(current_chunk)
-                chunk_header_mapping[title_ids][chunk_counter] = lines
-                current_chunk = {"content": [], "metadata": {}}
+                        # Otherwise it starts the current chunk, which the following lines complete
+                        self._add_list_chunk(current_chunk, header, "\n".join(curr_chunk), None)
+                        num_words = words
+
+            if current_chunk.content and not current_chunk.text_equals(SECTION_HEADER) and not current_chunk.text_equals(TITLES):
+                self._prefix_section_header(current_chunk, SECTION_HEADER)
+                yield title_ids, current_chunk
+                chunk_header_mapping[chunk_counter] = lines
+                current_chunk = Chunk()
                 chunk_counter += 1
-        if current_chunk["content"]:
-            title_chunks.append(current_chunk)
-            chunk_header_mapping[title_ids][chunk_counter] = lines
-        chunks[title_ids] = title_chunks
-
-    # List of title header sections document was split into
-    for x in chunk_header_mapping:
-        if chunk_header_mapping[x]:
-            try:
-                title_pattern = re.compile(r'<title>(.*?)(?:</title>|$)', re.DOTALL)
-                title_match = re.search(title_pattern, chunk_header_mapping[x][0][0])
-                title_ = title_match.group(1) if title_match else ""
-            except:
-                continue
+
+        if title_ids is not None and current_chunk.content:
+            yield title_ids, current_chunk
+            self.chunk_header_mapping[title_ids][chunk_counter] = lines
+
+    def _table_chunks(self, line: str, header: str, section_header: Optional[str], metadata: Dict[str, Any],
+                      page: int) -> List[Chunk]:
+        """Chunks of a table, split by rows in parts of up to `max_words` words each starting with the header row.
+
+        Each part follows the section header and the line introducing the table,
+        which is also kept as the `table_context` of the chunks.
+        """
+        content = TABLE_PATTERN.search(line).group(1)
+        image = TABLE_IMAGE_PATTERN.search(content)
+        table_uri = image.group(1) if image else ""
+        markdown = TABLE_IMAGE_PATTERN.sub("", content).strip()
+        if not markdown and not table_uri:
+            return []
+
+        context = [header.strip() + ':' if not header.strip().endswith(':') else header.strip()] if header.strip() else []
+        if section_header and section_header.lower().strip() != header.lower().strip():
+            context.insert(0, section_header.strip())
+        context_words = sum(len(WORD_PATTERN.findall(text)) for text in context)
+
+        parts = [markdown]
+        if markdown:
+            parts = split_markdown_table(
+                markdown, max(self.max_words - context_words, 1), lambda text: len(WORD_PATTERN.findall(text))
+            )
+
+        chunks = []
+        for part in parts:
+            chunk = Chunk()
+            chunk.metadata.update(metadata)
+            chunk.metadata.update({"page": page, "table_context": header.strip(), "table_uri": table_uri})
+            chunk.extend(context + ([part] if part else []))
+            chunks.append(chunk)
+        return chunks
+
+    def _prefix_section_header(self, chunk: Chunk, section_header: Optional[str]) -> None:
+        # The first chunk of a section already starts with its header, the next ones get it prepended
+        if section_header:
+            if self._first_header_portion:
+                self._first_header_portion = False
+            else:
+                chunk.insert(0, section_header.strip())
+
+    def _add_list_chunk(self, chunk: Chunk, header: str, list_chunk: str, section_header: Optional[str]) -> None:
+        """Add a part of a list to a chunk after its header, prefixing the chunk with `section_header` if set."""
+        if header:
+            # Remove the header if it is the last line of the chunk, to avoid duplicating it
+            if chunk.content and chunk.content[-1].strip().lower() == header.strip().lower():
+                chunk.pop()
+            if section_header and section_header.lower().strip() != header.lower().strip():
+                self._prefix_section_header(chunk, section_header)
+            chunk.extend([header.strip() + ':' if not header.strip().endswith(':') else header.strip(), list_chunk])
+        else:
+            self._prefix_section_header(chunk, section_header)
+            chunk.append(list_chunk)
+
+def chunk_document(header_split, file, BUCKET, page_offsets):
+    """Document chunking"""
+    doc_id = os.path.basename(file)
+
+    chunker = DocumentChunker(max_words=CHUNK_MAX_WORDS)
+    chunks = {title_ids: [] for title_ids in range(len(header_split))}
+    for title_ids, chunk in chunker.iter_chunks(iter_header_sections(header_split, page_offsets)):
+        chunks[title_ids].append(chunk.to_dict())
+    chunk_header_mapping = chunker.chunk_header_mapping
 
     with open(f"/tmp/{doc_id}.json", "w") as f:
-        json.dump(chunk_header_mapping, f)
+        # json.dumps encodes in one shot with the C encoder, unlike json.dump
+        f.write(json.dumps(chunk_header_mapping))
     s3.upload_file(f"/tmp/{doc_id}.json", BUCKET, f"chunked_jsons/{doc_id}.json")
     os.remove(f"/tmp/{doc_id}.json")
 
     doc = {
         'chunks': chunks,
         'chunk_header_mapping': chunk_header_mapping,
-        'table_header_dict': table_header_dict,
-        'list_header_dict': list_header_dict,
+        'table_header_dict': {title_ids: {} for title_ids in chunks},
+        'list_header_dict': chunker.list_header_dict,
         'doc_id': doc_id
     }
 
@@ -438,8 +572,13 @@ def create_documents(doc: dict, document_url: str, s3_uri: str, content_type: st
             try:
                 # Process the chunk synchronously
                 passage_chunk, last_known_page = process_chunk(chunk, last_known_page)
-                passage_chunk, table_uri, table_context = extract_table_content(passage_chunk)
-                passage_chunk = re.sub(r'<[^>]+>', '', passage_chunk)
+                metadata = (chunk.get('metadata') or {}) if isinstance(chunk, dict) else {}
+                if 'table_context' in metadata:
+                    # The text of a table chunk is its markdown, kept as is
+                    table_uri, table_context = metadata['table_uri'], metadata['table_context']
+                else:
+                    passage_chunk, table_uri, table_context = extract_table_content(passage_chunk)
+                    passage_chunk = MARKUP_PATTERN.sub('', passage_chunk)
 
                 if passage_chunk.strip() or table_uri:
                     lists = "\n".join(list_header_dict.get(ids, {}).get(chunk_ids, []))
@@ -466,15 +605,108 @@ def parse_s3_uri(s3_uri):
     
     return bucket_name, file_key
 
+def restore_int_keys(value):
+    """Restore the integer keys of the dicts of a chunked document, which JSON turns into strings."""
+    if isinstance(value, dict):
+        return {int(key) if key.isdigit() else key: restore_int_keys(item) for key, item in value.items()}
+    return value
+
+def pages_digest(pages):
+    """Short digest of a list of page indexes."""
+    return hashlib.sha256(",".join(map(str, pages)).encode("utf-8")).hexdigest()[:16]
+
+def load_textract_document(s3_uri, bucket_name, s3_file_path, etag, pages=None):
+    """Return the Textract document and the local path of the PDF, analyzing the PDF unless already done.
+
+    `s3_uri` is a PDF made of the `pages` of the source PDF when only those are analyzed.
+    """
+    version = TEXTRACT_ARTIFACT_VERSION
+    if pages is not None:
+        version += "." + pages_digest(pages)
+    textract_key = artifact_key(s3_file_path, etag, "textract", version)
+    response = load_artifact(s3, bucket_name, textract_key)
+    if response is not None:
+        print("Reusing the Textract analysis")
+        local_pdf_path = f"/tmp/{os.path.basename(os.path.splitext(s3_uri)[0])}"
+        download_from_s3(s3, s3_uri, local_pdf_path)
+        return TextractDocument.open(response), local_pdf_path
+
+    document, local_pdf_path = extract_textract_data(s3, s3_uri, bucket_name)
+    save_artifact(s3, bucket_name, textract_key, document.response)
+    return document, local_pdf_path
+
+def extract_document_layout(s3_uri, bucket_name, s3_file_path, etag):
+    """Return the items of each page of the PDF, from its text layer where usable and from Textract elsewhere."""
+    local_pdf_path = f"/tmp/{os.path.basename(s3_file_path)}"
+    download_from_s3(s3, s3_uri, local_pdf_path)
+    document_holder = extract_local_layout(local_pdf_path, bucket_name)
+
+    scanned_pages = [page for page, items in document_holder.items() if items is None]
+    if not scanned_pages:
+        return document_holder
+
+    print(f"Analyzing {len(scanned_pages)} of {len(document_holder)} pages with Textract")
+    if len(scanned_pages) == len(document_holder):
+        document, textract_pdf_path = load_textract_document(s3_uri, bucket_name, s3_file_path, etag)
+    else:
+        # Analyze a PDF of the scanned pages only
+        pages_path = f"{os.path.splitext(local_pdf_path)[0]}-scanned.pdf"
+        write_pdf_pages(local_pdf_path, scanned_pages, pages_path)
+        pages_key = f"textract-input/{s3_file_path}/{etag}/pages-{pages_digest(scanned_pages)}.pdf"
+        s3.upload_file(pages_path, bucket_name, pages_key)
+        document, textract_pdf_path = load_textract_document(
+            f"s3://{bucket_name}/{pages_key}", bucket_name, s3_file_path, etag, pages=scanned_pages
+        )
+
+    for page, items in zip(scanned_pages, process_document(document, textract_pdf_path, bucket_name).values(), strict=True):
+        document_holder[page] = items
+    return document_holder
+
+def layout_artifact_version():
+    """Version of the linearized pages, which depend on the extraction engine and on the rendering of table images."""
+    engine = "local" if LOCAL_PDF_EXTRACTION else "textract"
+    return f"{LAYOUT_ARTIFACT_VERSION}.{engine}" + (".images" if TABLE_IMAGES else "")
+
+def load_document_layout(s3_uri, bucket_name, s3_file_path, etag):
+    """Return the items of each page of the PDF, extracting them unless already done."""
+    layout_key = artifact_key(s3_file_path, etag, "layout", layout_artifact_version())
+    pages = load_artifact(s3, bucket_name, layout_key)
+    if pages is not None:
+        print("Reusing the linearized pages")
+        return dict(enumerate(pages))
+
+    if LOCAL_PDF_EXTRACTION:
+        document_holder = extract_document_layout(s3_uri, bucket_name, s3_file_path, etag)
+    else:
+        document, local_pdf_path = load_textract_document(s3_uri, bucket_name, s3_file_path, etag)
+        document_holder = process_document(document, local_pdf_path, bucket_name)
+    save_artifact(s3, bucket_name, layout_key, list(document_holder.values()))
+    return document_holder
+
 def create_documents_from_pdf(s3_uri, content_type, source_url):
+    """Create the documents of the chunks of a PDF.
+
+    The output of each stage (Textract analysis, linearized pages, chunks) is
+    stored under the ETag of the PDF and the version of the stage, so a later run
+    resumes from the deepest stage still valid, e.g. only chunks again after a
+    change of the chunking.
+    """
     bucket_name, s3_file_path = parse_s3_uri(s3_uri)
 
     print(f"Processing {os.path.basename(s3_file_path)}")
 
-    document, local_pdf_path = extract_textract_data(s3, s3_uri, bucket_name)
-
-    header_split, page_mapping = process_document(document, local_pdf_path, bucket_name)
-
-    doc_chunks = chunk_document(header_split, s3_file_path, bucket_name, page_mapping)
+    etag = get_etag(s3, bucket_name, s3_file_path)
+    # The chunks are derived from the linearized pages, so they are invalidated along with them
+    chunks_version = f"{CHUNKS_ARTIFACT_VERSION}.{CHUNK_MAX_WORDS}.{layout_artifact_version()}"
+    chunks_key = artifact_key(s3_file_path, etag, "chunks", chunks_version)
+    doc_chunks = load_artifact(s3, bucket_name, chunks_key)
+    if doc_chunks is not None:
+        print("Reusing the chunks")
+        doc_chunks = restore_int_keys(doc_chunks)
+    else:
+        document_holder = load_document_layout(s3_uri, bucket_name, s3_file_path, etag)
+        header_split, page_offsets = flatten_pages(document_holder)
+        doc_chunks = chunk_document(header_split, s3_file_path, bucket_name, page_offsets)
+        save_artifact(s3, bucket_name, chunks_key, doc_chunks)
 
-    return create_documents(doc_chunks, source_url, s3_uri, content_type)
\ No newline at end of file
+    return create_documents(doc_chunks, source_url, s3_uri, content_type)
@@ -5,50 +5,176 @@ import base64
 from datetime import datetime
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
 
-def save_table_image_to_s3(local_pdf_path, page_number, bounding_box, bucket_name, resolution=300, folder="image_store"):
+# Whether images of the tables are rendered and uploaded, besides the text of their cells
+TABLE_IMAGES = os.getenv("TABLE_IMAGES", "false").lower() == "true"
+TABLE_IMAGE_RESOLUTION = int(os.getenv("TABLE_IMAGE_RESOLUTION", 300))
+TABLE_IMAGE_UPLOAD_CONCURRENCY = int(os.getenv("TABLE_IMAGE_UPLOAD_CONCURRENCY", 8))
+
+def upload_png_to_s3(s3_client, image, bucket_name, image_filename):
+    # Convert the image to bytes
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    buffered.seek(0)
+
+    s3_client.upload_fileobj(buffered, bucket_name, image_filename, ExtraArgs={"ContentType": "image/png"})
+
+def save_table_images_to_s3(local_pdf_path, tables, bucket_name, resolution=TABLE_IMAGE_RESOLUTION, folder="image_store",
+                            max_concurrency=TABLE_IMAGE_UPLOAD_CONCURRENCY):
+    """Crop the image of each table from its page and upload it to S3.
+
+    The PDF is opened once and each page holding tables is rendered once, whatever
+    its number of tables. A page raster is released before the next page is
+    rendered, while the crops are encoded and uploaded in parallel.
+
+    Args:
+    ----
+        local_pdf_path: Path of the downloaded PDF.
+        tables: Page number, starting at 1, and bounding box of each table.
+        bucket_name: Bucket the images are uploaded to.
+        resolution: Resolution of the page rasters, in dots per inch.
+        folder: Prefix of the image keys.
+        max_concurrency: Maximum number of uploads in flight.
+
+    Returns:
+    -------
+        The S3 URL of the image of each table, in the order of the tables.
+    """
     s3_client = boto3.client("s3")
 
     file_name = os.path.basename(local_pdf_path).replace(" ", "_")
-    
-    with pdfplumber.open(local_pdf_path) as pdf:
-        # Get the specific page
-        page = pdf.pages[page_number - 1]
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    aws_region = os.getenv("AWS_REGION")
 
-        # Convert the page to an image
-        img = page.to_image(resolution)
-        
-        # Get the dimensions of the image
-        img_width, img_height = img.original.size
+    tables_by_page = {}
+    for index, (page_number, bounding_box) in enumerate(tables):
+        tables_by_page.setdefault(page_number, []).append((index, bounding_box))
+
+    table_urls = [None] * len(tables)
+    if not tables:
+        return table_urls
+
+    with pdfplumber.open(local_pdf_path) as pdf, ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        uploads = []
+        for page_number in sorted(tables_by_page):
+            page = pdf.pages[page_number - 1]
+
+            # Convert the page to an image, once for all its tables
+            pil_img = page.to_image(resolution).original
+            img_width, img_height = pil_img.size
+
+            for index, bounding_box in tables_by_page[page_number]:
+                # Calculate the crop box based on the bounding box
+                left = int(bounding_box.x * img_width)
+                top = int(bounding_box.y * img_height)
+                right = int((bounding_box.x + bounding_box.width) * img_width)
+                bottom = int((bounding_box.y + bounding_box.height) * img_height)
+
+                # The crop is a copy, independent of the page raster
+                cropped_img = pil_img.crop((left, top, right, bottom))
+
+                image_filename = f"{folder}/{file_name}_table_{timestamp}_{index}.png"
+                uploads.append(pool.submit(upload_png_to_s3, s3_client, cropped_img, bucket_name, image_filename))
+                table_urls[index] = f"https://{bucket_name}.s3.{aws_region}.amazonaws.com/{image_filename}"
+
+            # Free the raster and the parsed objects of the page before rendering the next one
+            pil_img.close()
+            page.close()
+
+        for upload in uploads:
+            upload.result()
+
+    return table_urls
+
+def textract_table_rows(table):
+    """Return the text of the cells of a Textract table by row, and its number of column header rows.
+
+    The text of a merged cell is repeated in each of the cells it spans.
+    """
+    rows = [[""] * table.column_count for _ in range(table.row_count)]
+    header_rows = set()
+    for cell in table.table_cells:
+        text = cell.text
+        if cell.siblings:
+            text = " ".join(sibling.text for sibling in cell.siblings if sibling.text.strip())
+        rows[cell.row_index - 1][cell.col_index - 1] = text
+        if cell.is_column_header:
+            header_rows.add(cell.row_index - 1)
+
+    header_count = 0
+    while header_count in header_rows:
+        header_count += 1
+    return rows, header_count
+
+def _markdown_row(cells):
+    return "| " + " | ".join(cells) + " |"
+
+def table_to_markdown(rows: Sequence[Sequence[Optional[str]]], header_rows: int = 1) -> str:
+    """Serialize the cells of a table by row to a markdown table.
+
+    Empty rows and columns are dropped and header rows are merged by column into
+    a single one. Without header rows, the first row is used as header.
+
+    Args:
+    ----
+        rows: Text of the cells of each row, None for an empty cell.
+        header_rows: Number of leading column header rows.
+
+    Returns:
+    -------
+        The markdown table, an empty string for a table without text.
+    """
+    cleaned = [[" ".join((cell or "").split()).replace("|", "\\|") for cell in row] for row in rows]
+    cleaned = [row for row in cleaned if any(row)]
+    if not cleaned:
+        return ""
+
+    width = max(len(row) for row in cleaned)
+    cleaned = [row + [""] * (width - len(row)) for row in cleaned]
+    columns = [column for column in range(width) if any(row[column] for row in cleaned)]
+    cleaned = [[row[column] for column in columns] for row in cleaned]
 
-        # Calculate the crop box based on the bounding box
-        left = int(bounding_box.x * img_width)
-        top = int(bounding_box.y * img_height)
-        right = int((bounding_box.x + bounding_box.width) * img_width)
-        bottom = int((bounding_box.y + bounding_box.height) * img_height)
+    header_rows = min(max(header_rows, 1), len(cleaned))
+    header = []
+    for column in range(len(columns)):
+        # Merged header cells repeat their text, which is kept once
+        texts = dict.fromkeys(row[column] for row in cleaned[:header_rows] if row[column])
+        header.append(" ".join(texts))
 
-        # Convert the image to a PIL Image
-        pil_img = img.original
+    lines = [_markdown_row(header), _markdown_row(["---"] * len(columns))]
+    lines.extend(_markdown_row(row) for row in cleaned[header_rows:])
+    return "\n".join(lines)
 
-        # Crop the image
-        cropped_img = pil_img.crop((left, top, right, bottom))
+def split_markdown_table(markdown: str, max_words: int, count_words) -> List[str]:
+    """Split a markdown table by rows into tables of up to `max_words` words, each starting with the header.
 
-        # Convert the cropped image to bytes
-        buffered = io.BytesIO()
-        cropped_img.save(buffered, format="PNG")
-        buffered.seek(0)
+    A row longer than `max_words` on its own makes a table of its own.
+    """
+    lines = markdown.split("\n")
+    header, rows = lines[:2], lines[2:]
+    header_words = sum(count_words(line) for line in header)
 
-        # Generate a unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        image_filename = f"{folder}/{file_name}_table_{timestamp}.png"
+    parts = []
+    part: List[str] = []
+    words = header_words
+    for row in rows:
+        row_words = count_words(row)
+        if part and words + row_words > max_words:
+            parts.append("\n".join(header + part))
+            part = []
+            words = header_words
+        part.append(row)
+        words += row_words
 
-        # Upload to S3
-        s3_client.upload_fileobj(buffered, bucket_name, image_filename, ExtraArgs={"ContentType": "image/png"})
+    parts.append("\n".join(header + part))
+    return parts
 
-        # Generate and return the S3 URL
-        aws_region = os.getenv("AWS_REGION")
-        s3_url = f"https://{bucket_name}.s3.{aws_region}.amazonaws.com/{image_filename}"
-        return s3_url
+def table_layout_item(markdown: str, image_uri: Optional[str] = None) -> str:
+    """Layout item of a table, with the URL of its image if rendered."""
+    image = f"<image>{image_uri}</image>" if image_uri else ""
+    return f"<<table>><table>{markdown}{image}</table><</table>>"
 
 def extract_table_content(passage_chunk):
     table_base64 = ""
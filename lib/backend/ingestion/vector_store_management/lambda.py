@@ -5,32 +5,76 @@ from typing import Optional
 
 from aws_lambda_powertools import Logger, Metrics, Tracer
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from francis_toolkit.utils import find_embedding_model_by_ref_key, get_vector_store
-from pydantic import BaseModel
+from francis_toolkit.utils import (
+    find_embedding_model_by_ref_key,
+    get_vector_store,
+    get_vector_store_kwargs,
+    load_config_from_dynamodb,
+)
+from pydantic import BaseModel, PositiveFloat, PositiveInt
 
 logger = Logger()
 tracer = Tracer()
 metrics = Metrics(namespace=os.getenv("METRICS_NAMESPACE"))
 
+# Time kept free at the end of the invocation to run VACUUM/REINDEX and report the stats
+MAINTENANCE_TIME_MARGIN_MS = 5 * 60 * 1000
+
 
 class VectorStoreMgmtRequest(BaseModel):
     purge_data: Optional[bool] = False
     model_ref_key: Optional[str] = None
+    purge_inactive: Optional[bool] = False
+    purge_batch_size: PositiveInt = 1000
+    purge_pause_seconds: PositiveFloat = 0.5
+    vacuum: Optional[bool] = False
+    reindex: Optional[bool] = False
 
 
 @logger.inject_lambda_context(log_event=True)
 @tracer.capture_lambda_handler(capture_response=False)
 @metrics.log_metrics(capture_cold_start_metric=True)
-def handler(event: dict, context: LambdaContext) -> None:
+def handler(event: dict, context: LambdaContext) -> dict:
     request = VectorStoreMgmtRequest(**event)
 
     embedding_model = find_embedding_model_by_ref_key(request.model_ref_key)
     if embedding_model is None:
         raise ValueError(f"Embedding model {request.model_ref_key} not found")
 
-    vector_store = get_vector_store(embedding_model)
+    system_config = load_config_from_dynamodb(os.getenv("CONFIG_TABLE_NAME", ""), "system_configuration")
+    vector_store = get_vector_store(embedding_model, **get_vector_store_kwargs(system_config))
 
     if request.purge_data:
         logger.info("Purging vector store")
         vector_store.delete_collection()
         vector_store.create_collection()
+
+    if not (request.purge_inactive or request.vacuum or request.reindex):
+        return {}
+
+    deleted_rows = 0
+    if request.purge_inactive:
+        max_duration_ms = context.get_remaining_time_in_millis() - MAINTENANCE_TIME_MARGIN_MS
+        deleted_rows = vector_store.purge_inactive_embeddings(
+            batch_size=request.purge_batch_size,
+            pause_seconds=request.purge_pause_seconds,
+            max_duration_seconds=max(max_duration_ms, 0) / 1000,
+        )
+        logger.info(f"Purged {deleted_rows} inactive embeddings")
+
+    if request.vacuum:
+        logger.info("Vacuuming vector store")
+        vector_store.vacuum(analyze=True)
+
+    if request.reindex:
+        if vector_store.index_config is None:
+            logger.warning("No index configured for the vector store, skipping reindex")
+        else:
+            logger.info("Rebuilding vector store index")
+            vector_store.rebuild_index(concurrently=True)
+
+    stats = vector_store.get_collection_stats()
+    stats["deleted_rows"] = deleted_rows
+    logger.info("Vector store stats", extra=stats)
+
+    return stats
@@ -1,15 +1,20 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
-import asyncio
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 import numpy as np
+from botocore.exceptions import ClientError
 from langchain_core.embeddings import Embeddings
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 from langchain_core.runnables.config import run_in_executor
 
+from .executor import EmbeddingExecutor, EmbeddingExecutorStats, batch_texts, is_throttling_error
+
+# Maximum number of texts per call for the providers whose embed API takes a list of texts
+PROVIDER_MAX_BATCH_SIZE = {"cohere": 96}
+
 
 class BedrockEmbeddings(BaseModel, Embeddings):
 
@@ -41,24 +46,50 @@ class BedrockEmbeddings(BaseModel, Embeddings):
     normalize: bool = False
     """Whether the embeddings should be normalized to unit vectors"""
 
+    max_concurrency: int = 8
+    """Maximum number of embedding calls in flight for a list of documents"""
+
+    max_batch_size: Optional[int] = None
+    """Maximum number of texts per call, capped by the provider maximum; one text per call
+    for providers without batch support, e.g. amazon"""
+
+    max_batch_bytes: int = 256 * 1024
+    """Maximum size in bytes of the texts of a call"""
+
+    _executor: EmbeddingExecutor = PrivateAttr()
+
     model_config = ConfigDict(
         arbitrary_types_allowed=True, extra="forbid", protected_namespaces=()
     )
 
+    def model_post_init(self, __context: Any) -> None:
+        self._executor = EmbeddingExecutor(max_concurrency=self.max_concurrency)
+
+    @property
+    def executor_stats(self) -> EmbeddingExecutorStats:
+        """Statistics of the last list of documents embedded."""
+        return self._executor.stats
+
     def _embedding_func(self, text: str, **kwargs: Any) -> List[float]:
         """Call out to Bedrock embedding endpoint."""
+        return self._embedding_func_batch([text], **kwargs)[0]
+
+    def _embedding_func_batch(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        """Call out to Bedrock embedding endpoint with a batch of texts, a single one for providers without batch support."""
         # replace newlines, which can negatively affect performance.
-        text = text.replace(os.linesep, " ")
+        texts = [text.replace(os.linesep, " ") for text in texts]
 
         # format input body for provider
         _model_kwargs = self.model_kwargs or {}
         input_body = {**_model_kwargs}
         if self.model_provider == "cohere":
             input_body["input_type"] = kwargs.get("input_type") or input_body.get("input_type") or "search_document"
-            input_body["texts"] = [text]
+            input_body["texts"] = texts
         else:
             # includes common provider == "amazon"
-            input_body["inputText"] = text
+            if len(texts) != 1:
+                raise ValueError(f"Provider {self.model_provider} embeds a single text per call")
+            input_body["inputText"] = texts[0]
         body = json.dumps(input_body)
 
         try:
@@ -73,10 +104,15 @@ class BedrockEmbeddings(BaseModel, Embeddings):
             # format output based on provider
             response_body = json.loads(response.get("body").read())
             if self.model_provider == "cohere":
-                return response_body.get("embeddings")[0]  # type: ignore
+                return response_body.get("embeddings")  # type: ignore
             else:
                 # includes common provider == "amazon"
-                return response_body.get("embedding")  # type: ignore
+                return [response_body.get("embedding")]
+        except ClientError as e:
+            # Throttling errors are retried by the executor
+            if is_throttling_error(e):
+                raise
+            raise ValueError(f"Error raised by inference endpoint: {e}")  # noqa: B904
         except Exception as e:
             raise ValueError(f"Error raised by inference endpoint: {e}")  # noqa: B904
 
@@ -97,20 +133,40 @@ class BedrockEmbeddings(BaseModel, Embeddings):
         -------
             List of embeddings, one for each text.
         """
-        results = []
+        return list(self.iter_embed_documents(texts))
+
+    def iter_embed_documents(self, texts: List[str]) -> Iterator[List[float]]:
+        """Compute doc embeddings with up to `max_concurrency` calls in flight.
+
+        Args:
+        ----
+            texts: The list of texts to embed
+
+        Returns:
+        -------
+            Iterator over the embeddings, in the order of the texts, yielding each
+            one as soon as it and the previous ones are computed.
+        """
         kwargs = {}
         if self.model_provider == "cohere":
             kwargs["input_type"] = "search_document"
 
-        for text in texts:
-            response = self._embedding_func(text, **kwargs)
-
+        def embed(batch: List[str]) -> List[List[float]]:
+            embeddings = self._embedding_func_batch(batch, **kwargs)
             if self.normalize:
-                response = self._normalize_vector(response)
+                embeddings = [self._normalize_vector(embedding) for embedding in embeddings]
+            return embeddings
 
-            results.append(response)
+        for embeddings in self._executor.map(embed, self._batch_texts(texts), count=len):
+            yield from embeddings
 
-        return results
+    def _batch_texts(self, texts: List[str]) -> List[List[str]]:
+        """Pack consecutive texts into batches capped by the batch size and payload size of a call."""
+        max_batch_size = PROVIDER_MAX_BATCH_SIZE.get(self.model_provider, 1)
+        if self.max_batch_size:
+            max_batch_size = min(max_batch_size, self.max_batch_size)
+
+        return batch_texts(texts, max_batch_size, self.max_batch_bytes)
 
     def embed_query(self, text: str) -> List[float]:
         """Compute query embeddings using a Bedrock model.
@@ -157,9 +213,8 @@ class BedrockEmbeddings(BaseModel, Embeddings):
         -------
             List of embeddings, one for each text.
         """
-        result = await asyncio.gather(*[self.aembed_query(text) for text in texts])
-
-        return list(result)
+        # The executor bounds the calls in flight, unlike gathering one task per text
+        return await run_in_executor(None, self.embed_documents, texts)
 
     @property
     def model_provider(self) -> str:
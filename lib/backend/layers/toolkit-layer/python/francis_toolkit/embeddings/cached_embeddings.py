@@ -0,0 +1,198 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Content-addressed cache of embeddings, shared by the ingestion pipeline and the corpus API."""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of keys of a DynamoDB BatchGetItem call
+_BATCH_GET_MAX_KEYS = 100
+
+
+class EmbeddingCacheStore:
+    """Embedding vectors keyed by string, in an in-memory LRU in front of an optional DynamoDB table.
+
+    Vectors are stored as float32 blobs, with an expiresAt attribute for the TTL of the table.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: int = 30 * 24 * 3600,
+        dynamodb: Optional[Any] = None,
+        table_name: Optional[str] = None,
+    ) -> None:
+        """Initialize the store.
+
+        Args:
+        ----
+            max_entries: Maximum number of vectors of the in-memory tier.
+            ttl_seconds: Lifetime of a vector in the table.
+            dynamodb: DynamoDB service resource. (default: None)
+            table_name: Name of the DynamoDB table; in-memory only when not set. (default: None)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return the vectors found for the keys."""
+        found: Dict[str, bytes] = {}
+        missing: List[str] = []
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                else:
+                    missing.append(key)
+
+        if missing and self.table_name:
+            try:
+                remote = self._batch_get(missing)
+            except ClientError as e:
+                logger.warning(f"Error reading the embedding cache: {e.response['Error']['Code']}")
+                remote = {}
+            self._put_local(remote)
+            found.update(remote)
+
+        return {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in found.items()}
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Store the vectors."""
+        blobs = {key: np.asarray(vector, dtype=np.float32).tobytes() for key, vector in vectors.items()}
+        self._put_local(blobs)
+
+        if not blobs or not self.table_name:
+            return
+
+        expires_at = int(time.time()) + self.ttl_seconds
+        try:
+            with self.dynamodb.Table(self.table_name).batch_writer(overwrite_by_pkeys=["PK"]) as batch:
+                for key, blob in blobs.items():
+                    batch.put_item(Item={"PK": key, "embedding": blob, "expiresAt": expires_at})
+        except ClientError as e:
+            logger.warning(f"Error writing the embedding cache: {e.response['Error']['Code']}")
+
+    def _batch_get(self, keys: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        for start in range(0, len(keys), _BATCH_GET_MAX_KEYS):
+            request: Optional[dict] = {
+                self.table_name: {
+                    "Keys": [{"PK": key} for key in keys[start : start + _BATCH_GET_MAX_KEYS]],
+                    "ProjectionExpression": "PK, embedding",
+                }
+            }
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response["Responses"].get(self.table_name, []):
+                    found[item["PK"]] = item["embedding"].value
+                request = response.get("UnprocessedKeys")
+        return found
+
+    def _put_local(self, blobs: Dict[str, bytes]) -> None:
+        with self._lock:
+            for key, blob in blobs.items():
+                self._entries[key] = blob
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Cache hits and misses of the last list of documents embedded."""
+
+    hits: int = 0
+    misses: int = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper looking vectors up by content before calling the underlying model.
+
+    Keys are made of the model id, the dimensions, the normalize flag, the kind of
+    input (document or query, which some providers embed differently) and the
+    SHA-256 of the text, so an unchanged chunk is never embedded twice by the same
+    model, whether it comes from the ingestion pipeline or the corpus API.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        store: EmbeddingCacheStore,
+        model_id: str,
+        dimensions: int,
+        normalize: bool = False,
+    ) -> None:
+        self.underlying = underlying
+        self.store = store
+        self.namespace = f"{model_id}#{dimensions}#{int(normalize)}"
+        self.cache_stats = EmbeddingCacheStats()
+
+    @property
+    def executor_stats(self) -> Any:
+        """Statistics of the underlying embedding calls, when the underlying model reports them."""
+        return getattr(self.underlying, "executor_stats", None)
+
+    def _key(self, kind: str, text: str) -> str:
+        return f"{self.namespace}#{kind}#{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return list(self.iter_embed_documents(texts))
+
+    def iter_embed_documents(self, texts: List[str]) -> Iterator[List[float]]:
+        """Yield the embedding of each text in order, embedding the texts not found in the cache.
+
+        Duplicated texts are embedded once. When the underlying model streams its
+        results, cached and new embeddings are yielded as they become available.
+        """
+        keys = [self._key("document", text) for text in texts]
+        vectors = self.store.get_many(set(keys))
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts, strict=True):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        self.cache_stats = EmbeddingCacheStats(hits=len(texts) - len(missing), misses=len(missing))
+
+        new_embeddings: Iterator[List[float]] = iter(())
+        if missing:
+            if hasattr(self.underlying, "iter_embed_documents"):
+                new_embeddings = self.underlying.iter_embed_documents(list(missing.values()))
+            else:
+                new_embeddings = iter(self.underlying.embed_documents(list(missing.values())))
+        missing_keys = iter(missing)
+        new_vectors: Dict[str, List[float]] = {}
+
+        try:
+            for key in keys:
+                # Misses are embedded in the order of their first occurrence
+                while key not in vectors:
+                    new_key = next(missing_keys)
+                    vectors[new_key] = new_vectors[new_key] = next(new_embeddings)
+                yield vectors[key]
+        finally:
+            self.store.put_many(new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key("query", text)
+        cached = self.store.get_many([key])
+        if key in cached:
+            return cached[key]
+
+        embedding = self.underlying.embed_query(text)
+        self.store.put_many({key: embedding})
+        return embedding
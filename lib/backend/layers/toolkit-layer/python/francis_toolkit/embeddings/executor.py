@@ -0,0 +1,188 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Bounded-concurrency executor of embedding calls."""
+
+import logging
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+
+# Characters per token used to estimate the number of tokens of a text
+_CHARACTERS_PER_TOKEN = 4
+
+
+def is_throttling_error(exception: BaseException) -> bool:
+    return isinstance(exception, ClientError) and exception.response["Error"]["Code"] in THROTTLING_ERROR_CODES
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARACTERS_PER_TOKEN + 1
+
+
+def batch_texts(
+    texts: List[str],
+    max_batch_size: int,
+    max_batch_bytes: int,
+    max_batch_tokens: Optional[int] = None,
+    text_bytes: Callable[[str], int] = lambda text: len(text.encode("utf-8")),
+) -> List[List[str]]:
+    """Pack consecutive texts into batches capped by number of texts, payload bytes and estimated tokens.
+
+    A text exceeding a cap on its own gets a batch of its own.
+    """
+    batches: List[List[str]] = []
+    batch_bytes = batch_tokens = 0
+    for text in texts:
+        size = text_bytes(text)
+        tokens = estimate_tokens(text) if max_batch_tokens else 0
+        if (
+            not batches
+            or len(batches[-1]) >= max_batch_size
+            or batch_bytes + size > max_batch_bytes
+            or (max_batch_tokens and batch_tokens + tokens > max_batch_tokens)
+        ):
+            batches.append([])
+            batch_bytes = batch_tokens = 0
+        batches[-1].append(text)
+        batch_bytes += size
+        batch_tokens += tokens
+
+    return batches
+
+
+@dataclass
+class EmbeddingExecutorStats:
+    """Statistics of the last `EmbeddingExecutor.map` run."""
+
+    items: int = 0
+    calls: int = 0
+    seconds: float = 0.0
+    throttles: int = 0
+    concurrency: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Embedded items per second."""
+        return self.items / self.seconds if self.seconds else 0.0
+
+
+class EmbeddingExecutor:
+    """Run embedding calls on a thread pool with an adaptive limit of calls in flight.
+
+    The limit starts at `max_concurrency`. Each throttling error halves it and
+    schedules a retry of the item after an exponential backoff with jitter; each run
+    of `max_concurrency` successful calls raises it by one again.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_retries: int = 8,
+        base_backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 20.0,
+        is_throttling: Callable[[BaseException], bool] = is_throttling_error,
+    ) -> None:
+        """Initialize the executor.
+
+        Args:
+        ----
+            max_concurrency: Maximum number of calls in flight.
+            max_retries: Maximum number of retries of an item after throttling errors.
+            base_backoff_seconds: Backoff before the first retry, doubled for each retry.
+            max_backoff_seconds: Maximum backoff before a retry.
+            is_throttling: Whether an exception raised by a call is a throttling error.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.is_throttling = is_throttling
+        self.stats = EmbeddingExecutorStats()
+
+    def map(self, func: Callable[[T], R], items: Sequence[T], count: Callable[[T], int] = lambda item: 1) -> Iterator[R]:
+        """Apply `func` to the items concurrently, yielding the results in the order of the items.
+
+        Results are yielded as soon as all the previous ones are available, so callers
+        can consume them while later calls are still in flight. Errors other than
+        throttling, and throttling errors of an item out of retries, are raised.
+        `count` returns the number of embedded texts of an item, for batched calls.
+        """
+        start_time = time.perf_counter()
+        self.stats = EmbeddingExecutorStats(concurrency=self.max_concurrency)
+        if not items:
+            return
+
+        limit = self.max_concurrency
+        successes = 0
+        resume_at = 0.0
+        attempts: Dict[int, int] = {}
+        pending = deque(range(len(items)))
+        in_flight: Dict[Future, int] = {}
+        results: Dict[int, R] = {}
+        next_index = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            while next_index < len(items):
+                now = time.monotonic()
+                if now >= resume_at:
+                    while pending and len(in_flight) < limit:
+                        index = pending.popleft()
+                        in_flight[pool.submit(func, items[index])] = index
+
+                if not in_flight:
+                    # Nothing to wait on until the backoff ends, and wait() returns at once without futures
+                    time.sleep(max(0.0, resume_at - now))
+                    continue
+
+                timeout = max(0.0, resume_at - now) if pending and now < resume_at else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index = in_flight.pop(future)
+                    exception = future.exception()
+                    if exception is None:
+                        results[index] = future.result()
+                        successes += 1
+                        if successes >= self.max_concurrency and limit < self.max_concurrency:
+                            limit += 1
+                            successes = 0
+                        continue
+
+                    attempts[index] = attempts.get(index, 0) + 1
+                    if not self.is_throttling(exception) or attempts[index] > self.max_retries:
+                        for other in in_flight:
+                            other.cancel()
+                        raise exception
+
+                    self.stats.throttles += 1
+                    successes = 0
+                    limit = max(1, limit // 2)
+                    backoff = min(self.max_backoff_seconds, self.base_backoff_seconds * 2 ** (attempts[index] - 1))
+                    # No call is submitted before the backoff ends; retried items go first so results keep flowing in order
+                    resume_at = max(resume_at, time.monotonic() + random.uniform(backoff / 2, backoff))
+                    pending.appendleft(index)
+                    logger.info(f"Throttled, retrying in up to {backoff:.1f}s with {limit} calls in flight")
+
+                while next_index in results:
+                    self.stats.items += count(items[next_index])
+                    self.stats.calls += 1
+                    self.stats.seconds = time.perf_counter() - start_time
+                    self.stats.concurrency = limit
+                    yield results.pop(next_index)
+                    next_index += 1
+
+    def run(self, func: Callable[[T], R], items: Sequence[T]) -> List[R]:
+        """Apply `func` to the items concurrently and return the results in the order of the items."""
+        return list(self.map(func, items))
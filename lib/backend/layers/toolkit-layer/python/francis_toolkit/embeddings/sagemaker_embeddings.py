@@ -5,14 +5,27 @@ from abc import abstractmethod
 from typing import Any, Dict, Generic, Iterator, List, Optional, TypeVar, Union
 
 from aws_lambda_powertools import Logger
+from botocore.exceptions import ClientError
 from langchain_core.embeddings import Embeddings
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from .executor import THROTTLING_ERROR_CODES, EmbeddingExecutor, EmbeddingExecutorStats, batch_texts
 
 INPUT_TYPE = TypeVar("INPUT_TYPE", bound=Union[str, List[str]])
 OUTPUT_TYPE = TypeVar("OUTPUT_TYPE", bound=Union[str, List[List[float]], Iterator])
 
 logger = Logger()
 
+# Errors of a batch retried on its own, after a backoff: throttling and unavailable model instances
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | {"ModelNotReadyException", "ServiceUnavailable", "InternalFailure"}
+
+# Payload limit of a SageMaker real-time endpoint invocation
+MAX_PAYLOAD_BYTES = 6 * 1024 * 1024
+
+
+def is_retryable_error(exception: BaseException) -> bool:
+    return isinstance(exception, ClientError) and exception.response["Error"]["Code"] in RETRYABLE_ERROR_CODES
+
 
 class ContentHandlerBase(Generic[INPUT_TYPE, OUTPUT_TYPE]):
     """Handler class to transform input from LLM to a
@@ -126,10 +139,32 @@ class SagemakerEndpointEmbeddings(BaseModel, Embeddings):
     .. _boto3: <https://boto3.amazonaws.com/v1/documentation/api/latest/index.html>
     """
 
+    max_concurrency: int = 4
+    """Maximum number of invoke_endpoint calls in flight for a list of documents"""
+
+    max_batch_size: int = 64
+    """Maximum number of texts per call"""
+
+    max_batch_tokens: int = 16384
+    """Maximum number of tokens per call, estimated from the length of the texts"""
+
+    max_batch_bytes: int = MAX_PAYLOAD_BYTES // 2
+    """Maximum size in bytes of the JSON encoded texts of a call, kept below the payload limit"""
+
+    _executor: EmbeddingExecutor = PrivateAttr()
+
     model_config = ConfigDict(
         arbitrary_types_allowed=True, extra="forbid", protected_namespaces=()
     )
 
+    def model_post_init(self, __context: Any) -> None:
+        self._executor = EmbeddingExecutor(max_concurrency=self.max_concurrency, is_throttling=is_retryable_error)
+
+    @property
+    def executor_stats(self) -> EmbeddingExecutorStats:
+        """Statistics of the last list of documents embedded."""
+        return self._executor.stats
+
     def _embedding_func(self, texts: List[str]) -> List[List[float]]:
         """Call out to SageMaker Inference embedding endpoint."""
         # replace newlines, which can negatively affect performance.
@@ -150,32 +185,58 @@ class SagemakerEndpointEmbeddings(BaseModel, Embeddings):
                 Accept=accepts,
                 **_endpoint_kwargs,
             )
+        except ClientError as e:
+            # Retryable errors are retried by the executor, for this batch only
+            if is_retryable_error(e):
+                raise
+            raise ValueError(f"Error raised by inference endpoint: {e}")  # noqa: B904
         except Exception as e:
             raise ValueError(f"Error raised by inference endpoint: {e}")  # noqa: B904
 
         return self.content_handler.transform_output(response["Body"])
 
-    def embed_documents(self, texts: List[str], chunk_size: int = 64) -> List[List[float]]:
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> List[List[float]]:
         """Compute doc embeddings using a SageMaker Inference Endpoint.
 
         Args:
         ----
             texts: The list of texts to embed.
-            chunk_size: The chunk size defines how many input texts will
-                be grouped together as request. If None, will use the
-                chunk size specified by the class.
+            chunk_size: The maximum number of input texts grouped together
+                in a request. If None, will use the max_batch_size of the class.
 
 
         Returns:
         -------
             List of embeddings, one for each text.
         """
-        results = []
-        _chunk_size = len(texts) if chunk_size > len(texts) else chunk_size
-        for i in range(0, len(texts), _chunk_size):
-            response = self._embedding_func(texts[i : i + _chunk_size])
-            results.extend(response)
-        return results
+        return list(self.iter_embed_documents(texts, chunk_size=chunk_size))
+
+    def iter_embed_documents(self, texts: List[str], chunk_size: Optional[int] = None) -> Iterator[List[float]]:
+        """Compute doc embeddings with up to `max_concurrency` requests in flight.
+
+        Texts are packed into batches capped by number of texts, estimated tokens
+        and payload bytes, so that long texts do not exceed the endpoint limits.
+
+        Args:
+        ----
+            texts: The list of texts to embed.
+            chunk_size: The maximum number of input texts grouped together
+                in a request. If None, will use the max_batch_size of the class.
+
+        Returns:
+        -------
+            Iterator over the embeddings, in the order of the texts, yielding each
+            one as soon as it and the previous ones are computed.
+        """
+        batches = batch_texts(
+            texts,
+            max_batch_size=chunk_size or self.max_batch_size,
+            max_batch_bytes=self.max_batch_bytes,
+            max_batch_tokens=self.max_batch_tokens,
+            text_bytes=lambda text: len(json.dumps(text)),
+        )
+        for embeddings in self._executor.map(self._embedding_func, batches, count=len):
+            yield from embeddings
 
     def embed_query(self, text: str) -> List[float]:
         """Compute query embeddings using a SageMaker inference endpoint.
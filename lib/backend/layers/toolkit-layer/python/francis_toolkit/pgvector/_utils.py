@@ -42,33 +42,52 @@ def cosine_similarity(X: Matrix, Y: Matrix) -> np.ndarray:
         return similarity
 
 
+def _normalize_rows(X: np.ndarray) -> np.ndarray:
+    """Scale the rows of X to unit norm, leaving zero rows at zero."""
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = X / norms
+    normalized[~np.isfinite(normalized)] = 0.0
+    return normalized
+
+
 def maximal_marginal_relevance(
     query_embedding: np.ndarray,
-    embedding_list: list,
+    embedding_list: Matrix,
     lambda_mult: float = 0.5,
     k: int = 4,
 ) -> List[int]:
-    """Calculate maximal marginal relevance."""
+    """Calculate maximal marginal relevance.
+
+    The embeddings are normalized once, in float32. The maximum similarity of each
+    candidate to the selected set is kept up to date with one matrix-vector product
+    per selected embedding, so selecting k out of n candidates costs O(k·n·d).
+    """
     if min(k, len(embedding_list)) <= 0:
         return []
-    if query_embedding.ndim == 1:
-        query_embedding = np.expand_dims(query_embedding, axis=0)
-    similarity_to_query = cosine_similarity(query_embedding, embedding_list)[0]
-    most_similar = int(np.argmax(similarity_to_query))
-    idxs = [most_similar]
-    selected = np.array([embedding_list[most_similar]])
-    while len(idxs) < min(k, len(embedding_list)):
-        best_score = -np.inf
-        idx_to_add = -1
-        similarity_to_selected = cosine_similarity(embedding_list, selected)
-        for i, query_score in enumerate(similarity_to_query):
-            if i in idxs:
-                continue
-            redundant_score = max(similarity_to_selected[i])
-            equation_score = lambda_mult * query_score - (1 - lambda_mult) * redundant_score
-            if equation_score > best_score:
-                best_score = equation_score
-                idx_to_add = i
+
+    embeddings = _normalize_rows(np.asarray(embedding_list, dtype=np.float32))
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    if embeddings.shape[1] != query.shape[0]:
+        raise ValueError(
+            f"Query embedding has {query.shape[0]} dimensions but the embeddings have {embeddings.shape[1]} dimensions."
+        )
+
+    similarity_to_query = embeddings @ query
+    max_similarity_to_selected = np.full(len(embeddings), -np.inf, dtype=np.float32)
+    selected_mask = np.zeros(len(embeddings), dtype=bool)
+
+    idx_to_add = int(np.argmax(similarity_to_query))
+    idxs = [idx_to_add]
+    while True:
+        selected_mask[idx_to_add] = True
+        if len(idxs) == min(k, len(embeddings)):
+            break
+
+        np.maximum(max_similarity_to_selected, embeddings @ embeddings[idx_to_add], out=max_similarity_to_selected)
+        equation_scores = lambda_mult * similarity_to_query - (1 - lambda_mult) * max_similarity_to_selected
+        equation_scores[selected_mask] = -np.inf
+        idx_to_add = int(np.argmax(equation_scores))
         idxs.append(idx_to_add)
-        selected = np.append(selected, [embedding_list[idx_to_add]], axis=0)
+
     return idxs
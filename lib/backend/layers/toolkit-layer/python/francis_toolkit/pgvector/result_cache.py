@@ -0,0 +1,133 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Cache of vector search results, invalidated by the generation of the collection."""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from botocore.exceptions import ClientError
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# (page_content, metadata, score) of each result, so cached entries are never shared with callers
+CachedResults = List[Tuple[str, Any, float]]
+
+
+class RetrievalResultCache:
+    """Two-tier cache of similarity search results.
+
+    The first tier is an in-memory LRU of the warm container, the optional second
+    tier a DynamoDB table shared by all containers. Keys include the generation of
+    the collection, bumped by each ingestion, so entries of a previous corpus are
+    never hit again and expire with their TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: int = 3600,
+        generation_ttl_seconds: int = 30,
+        table: Optional[Any] = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+        ----
+            max_entries: Maximum number of entries of the in-memory tier.
+            ttl_seconds: Lifetime of an entry in both tiers.
+            generation_ttl_seconds: How long the generation of a collection is reused
+                before being read again, bounding how long stale results can be served.
+            table: DynamoDB Table resource of the shared tier. (default: None)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation_ttl_seconds = generation_ttl_seconds
+        self.table = table
+        self._entries: "OrderedDict[str, Tuple[float, CachedResults]]" = OrderedDict()
+        self._generations: Dict[uuid.UUID, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_generation(self, collection_uuid: uuid.UUID, load: Callable[[], int]) -> int:
+        """Return the generation of the collection, loading it at most once per generation TTL."""
+        cached = self._generations.get(collection_uuid)
+        if cached and time.monotonic() - cached[0] < self.generation_ttl_seconds:
+            return cached[1]
+
+        generation = load()
+        self._generations[collection_uuid] = (time.monotonic(), generation)
+        return generation
+
+    @staticmethod
+    def make_key(
+        collection_uuid: uuid.UUID,
+        generation: int,
+        embedding: List[float],
+        k: int,
+        threshold: Optional[float] = None,
+        filter: Optional[dict] = None,
+    ) -> str:
+        """Build the key of a search.
+
+        The query embedding is quantized to float16, so the same question embedded
+        twice maps to the same key despite floating point noise.
+        """
+        digest = hashlib.sha256(np.asarray(embedding, dtype=np.float16).tobytes())
+        digest.update(json.dumps([k, threshold, filter], sort_keys=True, default=str).encode("utf-8"))
+        return f"{collection_uuid}#{generation}#{digest.hexdigest()}"
+
+    def get(self, key: str) -> Optional[List[Tuple[Document, float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return self._to_docs_and_scores(entry[1])
+
+        if self.table is None:
+            return None
+
+        try:
+            item = self.table.get_item(Key={"PK": key}).get("Item")
+        except ClientError as e:
+            logger.warning(f"Error reading the retrieval cache: {e.response['Error']['Code']}")
+            return None
+
+        if not item or int(item["expiresAt"]) <= time.time():
+            return None
+
+        results: CachedResults = [tuple(result) for result in json.loads(item["results"])]  # type: ignore[misc]
+        self._put_local(key, int(item["expiresAt"]), results)
+        return self._to_docs_and_scores(results)
+
+    def put(self, key: str, docs_and_scores: List[Tuple[Document, float]]) -> None:
+        expires_at = int(time.time()) + self.ttl_seconds
+        results = [(doc.page_content, json.loads(json.dumps(doc.metadata)), float(score)) for doc, score in docs_and_scores]
+        self._put_local(key, expires_at, results)
+
+        if self.table is None:
+            return
+
+        try:
+            self.table.put_item(Item={"PK": key, "results": json.dumps(results), "expiresAt": expires_at})
+        except ClientError as e:
+            logger.warning(f"Error writing the retrieval cache: {e.response['Error']['Code']}")
+
+    def _put_local(self, key: str, expires_at: float, results: CachedResults) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _to_docs_and_scores(results: CachedResults) -> List[Tuple[Document, float]]:
+        return [
+            (Document(page_content=page_content, metadata=json.loads(json.dumps(metadata))), score)
+            for page_content, metadata, score in results
+        ]
@@ -4,13 +4,23 @@
 from __future__ import annotations
 
 import enum
+import functools
+import io
+import itertools
+import json
 import logging
+import math
+import struct
+import time
 import uuid
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncIterator,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
     Tuple,
@@ -21,9 +31,12 @@ from typing import (
 import numpy as np
 import sqlalchemy
 from sqlalchemy import SQLColumnExpression, cast, delete, func, update
-from sqlalchemy.dialects.postgresql import JSON, JSONB, JSONPATH, UUID, insert
+from sqlalchemy.dialects.postgresql import ARRAY, JSON, JSONB, JSONPATH, TSVECTOR, UUID, insert
 from sqlalchemy.orm import Session, relationship, sessionmaker
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
 try:
     from sqlalchemy.orm import declarative_base
 except ImportError:
@@ -35,7 +48,9 @@ from langchain_core.runnables.config import run_in_executor
 from langchain_core.utils import get_from_dict_or_env
 from langchain_core.vectorstores import VectorStore
 
+from ..types import HybridSearchConfig, VectorIndexConfig
 from ._utils import maximal_marginal_relevance
+from .result_cache import RetrievalResultCache
 
 
 class DistanceStrategy(str, enum.Enum):
@@ -55,6 +70,50 @@ class DocumentStatus(str, enum.Enum):
 
 DEFAULT_DISTANCE_STRATEGY = DistanceStrategy.COSINE
 
+# pgvector operator classes backing an ANN index for each distance strategy
+INDEX_OPERATOR_CLASSES = {
+    DistanceStrategy.EUCLIDEAN: "vector_l2_ops",
+    DistanceStrategy.COSINE: "vector_cosine_ops",
+    DistanceStrategy.MAX_INNER_PRODUCT: "vector_ip_ops",
+}
+
+# Operator classes of the index over the quantized embeddings; binary quantized vectors are compared by Hamming distance
+QUANTIZED_INDEX_OPERATOR_CLASSES = {
+    "halfvec": {
+        DistanceStrategy.EUCLIDEAN: "halfvec_l2_ops",
+        DistanceStrategy.COSINE: "halfvec_cosine_ops",
+        DistanceStrategy.MAX_INNER_PRODUCT: "halfvec_ip_ops",
+    },
+    "binary": {
+        DistanceStrategy.EUCLIDEAN: "bit_hamming_ops",
+        DistanceStrategy.COSINE: "bit_hamming_ops",
+        DistanceStrategy.MAX_INNER_PRODUCT: "bit_hamming_ops",
+    },
+}
+
+DISTANCE_OPERATORS = {
+    DistanceStrategy.EUCLIDEAN: "<->",
+    DistanceStrategy.COSINE: "<=>",
+    DistanceStrategy.MAX_INNER_PRODUCT: "<#>",
+}
+_HAMMING_DISTANCE_OPERATOR = "<~>"
+
+# Default hnsw.ef_search of pgvector; an HNSW scan never returns more rows than this
+_DEFAULT_HNSW_EF_SEARCH = 40
+_MAX_HNSW_EF_SEARCH = 1000
+
+# Text search configuration of the generated document_tsv column and of the queries run against it
+TEXT_SEARCH_CONFIG = "english"
+_DOCUMENT_TSV_EXPRESSION = f"to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(document, ''))"
+
+# Unlogged table the bulk loader copies rows into before merging them into the embeddings table
+STAGING_TABLE_NAME = "pg_embedding_staging"
+DEFAULT_BULK_LOAD_BATCH_SIZE = 500
+
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack("!h", -1)
+_STAGING_COLUMNS = ("batch_id", "id", "collection_id", "embedding", "document", "document_source_uri", "cmetadata")
+
 Base = declarative_base()  # type: Any
 
 
@@ -94,8 +153,6 @@ def _get_embedding_collection_store(vector_dimension: Optional[int] = None) -> A
     if _classes is not None:
         return _classes
 
-    from pgvector.sqlalchemy import Vector
-
     class CollectionStore(Base):
         """Collection store."""
 
@@ -104,6 +161,8 @@ def _get_embedding_collection_store(vector_dimension: Optional[int] = None) -> A
         uuid = sqlalchemy.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
         name = sqlalchemy.Column(sqlalchemy.String, nullable=False, unique=True)
         cmetadata = sqlalchemy.Column(JSON)
+        # Bumped after each ingestion into the collection, invalidating cached search results
+        generation = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, server_default="0")
 
         embeddings = relationship(
             "EmbeddingStore",
@@ -155,11 +214,12 @@ def _get_embedding_collection_store(vector_dimension: Optional[int] = None) -> A
         )
         collection = relationship(CollectionStore, back_populates="embeddings")
 
-        embedding: Vector = sqlalchemy.Column(Vector(vector_dimension))
+        embedding = sqlalchemy.Column(_vector_type(vector_dimension))
         document = sqlalchemy.Column(sqlalchemy.String, nullable=True)
         document_source_uri = sqlalchemy.Column(sqlalchemy.String, nullable=True, index=True)
         document_status = sqlalchemy.Column(sqlalchemy.String, nullable=True, index=True)
         cmetadata = sqlalchemy.Column(JSONB, nullable=True)
+        document_tsv = sqlalchemy.Column(TSVECTOR, sqlalchemy.Computed(_DOCUMENT_TSV_EXPRESSION, persisted=True))
 
         __table_args__ = (
             sqlalchemy.Index(
@@ -168,6 +228,11 @@ def _get_embedding_collection_store(vector_dimension: Optional[int] = None) -> A
                 postgresql_using="gin",
                 postgresql_ops={"cmetadata": "jsonb_path_ops"},
             ),
+            sqlalchemy.Index(
+                "ix_document_tsv_gin",
+                "document_tsv",
+                postgresql_using="gin",
+            ),
         )
 
     _classes = (EmbeddingStore, CollectionStore)
@@ -183,6 +248,120 @@ def _results_to_docs(docs_and_scores: Any) -> List[Document]:
 Connection = Union[sqlalchemy.engine.Engine, str]
 
 
+@functools.lru_cache(maxsize=None)
+def _binary_vector_class() -> Any:
+    from pgvector.sqlalchemy import Vector
+
+    class BinaryVector(Vector):
+        """pgvector type binding float32 arrays with psycopg, which the pgvector adapter sends in the binary format.
+
+        Other drivers bind the text representation of the vector.
+        """
+
+        cache_ok = True
+
+        def bind_processor(self, dialect: Any) -> Any:
+            if dialect.driver != "psycopg":
+                return super().bind_processor(dialect)
+
+            def process(value: Any) -> Any:
+                return None if value is None else np.asarray(value, dtype=np.float32)
+
+            return process
+
+    return BinaryVector
+
+
+def _vector_type(dimension: Optional[int] = None) -> Any:
+    return _binary_vector_class()(dimension)
+
+
+def _register_vector(dbapi_connection: Any, connection_record: Any) -> None:
+    from pgvector.psycopg import register_vector
+
+    register_vector(dbapi_connection)
+
+
+def register_vector_adapter(engine: sqlalchemy.engine.Engine) -> None:
+    """Register the pgvector psycopg adapter on each new connection of a psycopg engine.
+
+    The adapter dumps float32 arrays as binary vector parameters and loads vector
+    values as arrays. Other drivers need no adapter.
+    """
+    if engine.dialect.driver == "psycopg":
+        sqlalchemy.event.listen(engine, "connect", _register_vector)
+
+
+class _PgVectorType(sqlalchemy.types.UserDefinedType):
+    """pgvector type without a SQLAlchemy type in the pinned pgvector package (halfvec, bit)."""
+
+    cache_ok = True
+
+    def __init__(self, col_spec: str) -> None:
+        self.col_spec = col_spec
+
+    def get_col_spec(self, **kw: Any) -> str:
+        return self.col_spec
+
+
+def _copy_binary_field(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return struct.pack("!i", -1)
+    return struct.pack("!i", len(value)) + value
+
+
+def _copy_binary_vector(embedding: List[float]) -> bytes:
+    # pgvector binary format: dimensions (int16), unused (int16), then float4 values
+    return struct.pack(f"!hh{len(embedding)}f", len(embedding), 0, *embedding)
+
+
+def _copy_binary_rows(rows: Iterable[Tuple[Any, ...]]) -> Iterator[bytes]:
+    """Encode staging rows in the PostgreSQL binary COPY format."""
+    yield _COPY_BINARY_HEADER
+    for batch_id, id, collection_id, embedding, document, document_source_uri, cmetadata in rows:
+        yield b"".join(
+            (
+                struct.pack("!h", len(_STAGING_COLUMNS)),
+                _copy_binary_field(batch_id.bytes),
+                _copy_binary_field(id.encode("utf-8")),
+                _copy_binary_field(collection_id.bytes),
+                _copy_binary_field(_copy_binary_vector(embedding)),
+                _copy_binary_field(document.encode("utf-8")),
+                _copy_binary_field(document_source_uri.encode("utf-8") if document_source_uri is not None else None),
+                # jsonb binary format: version byte followed by the JSON text
+                _copy_binary_field(b"\x01" + json.dumps(cmetadata).encode("utf-8")),
+            )
+        )
+    yield _COPY_BINARY_TRAILER
+
+
+class _CopyStream(io.RawIOBase):
+    """Read-only stream over encoded COPY chunks, so rows are encoded while they are sent."""
+
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        self._chunks = chunks
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = chunk
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+async def _aiter_copy_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
 class PGVector(VectorStore):
     """Vectorstore implementation using Postgres as the backend.
 
@@ -226,6 +405,11 @@ class PGVector(VectorStore):
         use_jsonb: bool = True,
         create_extension: bool = False,
         create_tables: bool = False,
+        index_config: Optional[VectorIndexConfig] = None,
+        hybrid_search_config: Optional[HybridSearchConfig] = None,
+        bulk_load_batch_size: int = DEFAULT_BULK_LOAD_BATCH_SIZE,
+        async_connection: Optional[Union[str, AsyncEngine]] = None,
+        result_cache: Optional[RetrievalResultCache] = None,
     ) -> None:
         """Initialize the PGVector store.
 
@@ -235,9 +419,10 @@ class PGVector(VectorStore):
             embeddings: Any embedding function implementing
                 `langchain.embeddings.base.Embeddings` interface.
             embedding_length: The length of the embedding vector. (default: None)
-                NOTE: This is not mandatory. Defining it will prevent vectors of
-                any other size to be added to the embeddings table but, without it,
-                the embeddings can't be indexed.
+                NOTE: This is not mandatory. The embeddings table is shared by all
+                collections so its column is left untyped; when the length is set,
+                searches cast the column to it so that the collection ANN index
+                can be used. Without it, the embeddings can't be indexed.
             collection_name: The name of the collection to use. (default: langchain)
                 NOTE: This is not the name of the table, but the name of the collection.
                 The tables will be created when initializing the store (if not exists)
@@ -254,6 +439,18 @@ class PGVector(VectorStore):
             create_extension: If True, will create the vector extension if it
                 doesn't exist. disabling creation is useful when using ReadOnly
                 Databases.
+            index_config: ANN index (HNSW or IVFFlat) build parameters and
+                per-query recall settings for this collection. (default: None)
+            hybrid_search_config: When set, text queries run a full-text and a
+                vector search fused with reciprocal rank fusion. (default: None)
+            bulk_load_batch_size: Number of rows streamed by each COPY of
+                `add_embeddings` into the staging table. (default: 500)
+            async_connection: Postgres connection string of an async driver
+                (postgresql+asyncpg://...) or an AsyncEngine. When set, the async
+                methods run natively on it instead of running the sync methods in
+                a thread pool. (default: None)
+            result_cache: Cache of `similarity_search_with_score_by_vector` results,
+                keyed by the generation of the collection. (default: None)
         """
         self.embedding_function = embeddings
         self._embedding_length = embedding_length
@@ -263,9 +460,15 @@ class PGVector(VectorStore):
         self.pre_delete_collection = pre_delete_collection
         self.logger = logger or logging.getLogger(__name__)
         self.override_relevance_score_fn = relevance_score_fn
+        self.index_config = index_config
+        self.hybrid_search_config = hybrid_search_config
+        self.bulk_load_batch_size = bulk_load_batch_size
+        self.result_cache = result_cache
+        self._collection_uuid: Optional[uuid.UUID] = None
 
         if isinstance(connection, str):
             self._engine = sqlalchemy.create_engine(url=connection, **(engine_args or {}))
+            register_vector_adapter(self._engine)
         elif isinstance(connection, sqlalchemy.engine.Engine):
             self._engine = connection
         else:
@@ -273,6 +476,18 @@ class PGVector(VectorStore):
 
         self._session_maker = sessionmaker(bind=self._engine)
 
+        self._async_engine: Optional[AsyncEngine] = None
+        self._async_session_maker: Optional[Callable[[], AsyncSession]] = None
+        if async_connection is not None:
+            # sqlalchemy.ext.asyncio requires greenlet, so it is only imported when an async engine is used
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            if isinstance(async_connection, str):
+                self._async_engine = create_async_engine(url=async_connection, **(engine_args or {}))
+            else:
+                self._async_engine = async_connection
+            self._async_session_maker = async_sessionmaker(bind=self._async_engine, expire_on_commit=False)
+
         self.use_jsonb = use_jsonb
         self.create_extension = create_extension
         self.create_tables = create_tables
@@ -289,7 +504,7 @@ class PGVector(VectorStore):
         if self.create_extension:
             self.create_vector_extension()
 
-        EmbeddingStore, CollectionStore = _get_embedding_collection_store(self._embedding_length)
+        EmbeddingStore, CollectionStore = _get_embedding_collection_store()
         self.CollectionStore = CollectionStore
         self.EmbeddingStore = EmbeddingStore
 
@@ -324,15 +539,46 @@ class PGVector(VectorStore):
     def create_tables_if_not_exists(self) -> None:
         with self._session_maker() as session:
             Base.metadata.create_all(session.get_bind())
+            # Tables created before full-text search support lack the generated column and its index
+            table_name = self.EmbeddingStore.__tablename__
+            session.execute(
+                sqlalchemy.text(
+                    f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS document_tsv tsvector "
+                    f"GENERATED ALWAYS AS ({_DOCUMENT_TSV_EXPRESSION}) STORED"
+                )
+            )
+            session.execute(
+                sqlalchemy.text(f"CREATE INDEX IF NOT EXISTS ix_document_tsv_gin ON {table_name} USING gin (document_tsv)")
+            )
+            # Collections created before the result cache lack their generation counter
+            session.execute(
+                sqlalchemy.text(
+                    f"ALTER TABLE {self.CollectionStore.__tablename__} "
+                    "ADD COLUMN IF NOT EXISTS generation bigint NOT NULL DEFAULT 0"
+                )
+            )
+            session.execute(
+                sqlalchemy.text(
+                    f"CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE_NAME} ("
+                    "batch_id uuid NOT NULL, id varchar NOT NULL, collection_id uuid, embedding vector, "
+                    "document varchar, document_source_uri varchar, cmetadata jsonb)"
+                )
+            )
+            session.execute(
+                sqlalchemy.text(f"CREATE INDEX IF NOT EXISTS ix_{STAGING_TABLE_NAME}_batch_id ON {STAGING_TABLE_NAME} (batch_id)")
+            )
+            session.commit()
 
     def create_collection(self) -> None:
         if self.pre_delete_collection:
             self.delete_collection()
+        self._collection_uuid = None
         with self._session_maker() as session:
             self.CollectionStore.get_or_create(session, self.collection_name, cmetadata=self.collection_metadata)
 
     def delete_collection(self) -> None:
         self.logger.debug("Trying to delete collection")
+        self._collection_uuid = None
         with self._session_maker() as session:
             collection = self.get_collection(session)
             if not collection:
@@ -358,23 +604,311 @@ class PGVector(VectorStore):
             if ids is not None:
                 self.logger.debug("Trying to delete vectors by ids (represented by the model " "using the custom ids field)")
 
-                stmt = delete(self.EmbeddingStore)
+                collection_uuid = None
+                if collection_only:
+                    try:
+                        collection_uuid = self._get_collection_uuid(session)
+                    except ValueError:
+                        self.logger.warning("Collection not found")
+                        return
+
+                session.execute(self._delete_statement(ids, collection_uuid))
+            session.commit()
+
+    async def adelete(
+        self,
+        ids: Optional[List[str]] = None,
+        collection_only: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """Delete vectors by ids or uuids, natively on the async engine when there is one.
+
+        Args:
+        ----
+            ids: List of ids to delete.
+            collection_only: Only delete ids in the collection.
+        """
+        if self._async_session_maker is None:
+            return await run_in_executor(None, self.delete, ids, collection_only, **kwargs)
 
+        async with self._async_session_maker() as session:
+            if ids is not None:
+                collection_uuid = None
                 if collection_only:
-                    collection = self.get_collection(session)
-                    if not collection:
+                    try:
+                        collection_uuid = await self._aget_collection_uuid(session)
+                    except ValueError:
                         self.logger.warning("Collection not found")
                         return
 
-                    stmt = stmt.where(self.EmbeddingStore.collection_id == collection.uuid)
+                await session.execute(self._delete_statement(ids, collection_uuid))
+            await session.commit()
 
-                stmt = stmt.where(self.EmbeddingStore.id.in_(ids))
-                session.execute(stmt)
-            session.commit()
+    def _delete_statement(self, ids: List[str], collection_uuid: Optional[uuid.UUID] = None) -> Any:
+        stmt = delete(self.EmbeddingStore)
+        if collection_uuid is not None:
+            stmt = stmt.where(self.EmbeddingStore.collection_id == collection_uuid)
+        return stmt.where(self.EmbeddingStore.id.in_(ids))
 
     def get_collection(self, session: Session) -> Any:
         return self.CollectionStore.get_by_name(session, self.collection_name)
 
+    def _index_name(self, collection_uuid: uuid.UUID) -> str:
+        if self.index_config is None:
+            raise ValueError("index_config is required to manage the collection index")
+        quantization = f"{self.index_config.quantization}_" if self.index_config.quantization else ""
+        return f"ix_embedding_{self.index_config.indexType}_{self._distance_strategy.value}_{quantization}{collection_uuid.hex}"
+
+    def _execute_ddl(self, statement: str, autocommit: bool = False) -> None:
+        """Run a DDL statement, outside of a transaction block when `autocommit` is set.
+
+        CONCURRENTLY variants of CREATE/DROP/REINDEX cannot run inside a transaction.
+        """
+        with self._engine.connect() as connection:
+            if autocommit:
+                connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            connection.execute(sqlalchemy.text(statement))
+            connection.commit()
+
+    def _get_collection_uuid(self, session: Session) -> uuid.UUID:
+        """Return the collection UUID, resolving it by name only once per instance.
+
+        The cached value is reset by `create_collection` and `delete_collection`.
+        """
+        if self._collection_uuid is None:
+            collection = self.get_collection(session)
+            if not collection:
+                raise ValueError("Collection not found")
+            self._collection_uuid = collection.uuid
+        return self._collection_uuid
+
+    async def _aget_collection_uuid(self, session: AsyncSession) -> uuid.UUID:
+        """Async counterpart of `_get_collection_uuid`, sharing its cached value."""
+        if self._collection_uuid is None:
+            collection_uuid = (
+                await session.execute(
+                    sqlalchemy.select(self.CollectionStore.uuid).where(self.CollectionStore.name == self.collection_name)
+                )
+            ).scalar_one_or_none()
+            if collection_uuid is None:
+                raise ValueError("Collection not found")
+            self._collection_uuid = collection_uuid
+        return self._collection_uuid
+
+    def _get_collection_uuid_or_raise(self) -> uuid.UUID:
+        if self._collection_uuid is not None:
+            return self._collection_uuid
+        with self._session_maker() as session:
+            return self._get_collection_uuid(session)
+
+    def get_generation(self) -> int:
+        """Return the generation of the collection, bumped after each ingestion."""
+        collection_uuid = self._get_collection_uuid_or_raise()
+        with self._session_maker() as session:
+            return session.execute(
+                sqlalchemy.select(self.CollectionStore.generation).where(self.CollectionStore.uuid == collection_uuid)
+            ).scalar_one()
+
+    def bump_generation(self) -> int:
+        """Increment the generation of the collection, invalidating its cached search results.
+
+        Returns:
+        -------
+            The new generation.
+        """
+        collection_uuid = self._get_collection_uuid_or_raise()
+        with self._session_maker() as session:
+            generation = session.execute(
+                update(self.CollectionStore)
+                .where(self.CollectionStore.uuid == collection_uuid)
+                .values(generation=self.CollectionStore.generation + 1)
+                .returning(self.CollectionStore.generation)
+            ).scalar_one()
+            session.commit()
+        return generation
+
+    def create_index(self, concurrently: bool = False) -> None:
+        """Create the ANN index of the collection if it does not exist.
+
+        The index is a partial expression index over the active rows of the
+        collection, built with the operator class of the distance strategy.
+
+        Args:
+        ----
+            concurrently: Build the index without locking out writes.
+        """
+        if self.index_config is None:
+            raise ValueError("index_config is required to create the collection index")
+        if not self._embedding_length:
+            raise ValueError("embedding_length is required to create the collection index")
+
+        collection_uuid = self._get_collection_uuid_or_raise()
+
+        if self.index_config.indexType == "hnsw":
+            build_params = f"m = {int(self.index_config.m)}, ef_construction = {int(self.index_config.efConstruction)}"
+        else:
+            build_params = f"lists = {int(self.index_config.lists)}"
+
+        # The indexed expressions must match the ones built by embedding_column and quantized_distance
+        dimension = int(self._embedding_length)
+        if self.index_config.quantization == "halfvec":
+            index_expression = f"((embedding::vector({dimension}))::halfvec({dimension}))"
+        elif self.index_config.quantization == "binary":
+            index_expression = f"(binary_quantize(embedding::vector({dimension}))::bit({dimension}))"
+        else:
+            index_expression = f"(embedding::vector({dimension}))"
+
+        if self.index_config.quantization:
+            operator_class = QUANTIZED_INDEX_OPERATOR_CLASSES[self.index_config.quantization][self._distance_strategy]
+        else:
+            operator_class = INDEX_OPERATOR_CLASSES[self._distance_strategy]
+
+        statement = (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {self._index_name(collection_uuid)} "
+            f"ON {self.EmbeddingStore.__tablename__} USING {self.index_config.indexType} "
+            f"({index_expression} {operator_class}) "
+            f"WITH ({build_params}) "
+            f"WHERE collection_id = '{collection_uuid}' AND document_status = '{DocumentStatus.ACTIVE.value}'"
+        )
+        self.logger.info(f"Creating {self.index_config.indexType} index for collection {self.collection_name}")
+        self._execute_ddl(statement, autocommit=concurrently)
+
+    def drop_index(self, concurrently: bool = False) -> None:
+        """Drop the ANN index of the collection if it exists."""
+        collection_uuid = self._get_collection_uuid_or_raise()
+        statement = f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {self._index_name(collection_uuid)}"
+        self._execute_ddl(statement, autocommit=concurrently)
+
+    def rebuild_index(self, concurrently: bool = False) -> None:
+        """Rebuild the ANN index of the collection.
+
+        IVFFlat lists are trained on the rows present at build time, so the index
+        should be rebuilt once the collection has grown. To change the build
+        parameters, drop and create the index instead.
+        """
+        collection_uuid = self._get_collection_uuid_or_raise()
+        statement = f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{self._index_name(collection_uuid)}"
+        self._execute_ddl(statement, autocommit=concurrently)
+
+    def purge_inactive_embeddings(
+        self,
+        batch_size: int = 1000,
+        pause_seconds: float = 0.5,
+        max_duration_seconds: Optional[float] = None,
+    ) -> int:
+        """Delete the inactive embeddings of the collection in bounded batches.
+
+        Each batch is deleted and committed in its own transaction, with a pause in
+        between, so that row locks and WAL bursts stay short while ingestion and
+        searches run.
+
+        Args:
+        ----
+            batch_size: Maximum number of rows deleted per transaction.
+            pause_seconds: Pause between two batches.
+            max_duration_seconds: Stop starting new batches after this duration.
+                The remaining rows are purged by the next run. (default: None)
+
+        Returns:
+        -------
+            The number of deleted rows.
+        """
+        collection_uuid = self._get_collection_uuid_or_raise()
+        start_time = time.monotonic()
+        deleted = 0
+
+        while True:
+            with self._session_maker() as session:
+                inactive_ids = (
+                    sqlalchemy.select(self.EmbeddingStore.id)
+                    .where(
+                        self.EmbeddingStore.collection_id == collection_uuid,
+                        self.EmbeddingStore.document_status == DocumentStatus.INACTIVE.value,
+                    )
+                    .limit(batch_size)
+                    .scalar_subquery()
+                )
+                result = session.execute(delete(self.EmbeddingStore).where(self.EmbeddingStore.id.in_(inactive_ids)))
+                session.commit()
+
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+            if max_duration_seconds is not None and time.monotonic() - start_time >= max_duration_seconds:
+                self.logger.info(f"Stopping purge of collection {self.collection_name} after {deleted} rows")
+                break
+            time.sleep(pause_seconds)
+
+        return deleted
+
+    def vacuum(self, analyze: bool = True) -> None:
+        """Run VACUUM on the embeddings table, shared by all collections.
+
+        VACUUM cannot run inside a transaction block, so it runs in autocommit mode.
+        """
+        self._execute_ddl(
+            f"VACUUM {'(ANALYZE) ' if analyze else ''}{self.EmbeddingStore.__tablename__}",
+            autocommit=True,
+        )
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Return row counts of the collection and storage sizes of the embeddings table.
+
+        The table and its shared indexes hold every collection, so their sizes are
+        not per collection; `collection_index_bytes` is the size of the collection
+        ANN index, None when it does not exist.
+        """
+        collection_uuid = self._get_collection_uuid_or_raise()
+        table_name = self.EmbeddingStore.__tablename__
+        index_name = self._index_name(collection_uuid) if self.index_config is not None else None
+
+        with self._session_maker() as session:
+            counts = session.execute(
+                sqlalchemy.select(
+                    func.count().filter(self.EmbeddingStore.document_status.is_distinct_from(DocumentStatus.INACTIVE.value)),
+                    func.count().filter(self.EmbeddingStore.document_status == DocumentStatus.INACTIVE.value),
+                ).where(self.EmbeddingStore.collection_id == collection_uuid)
+            ).one()
+            sizes = session.execute(
+                sqlalchemy.text(
+                    "SELECT pg_table_size(CAST(:table_name AS regclass)), pg_indexes_size(CAST(:table_name AS regclass)), "
+                    "pg_relation_size(to_regclass(CAST(:index_name AS text)))"
+                ),
+                {"table_name": table_name, "index_name": index_name},
+            ).one()
+
+        return {
+            "collection_name": self.collection_name,
+            "live_rows": counts[0],
+            "inactive_rows": counts[1],
+            "table_bytes": sizes[0],
+            "indexes_bytes": sizes[1],
+            "collection_index_bytes": sizes[2],
+        }
+
+    def _search_params_statement(self, k: int) -> Optional[Any]:
+        """Return the statement applying the per-query recall settings of the collection index.
+
+        SET LOCAL only lasts until the end of the current transaction, so the
+        settings never leak onto other users of a pooled connection.
+        """
+        if self.index_config is None:
+            return None
+
+        if self.index_config.indexType == "hnsw":
+            # An HNSW scan returns at most ef_search rows, so it has to cover k
+            ef_search = min(max(self.index_config.efSearch or _DEFAULT_HNSW_EF_SEARCH, k), _MAX_HNSW_EF_SEARCH)
+            return sqlalchemy.text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+        elif self.index_config.probes:
+            return sqlalchemy.text(f"SET LOCAL ivfflat.probes = {int(self.index_config.probes)}")
+        return None
+
+    def _apply_search_params(self, session: Session, k: int) -> None:
+        """Apply the per-query recall settings of the collection index."""
+        statement = self._search_params_statement(k)
+        if statement is not None:
+            session.execute(statement)
+
     @classmethod
     def __from(
         cls,
@@ -414,10 +948,11 @@ class PGVector(VectorStore):
     def add_embeddings(
         self,
         texts: Iterable[str],
-        embeddings: List[List[float]],
+        embeddings: Iterable[List[float]],
         metadatas: Optional[List[dict]] = None,
         ids: Optional[List[str]] = None,
         document_source_uri: Optional[str] = None,
+        deactivate_source: bool = True,
         **kwargs: Any,
     ) -> List[str]:
         """Add embeddings to the vectorstore.
@@ -425,8 +960,12 @@ class PGVector(VectorStore):
         Args:
         ----
             texts: Iterable of strings to add to the vectorstore.
-            embeddings: List of list of embedding vectors.
+            embeddings: Embedding vectors of the texts. When an iterator, each batch
+                is loaded as soon as its embeddings are produced.
             metadatas: List of metadatas associated with the texts.
+            document_source_uri: Source of the texts, whose previous embeddings are replaced.
+            deactivate_source: Whether the previous embeddings of `document_source_uri` are made inactive,
+                false to append to them, e.g. when a source is loaded in several calls.
             kwargs: vectorstore specific parameters
         """
         if ids is None:
@@ -436,44 +975,227 @@ class PGVector(VectorStore):
             metadatas = [{} for _ in texts]
 
         with self._session_maker() as session:
-            collection = self.get_collection(session)
-            if not collection:
-                raise ValueError("Collection not found")
+            collection_uuid = self._get_collection_uuid(session)
 
-            if document_source_uri:
-                session.execute(
-                    update(self.EmbeddingStore)
-                    .where(self.EmbeddingStore.document_source_uri == document_source_uri)
-                    .values(document_status=DocumentStatus.INACTIVE.value)
-                )
+            if document_source_uri and deactivate_source:
+                session.execute(self._deactivate_source_statement(document_source_uri))
+
+            rows = zip(texts, metadatas, embeddings, ids, strict=True)
+            start_time = time.perf_counter()
+            row_count = 0
+
+            # COPY streams through the pg8000 or psycopg connection; other drivers fall back to batched INSERTs
+            use_copy = self._engine.dialect.driver in ("pg8000", "psycopg")
+
+            while batch := list(itertools.islice(rows, self.bulk_load_batch_size)):
+                if use_copy:
+                    self._bulk_load_batch(session, collection_uuid, batch, document_source_uri)
+                else:
+                    session.execute(self._insert_batch_statement(collection_uuid, batch, document_source_uri))
+                row_count += len(batch)
 
-            data = [
-                {
-                    "id": id,
-                    "collection_id": collection.uuid,
-                    "embedding": embedding,
-                    "document": text,
-                    "document_source_uri": document_source_uri,
-                    "document_status": DocumentStatus.ACTIVE.value,
-                    "cmetadata": metadata or {},
-                }
-                for text, metadata, embedding, id in zip(texts, metadatas, embeddings, ids)
-            ]
-            stmt = insert(self.EmbeddingStore).values(data)
-            on_conflict_stmt = stmt.on_conflict_do_update(
-                index_elements=["id"],
-                # Conflict detection based on these columns
-                set_={
-                    "embedding": stmt.excluded.embedding,
-                    "document": stmt.excluded.document,
-                    "cmetadata": stmt.excluded.cmetadata,
-                },
-            )
-            session.execute(on_conflict_stmt)
             session.commit()
 
+        self._log_load_rate(row_count, time.perf_counter() - start_time)
+
+        return ids
+
+    async def aadd_embeddings(
+        self,
+        texts: Iterable[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        document_source_uri: Optional[str] = None,
+        deactivate_source: bool = True,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Add embeddings to the vectorstore, natively on the async engine when there is one.
+
+        Args:
+        ----
+            texts: Iterable of strings to add to the vectorstore.
+            embeddings: List of list of embedding vectors.
+            metadatas: List of metadatas associated with the texts.
+            document_source_uri: Source of the texts, whose previous embeddings are replaced.
+            deactivate_source: Whether the previous embeddings of `document_source_uri` are made inactive.
+            kwargs: vectorstore specific parameters
+        """
+        if self._async_session_maker is None:
+            return await run_in_executor(
+                None,
+                self.add_embeddings,
+                texts,
+                embeddings,
+                metadatas=metadatas,
+                ids=ids,
+                document_source_uri=document_source_uri,
+                deactivate_source=deactivate_source,
+                **kwargs,
+            )
+
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+
+        if not metadatas:
+            metadatas = [{} for _ in texts]
+
+        async with self._async_session_maker() as session:
+            collection_uuid = await self._aget_collection_uuid(session)
+
+            if document_source_uri and deactivate_source:
+                await session.execute(self._deactivate_source_statement(document_source_uri))
+
+            rows = zip(texts, metadatas, embeddings, ids, strict=True)
+            start_time = time.perf_counter()
+            row_count = 0
+
+            # COPY streams through the asyncpg connection; other drivers fall back to batched INSERTs
+            use_copy = self._async_engine.dialect.driver == "asyncpg"  # type: ignore[union-attr]
+
+            while batch := list(itertools.islice(rows, self.bulk_load_batch_size)):
+                if use_copy:
+                    await self._abulk_load_batch(session, collection_uuid, batch, document_source_uri)
+                else:
+                    await session.execute(self._insert_batch_statement(collection_uuid, batch, document_source_uri))
+                row_count += len(batch)
+
+            await session.commit()
+
+        self._log_load_rate(row_count, time.perf_counter() - start_time)
+
         return ids
 
+    def _log_load_rate(self, row_count: int, elapsed: float) -> None:
+        self.logger.info(
+            f"Loaded {row_count} embeddings into collection {self.collection_name} in {elapsed:.3f}s "
+            f"({row_count / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+    def _deactivate_source_statement(self, document_source_uri: str) -> Any:
+        return (
+            update(self.EmbeddingStore)
+            .where(self.EmbeddingStore.document_source_uri == document_source_uri)
+            .values(document_status=DocumentStatus.INACTIVE.value)
+        )
+
+    def _insert_batch_statement(
+        self,
+        collection_uuid: uuid.UUID,
+        batch: List[Tuple[str, Optional[dict], List[float], str]],
+        document_source_uri: Optional[str],
+    ) -> Any:
+        """Upsert a batch of rows with a multi-row INSERT, for drivers without COPY support."""
+        data = [
+            {
+                "id": id,
+                "collection_id": collection_uuid,
+                "embedding": embedding,
+                "document": text,
+                "document_source_uri": document_source_uri,
+                "document_status": DocumentStatus.ACTIVE.value,
+                "cmetadata": metadata or {},
+            }
+            for text, metadata, embedding, id in batch
+        ]
+        stmt = insert(self.EmbeddingStore).values(data)
+        on_conflict_stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            # Conflict detection based on these columns
+            set_={
+                "embedding": stmt.excluded.embedding,
+                "document": stmt.excluded.document,
+                "cmetadata": stmt.excluded.cmetadata,
+            },
+        )
+        return on_conflict_stmt
+
+    def _bulk_load_batch(
+        self,
+        session: Session,
+        collection_uuid: uuid.UUID,
+        batch: List[Tuple[str, Optional[dict], List[float], str]],
+        document_source_uri: Optional[str],
+    ) -> None:
+        """Stream a batch of rows into the staging table with a binary COPY, then merge them.
+
+        The rows of each call are tagged with their own batch id, so concurrent loaders
+        share the staging table without seeing each other's rows.
+        """
+        batch_id = uuid.uuid4()
+        staging_rows = self._staging_rows(batch_id, collection_uuid, batch, document_source_uri)
+
+        copy_statement = f"COPY {STAGING_TABLE_NAME} ({', '.join(_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+        cursor = session.connection().connection.driver_connection.cursor()
+        try:
+            if self._engine.dialect.driver == "psycopg":
+                with cursor.copy(copy_statement) as copy:
+                    for chunk in _copy_binary_rows(staging_rows):
+                        copy.write(chunk)
+            else:
+                cursor.execute(copy_statement, stream=io.BufferedReader(_CopyStream(_copy_binary_rows(staging_rows))))
+        finally:
+            cursor.close()
+
+        for statement, params in self._merge_staging_statements(batch_id):
+            session.execute(statement, params)
+
+    async def _abulk_load_batch(
+        self,
+        session: AsyncSession,
+        collection_uuid: uuid.UUID,
+        batch: List[Tuple[str, Optional[dict], List[float], str]],
+        document_source_uri: Optional[str],
+    ) -> None:
+        """Async counterpart of `_bulk_load_batch`, copying through the asyncpg connection."""
+        batch_id = uuid.uuid4()
+        staging_rows = self._staging_rows(batch_id, collection_uuid, batch, document_source_uri)
+
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_to_table(
+            STAGING_TABLE_NAME,
+            source=_aiter_copy_chunks(_copy_binary_rows(staging_rows)),
+            columns=_STAGING_COLUMNS,
+            format="binary",
+        )
+
+        for statement, params in self._merge_staging_statements(batch_id):
+            await session.execute(statement, params)
+
+    @staticmethod
+    def _staging_rows(
+        batch_id: uuid.UUID,
+        collection_uuid: uuid.UUID,
+        batch: List[Tuple[str, Optional[dict], List[float], str]],
+        document_source_uri: Optional[str],
+    ) -> Iterator[Tuple[Any, ...]]:
+        return (
+            (batch_id, id, collection_uuid, embedding, text, document_source_uri, metadata or {})
+            for text, metadata, embedding, id in batch
+        )
+
+    def _merge_staging_statements(self, batch_id: uuid.UUID) -> List[Tuple[Any, dict]]:
+        """Return the statements merging a staged batch into the embeddings table, then clearing it."""
+        table_name = self.EmbeddingStore.__tablename__
+        return [
+            (
+                sqlalchemy.text(
+                    f"INSERT INTO {table_name} "
+                    "(id, collection_id, embedding, document, document_source_uri, document_status, cmetadata) "
+                    "SELECT id, collection_id, embedding, document, document_source_uri, :document_status, cmetadata "
+                    f"FROM {STAGING_TABLE_NAME} WHERE batch_id = :batch_id "
+                    "ON CONFLICT (id) DO UPDATE SET "
+                    "embedding = EXCLUDED.embedding, document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+                ),
+                {"document_status": DocumentStatus.ACTIVE.value, "batch_id": batch_id},
+            ),
+            (
+                sqlalchemy.text(f"DELETE FROM {STAGING_TABLE_NAME} WHERE batch_id = :batch_id"),
+                {"batch_id": batch_id},
+            ),
+        ]
+
     def add_texts(
         self,
         texts: Iterable[str],
@@ -493,9 +1215,26 @@ class PGVector(VectorStore):
         -------
             List of ids from adding the texts into the vectorstore.
         """
-        embeddings = self.embedding_function.embed_documents(list(texts))
+        texts = list(texts)
+        if hasattr(self.embedding_function, "iter_embed_documents"):
+            # Embeddings are loaded batch by batch as they are computed, instead of once all are computed
+            embeddings: Iterable[List[float]] = self.embedding_function.iter_embed_documents(texts)
+        else:
+            embeddings = self.embedding_function.embed_documents(texts)
         return self.add_embeddings(texts=texts, embeddings=embeddings, metadatas=metadatas, ids=ids, **kwargs)
 
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Run more texts through the embeddings and add to the vectorstore asynchronously."""
+        texts = list(texts)
+        embeddings = await self.embedding_function.aembed_documents(texts)
+        return await self.aadd_embeddings(texts=texts, embeddings=embeddings, metadatas=metadatas, ids=ids, **kwargs)
+
     def similarity_search(
         self,
         query: str,
@@ -515,6 +1254,9 @@ class PGVector(VectorStore):
         -------
             List of Documents most similar to the query.
         """
+        if self.hybrid_search_config is not None:
+            return _results_to_docs(self.hybrid_search_with_score(query, k=k, filter=filter))
+
         embedding = self.embedding_function.embed_query(text=query)
         return self.similarity_search_by_vector(
             embedding=embedding,
@@ -535,30 +1277,142 @@ class PGVector(VectorStore):
         ----
             query: Text to look up documents similar to.
             k: Number of Documents to return. Defaults to 4.
+            threshold: Maximum distance of the returned Documents, only applied to the
+                vector candidates of hybrid search. Defaults to None.
             filter (Optional[Dict[str, str]]): Filter by metadata. Defaults to None.
 
         Returns:
         -------
-            List of Documents most similar to the query and score for each.
+            List of Documents most similar to the query and score for each, the
+            distance or the fused score of hybrid search.
         """
+        if self.hybrid_search_config is not None:
+            return self.hybrid_search_with_score(query, k=k, threshold=threshold, filter=filter)
+
         embedding = self.embedding_function.embed_query(query)
         docs = self.similarity_search_with_score_by_vector(embedding=embedding, k=k, threshold=threshold, filter=filter)
         return docs
 
+    def hybrid_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most relevant to the query by fusing full-text and vector ranks.
+
+        The full-text and vector candidates are ranked separately in one statement
+        and fused with reciprocal rank fusion, weighted by `hybrid_search_config`
+        (the default configuration is used when it is not set).
+
+        Args:
+        ----
+            query: Text to look up documents relevant to.
+            k: Number of Documents to return. Defaults to 4.
+            threshold: Maximum distance of the vector candidates, full-text matches are
+                kept whatever their distance. Defaults to None.
+            filter (Optional[Dict[str, str]]): Filter by metadata. Defaults to None.
+
+        Returns:
+        -------
+            List of Documents in fused rank order and the reciprocal rank fusion score
+            for each, higher is more relevant.
+        """
+        embedding = self.embedding_function.embed_query(query)
+        results = self.__query_collection_hybrid(query=query, embedding=embedding, k=k, threshold=threshold, filter=filter)
+
+        return [(Document(page_content=result.document, metadata=result.cmetadata), float(result.score)) for result in results]
+
+    def similarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs and relevance scores, in the range [0, 1] for vector search.
+
+        The fused scores of hybrid search are not derived from distances, so the
+        `score_threshold` relevance score is converted to a maximum distance of the
+        vector candidates instead of filtering the fused results.
+        """
+        if self.hybrid_search_config is None:
+            return super().similarity_search_with_relevance_scores(query, k=k, **kwargs)
+
+        score_threshold = kwargs.pop("score_threshold", None)
+        threshold = None if score_threshold is None else self._relevance_threshold_to_distance(score_threshold)
+        return self.hybrid_search_with_score(query, k=k, threshold=threshold, filter=kwargs.get("filter"))
+
+    async def asimilarity_search_with_relevance_scores(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        if self.hybrid_search_config is None:
+            return await super().asimilarity_search_with_relevance_scores(query, k=k, **kwargs)
+
+        return await run_in_executor(None, self.similarity_search_with_relevance_scores, query, k, **kwargs)
+
+    def _relevance_threshold_to_distance(self, score_threshold: float) -> float:
+        """Return the maximum distance of the documents whose relevance score is at least `score_threshold`."""
+        if self.override_relevance_score_fn is not None:
+            raise ValueError("InvalidPayload: a relevance score threshold needs the relevance function of the distance strategy.")
+
+        if self._distance_strategy == DistanceStrategy.COSINE:
+            return 1.0 - score_threshold
+        elif self._distance_strategy == DistanceStrategy.EUCLIDEAN:
+            return (1.0 - score_threshold) * math.sqrt(2)
+        elif self._distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            # The distance is the negated inner product, whose relevance score is -distance when it is not positive
+            return -float(score_threshold)
+        else:
+            raise ValueError(f"No supported normalization function for distance_strategy of {self._distance_strategy}.")
+
+    @property
+    def embedding_column(self) -> Any:
+        """The embedding column, cast to the collection dimension when it is known."""
+        if self._embedding_length:
+            return cast(self.EmbeddingStore.embedding, _vector_type(self._embedding_length))
+        return self.EmbeddingStore.embedding
+
     @property
     def distance_strategy(self) -> Any:
         if self._distance_strategy == DistanceStrategy.EUCLIDEAN:
-            return self.EmbeddingStore.embedding.l2_distance
+            return self.embedding_column.l2_distance
         elif self._distance_strategy == DistanceStrategy.COSINE:
-            return self.EmbeddingStore.embedding.cosine_distance
+            return self.embedding_column.cosine_distance
         elif self._distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
-            return self.EmbeddingStore.embedding.max_inner_product
+            return self.embedding_column.max_inner_product
         else:
             raise ValueError(
                 f"Got unexpected value for distance: {self._distance_strategy}. "
                 f"Should be one of {', '.join([ds.value for ds in DistanceStrategy])}."
             )
 
+    def quantized_distance(self, embedding: List[float]) -> Any:
+        """Distance to the embedding over the quantized representation indexed for the collection.
+
+        Only used to rank the re-rank candidates; the returned scores are always
+        computed on the full precision embeddings.
+        """
+        if self.index_config is None or not self.index_config.quantization:
+            raise ValueError("a quantized index_config is required to compute the quantized distance")
+
+        dimension = int(self._embedding_length or len(embedding))
+        query_vector = cast(sqlalchemy.literal(embedding, _vector_type(dimension)), _vector_type(dimension))
+
+        if self.index_config.quantization == "halfvec":
+            halfvec = _PgVectorType(f"halfvec({dimension})")
+            operator = DISTANCE_OPERATORS[self._distance_strategy]
+            return cast(self.embedding_column, halfvec).op(operator, return_type=sqlalchemy.Float)(cast(query_vector, halfvec))
+
+        bit = _PgVectorType(f"bit({dimension})")
+        quantized_column = cast(func.binary_quantize(self.embedding_column), bit)
+        return quantized_column.op(_HAMMING_DISTANCE_OPERATOR, return_type=sqlalchemy.Float)(
+            cast(func.binary_quantize(query_vector), bit)
+        )
+
     def similarity_search_with_score_by_vector(
         self,
         embedding: List[float],
@@ -566,7 +1420,76 @@ class PGVector(VectorStore):
         threshold: Optional[float] = None,
         filter: Optional[dict] = None,
     ) -> List[Tuple[Document, float]]:
-        results = self.__query_collection(embedding=embedding, k=k, threshold=threshold, filter=filter)
+        if self.result_cache is None:
+            results = self.__query_collection(embedding=embedding, k=k, threshold=threshold, filter=filter)
+            return self._results_to_docs_and_scores(results)
+
+        collection_uuid = self._get_collection_uuid_or_raise()
+        generation = self.result_cache.get_generation(collection_uuid, self.get_generation)
+        key = self.result_cache.make_key(collection_uuid, generation, embedding, k, threshold, filter)
+        docs_and_scores = self.result_cache.get(key)
+        if docs_and_scores is None:
+            results = self.__query_collection(embedding=embedding, k=k, threshold=threshold, filter=filter)
+            docs_and_scores = self._results_to_docs_and_scores(results)
+            self.result_cache.put(key, docs_and_scores)
+
+        return docs_and_scores
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Run similarity search natively on the async engine when there is one.
+
+        Hybrid search has no async implementation and runs in the thread pool.
+        """
+        if self._async_session_maker is None or self.hybrid_search_config is not None:
+            return await super().asimilarity_search(query, k=k, filter=filter, **kwargs)
+
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_by_vector(embedding=embedding, k=k, filter=filter)
+
+    async def asimilarity_search_with_score(
+        self,
+        query: str,
+        k: int = 5,
+        threshold: Optional[float] = None,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most similar to query, natively on the async engine when there is one."""
+        if self._async_session_maker is None or self.hybrid_search_config is not None:
+            return await super().asimilarity_search_with_score(query, k=k, threshold=threshold, filter=filter)
+
+        embedding = await self.embedding_function.aembed_query(query)
+        return await self.asimilarity_search_with_score_by_vector(embedding=embedding, k=k, threshold=threshold, filter=filter)
+
+    async def asimilarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Return docs most similar to embedding vector, natively on the async engine when there is one."""
+        docs_and_scores = await self.asimilarity_search_with_score_by_vector(embedding=embedding, k=k, filter=filter)
+        return _results_to_docs(docs_and_scores)
+
+    async def asimilarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[Document, float]]:
+        if self._async_session_maker is None:
+            return await run_in_executor(
+                None, self.similarity_search_with_score_by_vector, embedding, k=k, threshold=threshold, filter=filter
+            )
+
+        results = await self.__aquery_collection(embedding=embedding, k=k, threshold=threshold, filter=filter)
 
         return self._results_to_docs_and_scores(results)
 
@@ -575,8 +1498,8 @@ class PGVector(VectorStore):
         docs = [
             (
                 Document(
-                    page_content=result.EmbeddingStore.document,
-                    metadata=result.EmbeddingStore.cmetadata,
+                    page_content=result.document,
+                    metadata=result.cmetadata,
                 ),
                 result.distance if self.embedding_function is not None else None,
             )
@@ -818,52 +1741,311 @@ class PGVector(VectorStore):
         else:
             raise ValueError(f"Invalid type: Expected a dictionary but got type: {type(filters)}")
 
+    def _build_filter_by(
+        self,
+        collection_uuid: uuid.UUID,
+        distance: Any,
+        threshold: Optional[float] = None,
+        filter: Optional[Dict[str, str]] = None,
+    ) -> List[Any]:
+        """Build the WHERE clauses of a collection search."""
+        filter_by = [
+            self.EmbeddingStore.collection_id == collection_uuid,
+            self.EmbeddingStore.document_status == DocumentStatus.ACTIVE.value,
+        ]
+        if isinstance(threshold, float):
+            filter_by.append(distance <= threshold)
+        if filter:
+            if self.use_jsonb:
+                filter_clauses = self._create_filter_clause(filter)
+                if filter_clauses is not None:
+                    filter_by.append(filter_clauses)
+            else:
+                # Old way of doing things
+                filter_clauses = self._create_filter_clause_json_deprecated(filter)
+                filter_by.extend(filter_clauses)
+        return filter_by
+
     def __query_collection(
         self,
         embedding: List[float],
         k: int = 4,
         threshold: Optional[float] = None,
         filter: Optional[Dict[str, str]] = None,
+        with_embedding: bool = False,
     ) -> List[Any]:
-        """Query the collection."""
+        """Query the collection.
+
+        Only the id, document, cmetadata and distance columns are returned, plus the
+        embedding when `with_embedding` is set, so that the vectors are not sent
+        back over the wire unless the caller needs them.
+        """
         with self._session_maker() as session:
-            collection = self.get_collection(session)
-            if not collection:
-                raise ValueError("Collection not found")
+            collection_uuid = self._get_collection_uuid(session)
+            stmt, search_k = self._query_collection_statement(collection_uuid, embedding, k, threshold, filter, with_embedding)
+
+            self._apply_search_params(session, search_k)
+
+            results: List[Any] = session.execute(stmt).all()
+
+        return results
+
+    async def __aquery_collection(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[Dict[str, str]] = None,
+        with_embedding: bool = False,
+    ) -> List[Any]:
+        """Query the collection on the async engine."""
+        async with self._async_session_maker() as session:  # type: ignore[misc]
+            collection_uuid = await self._aget_collection_uuid(session)
+            stmt, search_k = self._query_collection_statement(collection_uuid, embedding, k, threshold, filter, with_embedding)
+
+            search_params = self._search_params_statement(search_k)
+            if search_params is not None:
+                await session.execute(search_params)
 
-            filter_by = [
-                self.EmbeddingStore.collection_id == collection.uuid,
-                self.EmbeddingStore.document_status == DocumentStatus.ACTIVE.value,
-            ]
+            results: List[Any] = (await session.execute(stmt)).all()
+
+        return results
+
+    def _query_collection_statement(
+        self,
+        collection_uuid: uuid.UUID,
+        embedding: List[float],
+        k: int,
+        threshold: Optional[float],
+        filter: Optional[Dict[str, str]],
+        with_embedding: bool,
+    ) -> Tuple[Any, int]:
+        """Build the top-k query of the collection.
+
+        Returns
+        -------
+            The statement and the number of rows the index scan has to return.
+        """
+        quantization = self.index_config.quantization if self.index_config is not None else None
+        distance = self.distance_strategy(embedding)
+
+        columns = [
+            self.EmbeddingStore.id,
+            self.EmbeddingStore.document,
+            self.EmbeddingStore.cmetadata,
+        ]
+        if with_embedding:
+            columns.append(self.EmbeddingStore.embedding)
+
+        stmt = sqlalchemy.select(*columns, distance.label("distance"))
+        search_k = k
+
+        if quantization:
+            # The quantized index returns rerankFactor * k candidates, re-ranked on the full precision distance
+            search_k = k * self.index_config.rerankFactor  # type: ignore[union-attr]
+            candidates = (
+                sqlalchemy.select(self.EmbeddingStore.id)
+                .where(*self._build_filter_by(collection_uuid, distance, None, filter))
+                .order_by(self.quantized_distance(embedding))
+                .limit(search_k)
+                .subquery("candidates")
+            )
+            stmt = stmt.join(candidates, self.EmbeddingStore.id == candidates.c.id)
             if isinstance(threshold, float):
-                filter_by.append(self.distance_strategy(embedding) <= threshold)
-            if filter:
-                if self.use_jsonb:
-                    filter_clauses = self._create_filter_clause(filter)
-                    if filter_clauses is not None:
-                        filter_by.append(filter_clauses)
-                else:
-                    # Old way of doing things
-                    filter_clauses = self._create_filter_clause_json_deprecated(filter)
-                    filter_by.extend(filter_clauses)
-
-            results: List[Any] = (
-                session.query(
-                    self.EmbeddingStore,
-                    self.distance_strategy(embedding).label("distance"),
-                )
-                .filter(*filter_by)
+                stmt = stmt.where(distance <= threshold)
+        else:
+            stmt = stmt.where(*self._build_filter_by(collection_uuid, distance, threshold, filter))
+
+        return stmt.order_by(sqlalchemy.asc("distance")).limit(k), search_k
+
+    def __query_collection_hybrid(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[Dict[str, str]] = None,
+    ) -> List[Any]:
+        """Query the collection with full-text and vector candidates fused by reciprocal rank.
+
+        The distance threshold only applies to the vector candidates, a full-text match is
+        not dropped for being far from the query embedding.
+        """
+        config = self.hybrid_search_config or HybridSearchConfig()
+        fetch_k = max(config.fetchK, k)
+
+        with self._session_maker() as session:
+            collection_uuid = self._get_collection_uuid(session)
+            distance = self.distance_strategy(embedding)
+            filter_by = self._build_filter_by(collection_uuid, distance, None, filter)
+            vector_filter_by = self._build_filter_by(collection_uuid, distance, threshold, filter)
+
+            ts_query = func.websearch_to_tsquery(sqlalchemy.literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), query)
+            text_rank = func.ts_rank_cd(self.EmbeddingStore.document_tsv, ts_query)
+
+            # Ranks are numbered outside of the LIMIT subqueries so that the indexes drive each candidate scan
+            vector_candidates = (
+                sqlalchemy.select(self.EmbeddingStore.id, distance.label("distance"))
+                .where(*vector_filter_by)
                 .order_by(sqlalchemy.asc("distance"))
-                .join(
-                    self.CollectionStore,
-                    self.EmbeddingStore.collection_id == self.CollectionStore.uuid,
+                .limit(fetch_k)
+                .subquery("vector_candidates")
+            )
+            vector_ranks = sqlalchemy.select(
+                vector_candidates.c.id,
+                func.row_number().over(order_by=vector_candidates.c.distance).label("rank"),
+            ).cte("vector_ranks")
+
+            # Not filtered by the distance threshold, which gates the vector candidates only
+            text_candidates = (
+                sqlalchemy.select(self.EmbeddingStore.id, text_rank.label("text_rank"))
+                .where(*filter_by, self.EmbeddingStore.document_tsv.op("@@")(ts_query))
+                .order_by(sqlalchemy.desc("text_rank"))
+                .limit(fetch_k)
+                .subquery("text_candidates")
+            )
+            text_ranks = sqlalchemy.select(
+                text_candidates.c.id,
+                func.row_number().over(order_by=text_candidates.c.text_rank.desc()).label("rank"),
+            ).cte("text_ranks")
+
+            rrf_score = func.coalesce(
+                sqlalchemy.literal(config.vectorWeight, sqlalchemy.Float) / (config.rrfK + vector_ranks.c.rank), 0.0
+            ) + func.coalesce(sqlalchemy.literal(config.textWeight, sqlalchemy.Float) / (config.rrfK + text_ranks.c.rank), 0.0)
+            fused = (
+                sqlalchemy.select(
+                    func.coalesce(vector_ranks.c.id, text_ranks.c.id).label("id"),
+                    rrf_score.label("score"),
                 )
+                .select_from(vector_ranks.join(text_ranks, vector_ranks.c.id == text_ranks.c.id, full=True))
+                .order_by(sqlalchemy.desc("score"))
                 .limit(k)
-                .all()
+                .subquery("fused")
             )
 
+            stmt = (
+                sqlalchemy.select(
+                    self.EmbeddingStore.id,
+                    self.EmbeddingStore.document,
+                    self.EmbeddingStore.cmetadata,
+                    fused.c.score.label("score"),
+                )
+                .join(fused, self.EmbeddingStore.id == fused.c.id)
+                .order_by(fused.c.score.desc())
+            )
+
+            self._apply_search_params(session, fetch_k)
+
+            results: List[Any] = session.execute(stmt).all()
+
         return results
 
+    def __query_collection_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[Dict[str, str]] = None,
+    ) -> List[List[Any]]:
+        """Query the collection for several embeddings in a single round trip.
+
+        The query vectors are unnested with their ordinality and each one drives a
+        LATERAL top-k subquery, so every query keeps its own ranking and limit.
+        """
+        with self._session_maker() as session:
+            collection_uuid = self._get_collection_uuid(session)
+
+            query_embeddings = sqlalchemy.bindparam(
+                "query_embeddings",
+                value=["[" + ",".join(str(float(value)) for value in embedding) + "]" for embedding in embeddings],
+                type_=ARRAY(sqlalchemy.Text),
+            )
+            queries = (
+                func.unnest(query_embeddings)
+                .table_valued("embedding", with_ordinality="query_index")
+                .render_derived(name="queries")
+            )
+            distance = self.distance_strategy(cast(queries.c.embedding, _vector_type(self._embedding_length)))
+            filter_by = self._build_filter_by(collection_uuid, distance, threshold, filter)
+
+            candidates = (
+                sqlalchemy.select(
+                    self.EmbeddingStore.id,
+                    self.EmbeddingStore.document,
+                    self.EmbeddingStore.cmetadata,
+                    distance.label("distance"),
+                )
+                .where(*filter_by)
+                .order_by(sqlalchemy.asc("distance"))
+                .limit(k)
+                .lateral("candidates")
+            )
+            stmt = (
+                sqlalchemy.select(queries.c.query_index, candidates)
+                .select_from(queries)
+                .join(candidates, sqlalchemy.true())
+                .order_by(queries.c.query_index, candidates.c.distance)
+            )
+
+            self._apply_search_params(session, k)
+
+            rows = session.execute(stmt).all()
+
+        results: List[List[Any]] = [[] for _ in embeddings]
+        for row in rows:
+            results[row.query_index - 1].append(row)
+
+        return results
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        threshold: Optional[float] = None,
+        filter: Optional[dict] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Return docs and scores most similar to each of the embedding vectors.
+
+        Args:
+        ----
+            embeddings: Embeddings to look up documents similar to.
+            k: Number of Documents to return per embedding. Defaults to 4.
+            threshold: Maximum distance of the returned Documents. Defaults to None.
+            filter (Optional[Dict[str, str]]): Filter by metadata. Defaults to None.
+
+        Returns:
+        -------
+            One list of Documents and scores per embedding, in the order of the embeddings.
+        """
+        if not embeddings:
+            return []
+
+        results = self.__query_collection_batch(embeddings=embeddings, k=k, threshold=threshold, filter=filter)
+
+        return [self._results_to_docs_and_scores(query_results) for query_results in results]
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> List[List[Document]]:
+        """Return docs most similar to each of the embedding vectors.
+
+        Args:
+        ----
+            embeddings: Embeddings to look up documents similar to.
+            k: Number of Documents to return per embedding. Defaults to 4.
+            filter (Optional[Dict[str, str]]): Filter by metadata. Defaults to None.
+
+        Returns:
+        -------
+            One list of Documents per embedding, in the order of the embeddings.
+        """
+        docs_and_scores = self.similarity_search_with_score_by_vectors(embeddings=embeddings, k=k, filter=filter)
+        return [_results_to_docs(query_docs_and_scores) for query_docs_and_scores in docs_and_scores]
+
     def similarity_search_by_vector(
         self,
         embedding: List[float],
@@ -1096,9 +2278,15 @@ class PGVector(VectorStore):
             List[Tuple[Document, float]]: List of Documents selected by maximal marginal
                 relevance to the query and score for each.
         """
-        results = self.__query_collection(embedding=embedding, k=fetch_k, filter=filter)
+        results = self.__query_collection(embedding=embedding, k=fetch_k, filter=filter, with_embedding=True)
 
-        embedding_list = [result.EmbeddingStore.embedding for result in results]
+        return self._select_by_mmr(embedding, results, k, lambda_mult)
+
+    def _select_by_mmr(
+        self, embedding: List[float], results: List[Any], k: int, lambda_mult: float
+    ) -> List[Tuple[Document, float]]:
+        """Select the docs and scores of the results by maximal marginal relevance."""
+        embedding_list = np.array([result.embedding for result in results], dtype=np.float32)
 
         mmr_selected = maximal_marginal_relevance(
             np.array(embedding, dtype=np.float32),
@@ -1108,8 +2296,9 @@ class PGVector(VectorStore):
         )
 
         candidates = self._results_to_docs_and_scores(results)
+        mmr_selected_set = set(mmr_selected)
 
-        return [r for i, r in enumerate(candidates) if i in mmr_selected]
+        return [r for i, r in enumerate(candidates) if i in mmr_selected_set]
 
     def max_marginal_relevance_search(
         self,
@@ -1245,9 +2434,10 @@ class PGVector(VectorStore):
         **kwargs: Any,
     ) -> List[Document]:
         """Return docs selected using the maximal marginal relevance."""
-        # This is a temporary workaround to make the similarity search
-        # asynchronous. The proper solution is to make the similarity search
-        # asynchronous in the vector store implementations.
+        if self._async_session_maker is not None:
+            results = await self.__aquery_collection(embedding=embedding, k=fetch_k, filter=filter, with_embedding=True)
+            return _results_to_docs(self._select_by_mmr(embedding, results, k, lambda_mult))
+
         return await run_in_executor(
             None,
             self.max_marginal_relevance_search_by_vector,
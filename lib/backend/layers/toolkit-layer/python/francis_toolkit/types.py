@@ -1,8 +1,10 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
+import base64
 from enum import Enum
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional, Union
 
+import numpy as np
 from pydantic import BaseModel
 
 
@@ -25,23 +27,77 @@ class EmbeddingModel(BaseModel):
     dimensions: int
 
 
+class VectorIndexConfig(BaseModel):
+    indexType: Literal["hnsw", "ivfflat"] = "hnsw"
+    m: int = 16
+    efConstruction: int = 64
+    lists: int = 100
+    efSearch: Optional[int] = None
+    probes: Optional[int] = None
+    quantization: Optional[Literal["halfvec", "binary"]] = None
+    rerankFactor: int = 4
+
+
+class HybridSearchConfig(BaseModel):
+    vectorWeight: float = 1.0
+    textWeight: float = 1.0
+    rrfK: int = 60
+    fetchK: int = 50
+
+
+class RetrievalCacheConfig(BaseModel):
+    maxEntries: int = 256
+    ttlSeconds: int = 3600
+    generationTtlSeconds: int = 30
+
+
+# float: JSON arrays of numbers; base64-*: EncodedEmbeddings of little-endian floats
+EmbeddingEncodingFormat = Literal["float", "base64-float32", "base64-float16"]
+
+
+class EncodedEmbeddings(BaseModel):
+    """Embeddings as a base64 encoded array of little-endian floats, in row-major order."""
+
+    dtype: Literal["float32", "float16"]
+    shape: List[int]
+    data: str
+
+    @classmethod
+    def encode(cls, embeddings: Union[List[float], List[List[float]]], dtype: Literal["float32", "float16"]) -> "EncodedEmbeddings":
+        array = np.asarray(embeddings, dtype=np.dtype(dtype).newbyteorder("<"))
+        return cls(dtype=dtype, shape=list(array.shape), data=base64.b64encode(array.tobytes()).decode("ascii"))
+
+    def decode(self) -> np.ndarray:
+        return np.frombuffer(base64.b64decode(self.data), dtype=np.dtype(self.dtype).newbyteorder("<")).reshape(self.shape)
+
+
+def encode_embeddings(
+    embeddings: Union[List[float], List[List[float]]], encoding_format: EmbeddingEncodingFormat
+) -> Union[List[float], List[List[float]], EncodedEmbeddings]:
+    if encoding_format == "float":
+        return embeddings
+    return EncodedEmbeddings.encode(embeddings, dtype=encoding_format.split("-")[1])  # type: ignore[arg-type]
+
+
 class EmbedDocumentsRequest(BaseModel):
     texts: List[str]
     modelRefKey: Optional[str] = None
+    encodingFormat: EmbeddingEncodingFormat = "float"
 
 
 class EmbedDocumentsResponse(BaseModel):
-    embeddings: List[List[float]]
+    embeddings: Union[List[List[float]], EncodedEmbeddings]
     model: str
 
 
 class EmbedQueryRequest(BaseModel):
     text: str
     modelRefKey: Optional[str] = None
+    encodingFormat: EmbeddingEncodingFormat = "float"
 
 
 class EmbedQueryResponse(BaseModel):
-    embedding: List[float]
+    embedding: Union[List[float], EncodedEmbeddings]
     model: str
 
 
@@ -3,13 +3,15 @@
 import decimal
 import json
 import os
+import threading
 import time
-from typing import Any, List, Literal, Optional, Tuple
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import botocore
+import sqlalchemy
+from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.vectorstores import VectorStore
 
 from .clients import (
     bedrock_agent_client,
@@ -20,10 +22,13 @@ from .clients import (
     secrets_manager_client,
 )
 from .embeddings.bedrock_embeddings import BedrockEmbeddings
+from .embeddings.cached_embeddings import CachedEmbeddings, EmbeddingCacheStore
+from .embeddings.executor import EmbeddingExecutor
 from .embeddings.sagemaker_embeddings import SagemakerEndpointEmbeddings
-from .pgvector.vectorstores import PGVector
+from .pgvector.result_cache import RetrievalResultCache
+from .pgvector.vectorstores import PGVector, register_vector_adapter
 from .retrievers.knowledgebase_retriever import AmazonKnowledgeBasesRetriever, RetrievalConfig
-from .types import EmbeddingModel
+from .types import EmbeddingModel, HybridSearchConfig, RetrievalCacheConfig, VectorIndexConfig
 
 
 def get_embedding_models() -> List[EmbeddingModel]:
@@ -49,32 +54,126 @@ def find_embedding_model_by_ref_key(
     return None
 
 
-def get_embeddings(embedding_model: EmbeddingModel) -> Embeddings:
+_embedding_cache_store: Optional[EmbeddingCacheStore] = None
+
+
+def get_embedding_cache_store() -> Optional[EmbeddingCacheStore]:
+    """Return the process-wide embedding cache store, None when EMBEDDING_CACHE_TABLE_NAME is not set."""
+    global _embedding_cache_store
+
+    table_name = os.getenv("EMBEDDING_CACHE_TABLE_NAME")
+    if _embedding_cache_store is None and table_name:
+        _embedding_cache_store = EmbeddingCacheStore(
+            max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 4096)),
+            ttl_seconds=int(os.getenv("EMBEDDING_CACHE_TTL_DAYS", 30)) * 24 * 3600,
+            dynamodb=dynamodb_resource_client,
+            table_name=table_name,
+        )
+
+    return _embedding_cache_store
+
+
+def get_embeddings(embedding_model: EmbeddingModel, cached: bool = True) -> Embeddings:
+    """Return the embeddings of the model, wrapped by the embedding cache when it is enabled.
+
+    Args:
+    ----
+        embedding_model (EmbeddingModel): The embedding model.
+        cached (bool): Look the vectors up in the embedding cache before calling the model.
+
+    Returns:
+    -------
+        Embeddings: The embeddings of the model.
+    """
+    embeddings = _get_provider_embeddings(embedding_model)
+
+    store = get_embedding_cache_store() if cached else None
+    if store is None:
+        return embeddings
+
+    return CachedEmbeddings(
+        embeddings,
+        store,
+        model_id=embedding_model.modelId,
+        dimensions=embedding_model.dimensions,
+        normalize=getattr(embeddings, "normalize", False),
+    )
+
+
+def _get_provider_embeddings(embedding_model: EmbeddingModel) -> Embeddings:
     if embedding_model.provider == "sagemaker":
         return SagemakerEndpointEmbeddings(
             endpoint_name=embedding_model.modelEndpointName,  # type: ignore
             client=sagemaker_client,
             model_kwargs={"model": embedding_model.modelId},
+            max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 8)),
         )
     elif embedding_model.provider == "bedrock":
         return BedrockEmbeddings(
             client=bedrock_client,
             model_id=embedding_model.modelId,
+            max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 8)),
         )
     else:
         raise ValueError(f"Invalid provider: {embedding_model.provider}")
 
 
-def get_vector_store(embedding_model: EmbeddingModel, **kwargs: Any) -> VectorStore:
+def get_vector_store(embedding_model: EmbeddingModel, with_async_engine: bool = False, **kwargs: Any) -> PGVector:
     embeddings = get_embeddings(embedding_model)
 
+    # For async callers only: the Lambda handlers are synchronous and do not request it yet
+    if with_async_engine:
+        kwargs["async_connection"] = get_rds_engine(driver="asyncpg")
+
     vector_store = PGVector(
-        embeddings=embeddings, collection_name=embedding_model.modelRefKey, connection=get_rds_connection_string(), **kwargs
+        embeddings=embeddings,
+        collection_name=embedding_model.modelRefKey,
+        connection=get_rds_engine(),
+        embedding_length=embedding_model.dimensions,
+        **kwargs,
     )
 
     return vector_store
 
 
+def get_vector_store_kwargs(system_config: dict) -> dict:
+    """Return the PGVector search settings (index, hybrid search and result cache) of the system configuration."""
+    vector_store_properties = system_config["ragConfig"]["vectorStoreConfig"].get("vectorStoreProperties") or {}
+    index_config = vector_store_properties.get("indexConfig")
+    hybrid_search_config = vector_store_properties.get("hybridSearchConfig")
+    retrieval_cache_config = vector_store_properties.get("retrievalCacheConfig")
+
+    return {
+        "index_config": VectorIndexConfig(**index_config) if index_config else None,
+        "hybrid_search_config": HybridSearchConfig(**hybrid_search_config) if hybrid_search_config else None,
+        "result_cache": (
+            get_retrieval_result_cache(RetrievalCacheConfig(**retrieval_cache_config)) if retrieval_cache_config else None
+        ),
+    }
+
+
+_retrieval_result_cache: Optional[RetrievalResultCache] = None
+
+
+def get_retrieval_result_cache(cache_config: RetrievalCacheConfig) -> RetrievalResultCache:
+    """Return the process-wide retrieval result cache, so cached results outlive a single request.
+
+    The shared DynamoDB tier is used when RETRIEVAL_CACHE_TABLE_NAME is set.
+    """
+    global _retrieval_result_cache
+
+    if _retrieval_result_cache is None:
+        table_name = os.getenv("RETRIEVAL_CACHE_TABLE_NAME")
+        _retrieval_result_cache = RetrievalResultCache(
+            max_entries=cache_config.maxEntries,
+            ttl_seconds=cache_config.ttlSeconds,
+            generation_ttl_seconds=cache_config.generationTtlSeconds,
+            table=dynamodb_resource_client.Table(table_name) if table_name else None,
+        )
+
+    return _retrieval_result_cache
+
+
 def get_retriever(modelRefKey: str, k: int = 5, score_threshold: float = 0.0) -> BaseRetriever:
     _retriever: BaseRetriever
 
@@ -94,7 +193,7 @@ def get_retriever(modelRefKey: str, k: int = 5, score_threshold: float = 0.0) ->
             min_score_confidence=score_threshold,
         )
     else:
-        vector_store = get_vector_store(embedding_model)
+        vector_store = get_vector_store(embedding_model, **get_vector_store_kwargs(system_config))
         _retriever = vector_store.as_retriever(
             search_type="similarity_score_threshold", search_kwargs={"score_threshold": score_threshold, "k": k}
         )
@@ -102,14 +201,176 @@ def get_retriever(modelRefKey: str, k: int = 5, score_threshold: float = 0.0) ->
     return _retriever
 
 
-def get_rds_connection_string() -> str:
+def batch_similarity_search(
+    modelRefKey: str, questions: List[str], k: int = 5, score_threshold: float = 0.0
+) -> List[List[Document]]:
+    """Retrieve the documents of several questions, with a single vector store query for pgvector.
+
+    Hybrid search has no batch statement, so with a hybrid search configuration each
+    question is searched on its own, as by the retriever of `get_retriever`.
+
+    Args:
+    ----
+        modelRefKey (str): The reference key of the embedding model.
+        questions (List[str]): The questions to retrieve documents for.
+        k (int): The maximum number of documents per question.
+        score_threshold (float): The minimum relevance score of a document.
+
+    Returns:
+    -------
+        List[List[Document]]: The documents of each question, in the order of the questions.
+    """
+    system_config = load_config_from_dynamodb(os.getenv("CONFIG_TABLE_NAME", ""), "system_configuration")
+
+    corpus_config = system_config["ragConfig"].get("corpusConfig")
+
+    if corpus_config and corpus_config["corpusType"] == "knowledgebase":
+        return get_retriever(modelRefKey, k=k, score_threshold=score_threshold).batch(questions)  # type: ignore
+
+    embedding_model = find_embedding_model_by_ref_key(modelRefKey)
+    if not embedding_model:
+        raise ValueError(f"InvalidPayload: no embedding model found for ref key {modelRefKey}.")
+
+    vector_store = get_vector_store(embedding_model, **get_vector_store_kwargs(system_config))
+    if vector_store.hybrid_search_config is not None:
+        return [
+            [doc for doc, _ in vector_store.similarity_search_with_relevance_scores(question, k=k, score_threshold=score_threshold)]
+            for question in questions
+        ]
+
+    # Query embeddings may differ from document embeddings, so each question is embedded as a query, concurrently
+    query_embeddings = list(EmbeddingExecutor().map(vector_store.embeddings.embed_query, questions))
+    relevance_score_fn = vector_store._select_relevance_score_fn()
+
+    return [
+        [doc for doc, score in docs_and_scores if relevance_score_fn(score) >= score_threshold]
+        for docs_and_scores in vector_store.similarity_search_with_score_by_vectors(query_embeddings, k=k)
+    ]
+
+
+# Secrets Manager values are cached per secret ARN for the lifetime of a warm container, up to this TTL
+RDS_SECRET_CACHE_TTL_SECONDS = int(os.getenv("RDS_SECRET_CACHE_TTL_SECONDS", 900))
+
+RdsDriver = Literal["pg8000", "psycopg", "asyncpg"]
+
+# Driver of the sync engines; psycopg sends vectors in the binary format and prepares repeated statements server side
+RDS_DRIVER = os.getenv("RDS_DRIVER", "pg8000")
+
+# Executions of a statement after which psycopg prepares it server side; "none" disables prepared statements
+RDS_PREPARE_THRESHOLD = os.getenv("RDS_PREPARE_THRESHOLD", "5")
+
+# Pool of each engine; a Lambda container serves one request at a time, the overflow covers concurrent async queries
+RDS_ENGINE_ARGS = {
+    "pool_pre_ping": True,
+    "pool_size": int(os.getenv("RDS_POOL_SIZE", 2)),
+    "max_overflow": int(os.getenv("RDS_POOL_MAX_OVERFLOW", 4)),
+    # Below the idle client timeout of RDS Proxy (30 minutes by default)
+    "pool_recycle": 1500,
+}
+
+# invalid_authorization_specification and invalid_password
+_AUTH_FAILURE_SQLSTATES = {"28000", "28P01"}
+
+_rds_secrets: Dict[str, Tuple[float, dict]] = {}
+_rds_engines: Dict[Tuple[str, str, str], Any] = {}
+_rds_lock = threading.Lock()
+
+
+def get_rds_secret(force_refresh: bool = False) -> dict:
+    """Return the RDS secret, fetched from Secrets Manager at most once per TTL.
+
+    Args:
+    ----
+        force_refresh (bool): Fetch the secret even if the cached value has not expired.
+
+    Returns:
+    -------
+        dict: The secret, with the port, dbname, username and password keys.
+    """
+    secret_arn = os.getenv("RDS_SECRET_ARN", "")
+    cached = _rds_secrets.get(secret_arn)
+    if cached and not force_refresh and time.monotonic() - cached[0] < RDS_SECRET_CACHE_TTL_SECONDS:
+        return cached[1]
+
     try:
-        get_secret_value_response = secrets_manager_client.get_secret_value(SecretId=os.getenv("RDS_SECRET_ARN"))
+        get_secret_value_response = secrets_manager_client.get_secret_value(SecretId=secret_arn)
     except botocore.exceptions.ClientError as e:
         raise Exception(f"Error retrieving secret: {e.response['Error']['Code']}")  # noqa: B904
 
-    secret = get_secret_value_response["SecretString"]
-    secret_dict = json.loads(secret)
+    secret_dict = json.loads(get_secret_value_response["SecretString"])
+    _rds_secrets[secret_arn] = (time.monotonic(), secret_dict)
+
+    return secret_dict  # type: ignore[no-any-return]
+
+
+def _is_auth_failure(exception: BaseException) -> bool:
+    # asyncpg and psycopg expose the SQLSTATE as an attribute, pg8000 as the "C" field of the error response
+    sqlstate = getattr(exception, "sqlstate", None)
+    if sqlstate is None and exception.args and isinstance(exception.args[0], dict):
+        sqlstate = exception.args[0].get("C")
+    return sqlstate in _AUTH_FAILURE_SQLSTATES
+
+
+def get_rds_engine(driver: Optional[RdsDriver] = None) -> Any:
+    """Return the process-wide engine of the RDS database for the driver.
+
+    Engines are created once per warm container, keyed by secret ARN, endpoint and
+    driver. Credentials are read from the cached secret each time a connection is
+    opened, so a rotated password is picked up once the cache expires; an
+    authentication failure refreshes the secret and replaces the connection pool.
+
+    Args:
+    ----
+        driver (str): pg8000 or psycopg for a sync Engine, asyncpg for an AsyncEngine.
+            Defaults to the RDS_DRIVER environment variable, pg8000 when not set.
+
+    Returns:
+    -------
+        The sqlalchemy Engine or AsyncEngine.
+    """
+    driver = driver or RDS_DRIVER  # type: ignore[assignment]
+    key = (os.getenv("RDS_SECRET_ARN", ""), os.getenv("RDS_ENDPOINT", ""), driver)
+
+    with _rds_lock:
+        if key not in _rds_engines:
+            secret = get_rds_secret()
+            url = f"postgresql+{driver}://{key[1]}:{secret['port']}/{secret['dbname']}"
+
+            if driver == "asyncpg":
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                engine = create_async_engine(url, **RDS_ENGINE_ARGS)
+                sync_engine = engine.sync_engine
+            elif driver == "psycopg":
+                prepare_threshold = None if RDS_PREPARE_THRESHOLD.lower() == "none" else int(RDS_PREPARE_THRESHOLD)
+                engine = sync_engine = sqlalchemy.create_engine(
+                    url, connect_args={"prepare_threshold": prepare_threshold}, **RDS_ENGINE_ARGS
+                )
+                register_vector_adapter(engine)
+            else:
+                engine = sync_engine = sqlalchemy.create_engine(url, **RDS_ENGINE_ARGS)
+
+            @sqlalchemy.event.listens_for(sync_engine, "do_connect")
+            def provide_credentials(dialect: Any, conn_rec: Any, cargs: Any, cparams: dict) -> None:
+                secret = get_rds_secret()
+                cparams["user"] = secret["username"]
+                cparams["password"] = secret["password"]
+
+            @sqlalchemy.event.listens_for(sync_engine, "handle_error")
+            def refresh_credentials(context: Any) -> None:
+                if _is_auth_failure(context.original_exception):
+                    get_rds_secret(force_refresh=True)
+                    # Pooled connections were opened with the previous credentials
+                    sync_engine.dispose(close=False)
+
+            _rds_engines[key] = engine
+
+        return _rds_engines[key]
+
+
+def get_rds_connection_string(driver: Optional[RdsDriver] = None) -> str:
+    secret_dict = get_rds_secret()
+    driver = driver or RDS_DRIVER  # type: ignore[assignment]
 
     host = os.getenv("RDS_ENDPOINT")
     port = secret_dict["port"]
@@ -117,7 +378,7 @@ def get_rds_connection_string() -> str:
     username = secret_dict["username"]
     password = secret_dict["password"]
 
-    connection_string = f"postgresql+pg8000://{username}:{password}@{host}:{port}/{db_name}"
+    connection_string = f"postgresql+{driver}://{username}:{password}@{host}:{port}/{db_name}"
 
     return connection_string
 
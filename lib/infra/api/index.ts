@@ -13,6 +13,7 @@ import * as secretsmanager from 'aws-cdk-lib/aws-secretsmanager';
 import { Construct } from 'constructs';
 import * as path from 'path';
 import { BaseInfra } from '../base-infra';
+import { PgVectorStoreConfig } from '../common/types';
 import { Authentication } from '../auth';
 import { WebSocket } from '../websocket';
 
@@ -115,6 +116,20 @@ export class Api extends Construct {
         });
     }
 
+    private rdsDriverEnvironment(props: ApiProps): Record<string, string> {
+        const vectorStoreProperties = (
+            props.baseInfra.systemConfig.ragConfig.vectorStoreConfig as PgVectorStoreConfig
+        ).vectorStoreProperties;
+
+        return {
+            /* eslint-disable @typescript-eslint/naming-convention */
+            RDS_DRIVER: vectorStoreProperties?.rdsDriver ?? 'pg8000',
+            // Server side prepared statements would pin the connections of the RDS Proxy
+            ...(vectorStoreProperties?.useRDSProxy ? { RDS_PREPARE_THRESHOLD: 'none' } : {}),
+            /* eslint-enable @typescript-eslint/naming-convention */
+        };
+    }
+
     private createChatResources(api: apigw.RestApi, props: ApiProps): lambda.Function {
         const chatResource = api.root.addResource('chat', {
             defaultCorsPreflightOptions,
@@ -126,6 +141,7 @@ export class Api extends Construct {
                 RDS_SECRET_ARN: props.rdsSecret.secretArn,
             }),
             ...(props.rdsEndpoint && { RDS_ENDPOINT: props.rdsEndpoint }),
+            ...this.rdsDriverEnvironment(props),
             CONVERSATION_TABLE_NAME: props.conversationTable.tableName,
             CONVERSATION_INDEX_NAME: constants.CONVERSATION_STORE_GSI_INDEX_NAME,
             COGNITO_USER_POOL_ID: props.authentication.userPool.userPoolId,
@@ -204,15 +220,36 @@ export class Api extends Construct {
             defaultCorsPreflightOptions,
         });
 
+        const vectorStoreConfig = props.baseInfra.systemConfig.ragConfig
+            .vectorStoreConfig as PgVectorStoreConfig;
+        const retrievalCacheTable = vectorStoreConfig.vectorStoreProperties?.retrievalCacheConfig
+            ?.sharedCache
+            ? new ddb.Table(this, 'RetrievalCacheTable', {
+                  partitionKey: {
+                      name: 'PK',
+                      type: ddb.AttributeType.STRING,
+                  },
+                  billingMode: ddb.BillingMode.PAY_PER_REQUEST,
+                  encryption: ddb.TableEncryption.AWS_MANAGED,
+                  timeToLiveAttribute: 'expiresAt',
+                  removalPolicy: props.baseInfra.removalPolicy,
+              })
+            : undefined;
+
         const corpusApiHandler = this.createLambdaHandler('corpus', props, {
             /* eslint-disable @typescript-eslint/naming-convention */
             ...(props.rdsSecret && {
                 RDS_SECRET_ARN: props.rdsSecret.secretArn,
             }),
             ...(props.rdsEndpoint && { RDS_ENDPOINT: props.rdsEndpoint }),
+            ...this.rdsDriverEnvironment(props),
             ...(props.knowledgeBaseId && { KNOWLEDGE_BASE_ID: props.knowledgeBaseId }),
+            ...(retrievalCacheTable && {
+                RETRIEVAL_CACHE_TABLE_NAME: retrievalCacheTable.tableName,
+            }),
             /* eslint-enable @typescript-eslint/naming-convention */
         });
+        retrievalCacheTable?.grantReadWriteData(corpusApiHandler);
         corpusApiHandler.addToRolePolicy(
             new iam.PolicyStatement({
                 effect: iam.Effect.ALLOW,
@@ -225,6 +262,7 @@ export class Api extends Construct {
         props.rdsSecret?.grantRead(corpusApiHandler);
         props.baseInfra.grantSagemakerEmbeddingsModelAccess(corpusApiHandler);
         props.baseInfra.grantBedrockEmbeddingsModelAccess(corpusApiHandler);
+        props.baseInfra.grantEmbeddingCacheAccess(corpusApiHandler);
 
         const embeddingResource = corpusResource.addResource('embedding', {
             defaultCorsPreflightOptions,
@@ -38,6 +38,7 @@ export class BaseInfra extends Construct {
     public readonly solutionInfo: SolutionInfo;
     public readonly systemConfig: SystemConfig;
     public readonly configTable: ddb.Table;
+    public readonly embeddingCacheTable?: ddb.Table;
     public readonly webAcl?: wafv2.CfnWebACL;
     public readonly removalPolicy?: cdk.RemovalPolicy;
     public readonly guardrail?: bedrock.CfnGuardrail;
@@ -76,6 +77,17 @@ export class BaseInfra extends Construct {
 
         this.configTable = this.initConfigTable(props);
 
+        if (props.systemConfig.ragConfig.embeddingCacheConfig) {
+            // Embeddings keyed by model and text content, shared by the ingestion pipeline and the corpus API
+            this.embeddingCacheTable = new ddb.Table(this, 'EmbeddingCacheTable', {
+                partitionKey: { name: 'PK', type: ddb.AttributeType.STRING },
+                encryption: ddb.TableEncryption.AWS_MANAGED,
+                billingMode: ddb.BillingMode.PAY_PER_REQUEST,
+                timeToLiveAttribute: 'expiresAt',
+                removalPolicy: this.removalPolicy,
+            });
+        }
+
         this.serverAccessLogsBucket = new s3.Bucket(this, 'AccessLogsBucket', {
             ...constants.BUCKET_COMMON_PROPERTIES,
             objectOwnership: s3.ObjectOwnership.BUCKET_OWNER_PREFERRED,
@@ -256,6 +268,26 @@ export class BaseInfra extends Construct {
         return configTable;
     }
 
+    public grantEmbeddingCacheAccess(lambdaFunc: lambda.Function): void {
+        const embeddingCacheConfig = this.systemConfig.ragConfig.embeddingCacheConfig;
+        if (!this.embeddingCacheTable || !embeddingCacheConfig) {
+            return;
+        }
+
+        /* eslint-disable @typescript-eslint/naming-convention */
+        lambdaFunc.addEnvironment('EMBEDDING_CACHE_TABLE_NAME', this.embeddingCacheTable.tableName);
+        lambdaFunc.addEnvironment(
+            'EMBEDDING_CACHE_MAX_ENTRIES',
+            (embeddingCacheConfig.maxEntries ?? 4096).toString()
+        );
+        lambdaFunc.addEnvironment(
+            'EMBEDDING_CACHE_TTL_DAYS',
+            (embeddingCacheConfig.ttlDays ?? 30).toString()
+        );
+        /* eslint-enable @typescript-eslint/naming-convention */
+        this.embeddingCacheTable.grantReadWriteData(lambdaFunc);
+    }
+
     public grantSagemakerEmbeddingsModelAccess(lambdaFunc: lambda.IFunction): void {
         const endpointSet = new Set<string>();
         const sagemakerEndpoints: sagemaker.IEndpoint[] = [];
@@ -30,6 +30,18 @@ export const CHUNK_SIZE_DOC_SPLIT = '1000';
 
 export const OVERLAP_FOR_DOC_SPLIT = '200';
 
+export const EMBEDDING_MAX_CONCURRENCY = '8';
+export const BULK_LOAD_BATCH_SIZE = '500';
+
+export const TABLE_IMAGES = 'false';
+export const TABLE_IMAGE_RESOLUTION = '300';
+export const TABLE_IMAGE_UPLOAD_CONCURRENCY = '8';
+export const LOCAL_PDF_EXTRACTION = 'true';
+export const CSV_BATCH_SIZE = '500';
+export const CSV_INGESTION_MAX_INVOCATIONS = 20;
+
+export const PG_VECTOR_SCHEMA_VERSION = '3';
+
 export const INGESTION_LAMBDA_MEMORY_SIZE = 1024;
 
 export const COGNITO_ADMIN_GROUP_NAME = 'Administrators';
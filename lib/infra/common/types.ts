@@ -29,9 +29,144 @@ export interface PgVectorStoreConfig {
         readonly maxCapacity?: number;
 
         readonly useRDSProxy?: boolean;
+
+        /**
+         * Python driver of the database connections. psycopg sends vectors in the binary
+         * format and prepares repeated statements server side; they are not prepared
+         * when the RDS Proxy is used, since they would pin its connections.
+         * @default 'pg8000'
+         */
+        readonly rdsDriver?: 'pg8000' | 'psycopg';
+
+        /**
+         * ANN index built for each collection; sequential scan when not set
+         */
+        readonly indexConfig?: PgVectorIndexConfig;
+
+        /**
+         * Fuse full-text and vector search rankings; vector search only when not set
+         */
+        readonly hybridSearchConfig?: PgVectorHybridSearchConfig;
+
+        /**
+         * Cache vector search results until the next ingestion; no cache when not set
+         */
+        readonly retrievalCacheConfig?: PgVectorRetrievalCacheConfig;
     };
 }
 
+export interface PgVectorIndexConfig {
+    readonly indexType: 'hnsw' | 'ivfflat';
+
+    /**
+     * HNSW: maximum number of connections per layer
+     * @default 16
+     */
+    readonly m?: number;
+
+    /**
+     * HNSW: size of the dynamic candidate list used to build the graph
+     * @default 64
+     */
+    readonly efConstruction?: number;
+
+    /**
+     * IVFFlat: number of inverted lists
+     * @default 100
+     */
+    readonly lists?: number;
+
+    /**
+     * HNSW: size of the dynamic candidate list used at query time
+     * @default 40
+     */
+    readonly efSearch?: number;
+
+    /**
+     * IVFFlat: number of lists probed at query time
+     * @default 1
+     */
+    readonly probes?: number;
+
+    /**
+     * Index a half precision or binary quantized copy of the embeddings,
+     * the candidates are re-ranked on the full precision embeddings
+     */
+    readonly quantization?: 'halfvec' | 'binary';
+
+    /**
+     * Quantization: number of candidates re-ranked per requested document
+     * @default 4
+     */
+    readonly rerankFactor?: number;
+}
+
+export interface PgVectorHybridSearchConfig {
+    /**
+     * Weight of the vector search ranking
+     * @default 1.0
+     */
+    readonly vectorWeight?: number;
+
+    /**
+     * Weight of the full-text search ranking
+     * @default 1.0
+     */
+    readonly textWeight?: number;
+
+    /**
+     * Rank constant of the reciprocal rank fusion
+     * @default 60
+     */
+    readonly rrfK?: number;
+
+    /**
+     * Number of candidates retrieved by each search before fusion
+     * @default 50
+     */
+    readonly fetchK?: number;
+}
+
+export interface EmbeddingCacheConfig {
+    /**
+     * Maximum number of embeddings cached in memory by each Lambda container
+     * @default 4096
+     */
+    readonly maxEntries?: number;
+
+    /**
+     * Days after which a cached embedding expires from the DynamoDB table
+     * @default 30
+     */
+    readonly ttlDays?: number;
+}
+
+export interface PgVectorRetrievalCacheConfig {
+    /**
+     * Maximum number of results cached in memory by each corpus Lambda container
+     * @default 256
+     */
+    readonly maxEntries?: number;
+
+    /**
+     * Lifetime of a cached result, in seconds
+     * @default 3600
+     */
+    readonly ttlSeconds?: number;
+
+    /**
+     * Seconds during which the generation of a collection is reused before being read again
+     * @default 30
+     */
+    readonly generationTtlSeconds?: number;
+
+    /**
+     * Share cached results between Lambda containers through a DynamoDB table
+     * @default false
+     */
+    readonly sharedCache?: boolean;
+}
+
 export interface OpenSearchVectorStoreConfig {
     readonly vectorStoreType: 'opensearch';
     readonly vectorStoreProperties?: {
@@ -199,6 +334,7 @@ export interface SystemConfig {
     ragConfig: {
         vectorStoreConfig: VectorStoreConfig;
         embeddingsModels: EmbeddingModel[];
+        embeddingCacheConfig?: EmbeddingCacheConfig;
         corpusConfig?: KnowledgeBaseCorpusConfig | DefaultCorpusConfig;
     };
     chatHistoryConfig?: {
@@ -18,7 +18,48 @@ import * as iam from 'aws-cdk-lib/aws-iam';
 import { BaseInfra } from '../base-infra';
 import { Construct } from 'constructs';
 import { NagSuppressions } from 'cdk-nag';
-import { DefaultCorpusConfig } from '../common/types';
+import { DefaultCorpusConfig, PgVectorStoreConfig } from '../common/types';
+
+// Flags of the maintenance run after an ingestion, set over the execution input so
+// that the collection of its model_ref_key is maintained and purge_data is not repeated
+export const VECTOR_STORE_MAINTENANCE_FLAGS = {
+    /* eslint-disable @typescript-eslint/naming-convention */
+    purge_data: false,
+    purge_inactive: true,
+    vacuum: true,
+    /* eslint-enable @typescript-eslint/naming-convention */
+};
+
+/**
+ * States of the vector store maintenance: a Pass state building the request from the
+ * execution input, which may not have a model_ref_key, and the task invoking the
+ * function.
+ */
+export function vectorStoreMaintenanceStates(
+    scope: Construct,
+    lambdaFunction: lambda.IFunction
+): { prepareTask: stepfn.Pass; maintenanceTask: stepfn_task.LambdaInvoke } {
+    // Braces are reserved characters of the string literals of intrinsic functions
+    const flagsJson = JSON.stringify(VECTOR_STORE_MAINTENANCE_FLAGS).replace(/[{}]/g, '\\$&');
+    const flags = `States.StringToJson('${flagsJson}')`;
+    const prepareTask = new stepfn.Pass(scope, 'Prepare vector store maintenance', {
+        parameters: {
+            // eslint-disable-next-line @typescript-eslint/naming-convention
+            'request.$': `States.JsonMerge($$.Execution.Input, ${flags}, false)`,
+        },
+        resultPath: '$.maintenance',
+    });
+    const maintenanceTask = new stepfn_task.LambdaInvoke(
+        scope,
+        'Vector store maintenance task',
+        {
+            lambdaFunction,
+            payload: stepfn.TaskInput.fromJsonPathAt('$.maintenance.request'),
+            resultPath: stepfn.JsonPath.DISCARD,
+        }
+    );
+    return { prepareTask, maintenanceTask };
+}
 
 export interface IngestionPipelineProps {
     readonly baseInfra: BaseInfra;
@@ -153,6 +194,17 @@ export class IngestionPipeline extends Construct {
             | DefaultCorpusConfig
             | undefined;
 
+        const vectorStoreProperties = (
+            props.baseInfra.systemConfig.ragConfig.vectorStoreConfig as PgVectorStoreConfig
+        ).vectorStoreProperties;
+        const rdsDriverEnvironment = {
+            /* eslint-disable @typescript-eslint/naming-convention */
+            RDS_DRIVER: vectorStoreProperties?.rdsDriver ?? 'pg8000',
+            // Server side prepared statements would pin the connections of the RDS Proxy
+            ...(vectorStoreProperties?.useRDSProxy ? { RDS_PREPARE_THRESHOLD: 'none' } : {}),
+            /* eslint-enable @typescript-eslint/naming-convention */
+        };
+
         // Lambda function performing the embedding job
         const embeddingsFunction = new lambda.Function(this, 'embeddingsFunction', {
             ...ingestionLambdaCommonProps,
@@ -168,6 +220,7 @@ export class IngestionPipeline extends Construct {
                 POWERTOOLS_SERVICE_NAME: 'ingestion-embeddings',
                 RDS_SECRET_ARN: props.rdsSecret.secretArn,
                 RDS_ENDPOINT: props.rdsEndpoint,
+                ...rdsDriverEnvironment,
                 CHUNK_SIZE_DOC_SPLIT: (
                     corpusConfig?.corpusProperties?.chunkingConfiguration?.chunkSize ||
                     constants.CHUNK_SIZE_DOC_SPLIT
@@ -176,6 +229,13 @@ export class IngestionPipeline extends Construct {
                     corpusConfig?.corpusProperties?.chunkingConfiguration?.chunkOverlap ||
                     constants.OVERLAP_FOR_DOC_SPLIT
                 ).toString(),
+                BULK_LOAD_BATCH_SIZE: constants.BULK_LOAD_BATCH_SIZE,
+                EMBEDDING_MAX_CONCURRENCY: constants.EMBEDDING_MAX_CONCURRENCY,
+                TABLE_IMAGES: constants.TABLE_IMAGES,
+                TABLE_IMAGE_RESOLUTION: constants.TABLE_IMAGE_RESOLUTION,
+                TABLE_IMAGE_UPLOAD_CONCURRENCY: constants.TABLE_IMAGE_UPLOAD_CONCURRENCY,
+                LOCAL_PDF_EXTRACTION: constants.LOCAL_PDF_EXTRACTION,
+                CSV_BATCH_SIZE: constants.CSV_BATCH_SIZE,
 
                 /* eslint-enable @typescript-eslint/naming-convention */
             },
@@ -200,9 +260,11 @@ export class IngestionPipeline extends Construct {
         props.inputAssetsBucket.grantRead(embeddingsFunction);
         props.baseInfra.configTable.grantReadData(embeddingsFunction);
         props.baseInfra.grantBedrockEmbeddingsModelAccess(embeddingsFunction);
+        props.baseInfra.grantEmbeddingCacheAccess(embeddingsFunction);
         props.baseInfra.grantSagemakerEmbeddingsModelAccess(embeddingsFunction);
         props.rdsSecret.grantRead(embeddingsFunction);
-        cacheTable.grantWriteData(embeddingsFunction);
+        // Read and write of the checkpoints of the CSV ingestion
+        cacheTable.grantReadWriteData(embeddingsFunction);
 
         const vectorStoreManagementFunction = new lambda.Function(
             this,
@@ -222,8 +284,10 @@ export class IngestionPipeline extends Construct {
 
                     /* eslint-disable @typescript-eslint/naming-convention */
                     POWERTOOLS_SERVICE_NAME: 'ingestion-vector-store-management',
+                    CONFIG_TABLE_NAME: props.baseInfra.configTable.tableName,
                     RDS_SECRET_ARN: props.rdsSecret.secretArn,
                     RDS_ENDPOINT: props.rdsEndpoint,
+                    ...rdsDriverEnvironment,
                     CHUNK_SIZE_DOC_SPLIT: constants.CHUNK_SIZE_DOC_SPLIT,
                     OVERLAP_FOR_DOC_SPLIT: constants.OVERLAP_FOR_DOC_SPLIT,
 
@@ -232,6 +296,7 @@ export class IngestionPipeline extends Construct {
             }
         );
         props.rdsSecret.grantRead(vectorStoreManagementFunction);
+        props.baseInfra.configTable.grantReadData(vectorStoreManagementFunction);
 
         // Step function definition
         const inputValidationTask = new stepfn_task.LambdaInvoke(
@@ -254,6 +319,13 @@ export class IngestionPipeline extends Construct {
                 lambdaFunction: embeddingsFunction,
             }
         );
+        // A CSV file too large for one invocation is resumed from its checkpoint
+        embeddingsTask.addRetry({
+            errors: ['IngestionIncompleteError'],
+            interval: cdk.Duration.seconds(1),
+            backoffRate: 1,
+            maxAttempts: constants.CSV_INGESTION_MAX_INVOCATIONS,
+        });
 
         const vectorStoreManagementTask = new stepfn_task.LambdaInvoke(
             this,
@@ -265,6 +337,12 @@ export class IngestionPipeline extends Construct {
             }
         );
 
+        // Garbage collection of the embeddings made inactive by the ingestion run
+        const {
+            prepareTask: vectorStoreMaintenancePrepareTask,
+            maintenanceTask: vectorStoreMaintenanceTask,
+        } = vectorStoreMaintenanceStates(this, vectorStoreManagementFunction);
+
         const ingestionChoice = new stepfn.Choice(
             this,
             'Are there any documents that need to be ingested?'
@@ -292,6 +370,14 @@ export class IngestionPipeline extends Construct {
 
         const succeedTask = new stepfn.Succeed(this, 'Succeed');
 
+        // A failed maintenance only delays the purge to the next run, so it does not fail the ingestion;
+        // the error is kept in the state output, logged with the execution
+        const vectorStoreMaintenanceFailed = new stepfn.Pass(this, 'Vector store maintenance failed');
+        vectorStoreMaintenanceTask.addCatch(vectorStoreMaintenanceFailed.next(succeedTask), {
+            errors: [stepfn.Errors.ALL],
+            resultPath: '$.maintenanceError',
+        });
+
         const definition = inputValidationTask.next(
             ingestionChoice
                 .when(
@@ -299,7 +385,11 @@ export class IngestionPipeline extends Construct {
                     succeedTask
                 )
                 .otherwise(
-                    vectorStoreManagementTask.next(runFilesInParallel).next(succeedTask)
+                    vectorStoreManagementTask
+                        .next(runFilesInParallel)
+                        .next(vectorStoreMaintenancePrepareTask)
+                        .next(vectorStoreMaintenanceTask)
+                        .next(succeedTask)
                 )
         );
 
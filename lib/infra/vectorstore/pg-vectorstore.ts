@@ -150,6 +150,11 @@ export class PgVectorStore extends Construct {
                 embeddingModels: JSON.stringify(
                     props.baseInfra.systemConfig.ragConfig.embeddingsModels
                 ),
+                indexConfig: JSON.stringify(
+                    vectorStoreConfig.vectorStoreProperties?.indexConfig ?? null
+                ),
+                // Bump to rerun the table setup on existing deployments when the schema changes
+                schemaVersion: constants.PG_VECTOR_SCHEMA_VERSION,
             },
         });
         cr.node.addDependency(this.cluster);
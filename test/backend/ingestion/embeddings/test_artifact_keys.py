@@ -0,0 +1,36 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Tests of the keys of the cached artifacts of a PDF, which must change with every setting their content depends on."""
+
+import process_pdf
+import pytest
+
+SETTINGS = {"LOCAL_PDF_EXTRACTION": True, "TABLE_IMAGES": False, "CHUNK_MAX_WORDS": 500}
+
+
+def _chunks_key(monkeypatch, **settings):
+    for name, value in settings.items():
+        monkeypatch.setattr(process_pdf, name, value)
+    keys = []
+
+    def load_artifact(s3, bucket_name, key):
+        keys.append(key)
+        return {}
+
+    monkeypatch.setattr(process_pdf, "get_etag", lambda s3, bucket_name, key: "etag")
+    monkeypatch.setattr(process_pdf, "load_artifact", load_artifact)
+    monkeypatch.setattr(process_pdf, "create_documents", lambda *args: [])
+    process_pdf.create_documents_from_pdf("s3://bucket/file.pdf", "application/pdf", "https://example.com/file.pdf")
+    return keys[0]
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"LOCAL_PDF_EXTRACTION": False},
+        {"TABLE_IMAGES": True},
+        {"CHUNK_MAX_WORDS": 10},
+    ],
+)
+def test_chunks_key_changes_with_settings(monkeypatch, settings):
+    assert _chunks_key(monkeypatch, **{**SETTINGS, **settings}) != _chunks_key(monkeypatch, **SETTINGS)
@@ -0,0 +1,62 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Golden-file tests of the chunking of linearized PDF pages.
+
+Each fixture holds the items of each page as built by process_document, and its
+expected file the output of chunk_document and create_documents. The expected
+files of the handbook and lists fixtures were produced by the chunker preceding
+the single pass rewrite; the differences made on purpose since are listed in
+their "intended_differences".
+
+Run with UPDATE_GOLDEN=1 to rewrite the expected files after an intended change.
+"""
+
+import json
+import os
+
+import process_pdf
+import pytest
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "chunking")
+FIXTURES = ["handbook", "lists", "tables"]
+
+
+class _NoUpload:
+    def upload_file(self, *args, **kwargs):
+        pass
+
+
+def _chunk(document_holder):
+    header_split, page_offsets = process_pdf.flatten_pages(document_holder)
+    doc = process_pdf.chunk_document(header_split, "fixture.pdf", "bucket", page_offsets)
+    documents = process_pdf.create_documents(doc, "https://example.com/fixture.pdf", "s3://bucket/fixture.pdf", "application/pdf")
+    # The integer keys of the chunked document become strings, as in the stored artifacts
+    return {
+        "chunks": json.loads(json.dumps(doc)),
+        "documents": [{"page_content": document.page_content, "metadata": document.metadata} for document in documents],
+    }
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_chunking_matches_golden_file(name, monkeypatch):
+    monkeypatch.setattr(process_pdf, "s3", _NoUpload())
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json")) as f:
+        document_holder = {int(page): items for page, items in json.load(f)["document_holder"].items()}
+
+    expected_path = os.path.join(FIXTURES_DIR, f"{name}.expected.json")
+    output = _chunk(document_holder)
+
+    if os.getenv("UPDATE_GOLDEN"):
+        intended_differences = []
+        if os.path.exists(expected_path):
+            with open(expected_path) as f:
+                intended_differences = json.load(f).get("intended_differences", [])
+        with open(expected_path, "w") as f:
+            json.dump({"intended_differences": intended_differences, **output}, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    with open(expected_path) as f:
+        expected = json.load(f)
+
+    assert output["documents"] == expected["documents"]
+    assert output["chunks"] == expected["chunks"]
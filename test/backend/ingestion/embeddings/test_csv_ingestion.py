@@ -0,0 +1,158 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Tests of the streaming CSV ingestion against in-memory S3 and DynamoDB.
+
+The documents built from the object read in small chunks, in batches and across
+resumed invocations must be those of the whole file parsed at once.
+"""
+
+import csv
+import io
+import random
+from types import SimpleNamespace
+
+import csv_ingestion
+import pytest
+
+BUCKET = "bucket"
+KEY = "data.csv"
+FILE_URI = f"s3://{BUCKET}/{KEY}"
+ETAG = "etag"
+
+
+def _csv_bytes(rows=700, lineterminator="\r\n"):
+    rng = random.Random(1)
+    buffer = io.StringIO(newline="")
+    writer = csv.writer(buffer, lineterminator=lineterminator)
+    writer.writerow(["name", "note", "città"])
+    for index in range(rows):
+        note = rng.choice(["plain", 'multi\nline, "quoted"', "é ünïcode ✓", ""])
+        writer.writerow([f"n{index}", note, str(index)])
+    return csv_ingestion.UTF8_BOM + buffer.getvalue().encode("utf-8")
+
+
+def _expected_texts(data):
+    return [csv_ingestion.row_text(row) for row in csv.DictReader(io.StringIO(data.decode("utf-8-sig"), newline=""))]
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start : start + chunk_size]
+
+
+class _S3:
+    def __init__(self, data):
+        self.data = data
+
+    def head_object(self, Bucket, Key, IfMatch):
+        assert IfMatch == f'"{ETAG}"'
+        return {"ContentLength": len(self.data)}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        assert IfMatch == f'"{ETAG}"'
+        start = int(Range[len("bytes=") : -1])
+        return {"Body": _Body(self.data[start:])}
+
+
+class _Table:
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, Key):
+        item = self.items.get((Key["PK"], Key["SK"]))
+        return {"Item": dict(item)} if item else {}
+
+    def put_item(self, Item):
+        self.items[(Item["PK"], Item["SK"])] = dict(Item)
+
+    def delete_item(self, Key):
+        self.items.pop((Key["PK"], Key["SK"]), None)
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = _Table()
+    monkeypatch.setattr(csv_ingestion.boto3, "resource", lambda service: SimpleNamespace(Table=lambda name: table))
+    # Chunks of 3 bytes split the CRLF line endings and the multi-byte characters
+    monkeypatch.setattr(csv_ingestion, "S3_READ_CHUNK_SIZE", 3)
+    return table
+
+
+def _use_object(monkeypatch, data):
+    monkeypatch.setattr(csv_ingestion.boto3, "client", lambda service: _S3(data))
+
+
+def _ingest(batches_per_invocation=None, concat_rows=False):
+    """Ingest the object as the embeddings Lambda does, each invocation resuming from the checkpoint."""
+    ingested = []
+    invocations = 0
+    while True:
+        invocations += 1
+        checkpoint = csv_ingestion.load_checkpoint(FILE_URI, ETAG) or csv_ingestion.CsvCheckpoint(etag=ETAG)
+        completed = True
+        for count, batch in enumerate(
+            csv_ingestion.iter_csv_batches(BUCKET, KEY, checkpoint, batch_size=50, concat_rows=concat_rows, max_document_chars=300),
+            start=1,
+        ):
+            for index, document in enumerate(batch.documents, start=checkpoint.documents):
+                ingested.append((checkpoint.document_id(FILE_URI, index), document.page_content))
+            checkpoint.offset = batch.offset
+            checkpoint.documents += len(batch.documents)
+            csv_ingestion.save_checkpoint(FILE_URI, checkpoint)
+            if batches_per_invocation and count >= batches_per_invocation:
+                completed = False
+                break
+        if completed:
+            csv_ingestion.delete_checkpoint(FILE_URI)
+            return ingested, invocations
+
+
+@pytest.mark.parametrize("lineterminator", ["\r\n", "\n"])
+def test_rows_match_whole_file(monkeypatch, table, lineterminator):
+    data = _csv_bytes(lineterminator=lineterminator)
+    _use_object(monkeypatch, data)
+
+    ingested, invocations = _ingest()
+
+    assert [text for _, text in ingested] == _expected_texts(data)
+    assert ingested[0][1].startswith("name: n0\n")
+    assert invocations == 1
+    assert not table.items
+
+
+def test_resume_from_checkpoint(monkeypatch, table):
+    data = _csv_bytes()
+    _use_object(monkeypatch, data)
+
+    ingested, invocations = _ingest(batches_per_invocation=2)
+
+    assert [text for _, text in ingested] == _expected_texts(data)
+    assert len({document_id for document_id, _ in ingested}) == len(ingested)
+    assert invocations == 8
+    assert not table.items
+
+
+def test_checkpoint_of_other_version_is_ignored(monkeypatch, table):
+    checkpoint = csv_ingestion.CsvCheckpoint(etag="previous", offset=10, documents=3, fieldnames=["a"])
+    csv_ingestion.save_checkpoint(FILE_URI, checkpoint)
+
+    assert csv_ingestion.load_checkpoint(FILE_URI, ETAG) is None
+    assert csv_ingestion.load_checkpoint(FILE_URI, "previous") == checkpoint
+
+
+def test_concatenated_rows(monkeypatch, table):
+    data = _csv_bytes()
+    _use_object(monkeypatch, data)
+
+    ingested, _ = _ingest(concat_rows=True)
+    resumed, invocations = _ingest(batches_per_invocation=1, concat_rows=True)
+
+    texts = [text for _, text in ingested]
+    assert "\n".join(texts) == "\n".join(_expected_texts(data))
+    assert max(len(text) for text in texts) <= 300
+    assert [text for _, text in resumed] == texts
+    assert invocations > 1
@@ -0,0 +1,10 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "..", "..")
+
+sys.path.insert(0, os.path.join(ROOT_DIR, "lib", "backend", "layers", "toolkit-layer", "python"))
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,45 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+"""Tests of the retries of throttled embedding calls by EmbeddingExecutor."""
+
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from francis_toolkit.embeddings.executor import EmbeddingExecutor
+
+THROTTLING_ERROR = ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeModel")
+
+
+def _throttled(throttles_per_item):
+    calls = {}
+
+    def func(item):
+        calls[item] = calls.get(item, 0) + 1
+        if calls[item] <= throttles_per_item:
+            raise THROTTLING_ERROR
+        return item * 10
+
+    return func
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+def test_backoff_sleeps_instead_of_spinning(max_concurrency):
+    executor = EmbeddingExecutor(max_concurrency=max_concurrency, base_backoff_seconds=0.1)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    results = executor.run(_throttled(2), [1, 2])
+    wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    assert results == [10, 20]
+    assert executor.stats.throttles == 4
+    # The backoffs take at least half their nominal duration, during which no CPU is burned
+    assert wall_seconds >= 0.1
+    assert cpu_seconds < 0.05
+
+
+def test_throttling_out_of_retries_is_raised():
+    executor = EmbeddingExecutor(max_concurrency=2, max_retries=1, base_backoff_seconds=0.01)
+
+    with pytest.raises(ClientError):
+        executor.run(_throttled(2), [1, 2])
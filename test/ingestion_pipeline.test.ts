@@ -0,0 +1,60 @@
+/*
+Copyright 2024 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+SPDX-License-Identifier: Apache-2.0
+*/
+import * as cdk from 'aws-cdk-lib';
+import * as lambda from 'aws-cdk-lib/aws-lambda';
+import * as stepfn from 'aws-cdk-lib/aws-stepfunctions';
+import { Template } from 'aws-cdk-lib/assertions';
+import {
+    VECTOR_STORE_MAINTENANCE_FLAGS,
+    vectorStoreMaintenanceStates,
+} from '../lib/infra/ingestion/pipeline';
+
+// Definition of the state machine of a stack, with its tokens replaced by placeholders
+function stateMachineDefinition(stack: cdk.Stack) {
+    const stateMachines = Template.fromStack(stack).findResources(
+        'AWS::StepFunctions::StateMachine'
+    );
+    const definition = Object.values(stateMachines)[0].Properties.DefinitionString;
+    const parts: unknown[] =
+        typeof definition === 'string' ? [definition] : definition['Fn::Join'][1];
+    return JSON.parse(
+        parts.map((part) => (typeof part === 'string' ? part : 'TOKEN')).join('')
+    );
+}
+
+test('vector-store-maintenance-request', () => {
+    // The maintenance request is the execution input, which carries the model_ref_key of
+    // the ingestion when it has one, with the maintenance flags set over it
+
+    const stack = new cdk.Stack();
+    const maintenanceFunction = lambda.Function.fromFunctionArn(
+        stack,
+        'MaintenanceFunction',
+        'arn:aws:lambda:us-east-1:123456789012:function:maintenance'
+    );
+    const { prepareTask, maintenanceTask } = vectorStoreMaintenanceStates(
+        stack,
+        maintenanceFunction
+    );
+    new stepfn.StateMachine(stack, 'StateMachine', {
+        definitionBody: stepfn.DefinitionBody.fromChainable(
+            prepareTask.next(maintenanceTask)
+        ),
+    });
+
+    const states = stateMachineDefinition(stack).States;
+    const request: string =
+        states['Prepare vector store maintenance'].Parameters['request.$'];
+    const match = request.match(
+        /^States\.JsonMerge\(\$\$\.Execution\.Input, States\.StringToJson\('(.*)'\), false\)$/
+    );
+    expect(match).not.toBeNull();
+    const flags = (match?.[1] ?? '').replace(/\\([{}])/g, '$1');
+    expect(JSON.parse(flags)).toStrictEqual(VECTOR_STORE_MAINTENANCE_FLAGS);
+
+    expect(states['Vector store maintenance task'].Parameters['Payload.$']).toBe(
+        '$.maintenance.request'
+    );
+});
@@ -0,0 +1,116 @@
+"""Benchmark of the PDF chunker of the ingestion pipeline on synthetic documents.
+
+Measures the time of `chunk_document` for increasing page counts, which should
+grow linearly, and optionally compares it with the previous page lookup, which
+searched every line in the text of every page.
+
+Requires the dependencies of the embeddings function of the ingestion pipeline;
+the upload of the chunk mapping to S3 is skipped.
+
+Usage:
+    python tools/benchmarks/chunking_benchmark.py [--pages 125 250 500 1000] [--lines-per-page 40] [--pages-per-header 2] \
+        [--repeat 3] [--previous-lookup]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lib", "backend", "layers", "toolkit-layer", "python"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lib", "backend", "ingestion", "embeddings"))
+
+import process_pdf  # noqa: E402
+
+
+class _NoUpload:
+    def upload_file(self, *args, **kwargs):
+        pass
+
+
+def make_document_holder(pages, lines_per_page, pages_per_header=2):
+    """Items of each page, as built by process_document."""
+    rng = random.Random(0)
+    words = "assessment evidence criteria learner unit outcome portfolio grade review standard".split()
+    document_holder = {}
+    for page in range(pages):
+        items = []
+        if page % 25 == 0:
+            items.append(f"<titles><<title>><title>Part {page // 25 + 1}</title><</title>>")
+        if pages_per_header and page % pages_per_header == 0:
+            items.append(f"<headers><<header>><header>Section {page + 1}</header><</header>>")
+        for _ in range(lines_per_page):
+            items.append(" ".join(rng.choice(words) for _ in range(rng.randint(4, 16))))
+        if page % 5 == 0:
+            list_items = "\n".join(" ".join(rng.choice(words) for _ in range(6)) for _ in range(5))
+            items.append(f"<<list>><list>{list_items}</list><</list>>")
+        if page % 10 == 0:
+            rows = [["Unit", "Criteria", "Grade"]] + [[f"U{row}", f"AC {row}.{page}", rng.choice("PMD")] for row in range(20)]
+            items.append(process_pdf.table_layout_item(process_pdf.table_to_markdown(rows)))
+        document_holder[page] = items
+    return document_holder
+
+
+def previous_page_lookup(header_split, page_mapping):
+    """Page lookup of each line made by the previous chunk_document."""
+
+    def find_page_number(content):
+        for page_num, page_content in page_mapping.items():
+            if content in page_content:
+                return page_num
+        return None
+
+    for items in header_split:
+        for item in items.split("<headers>"):
+            for line in process_pdf.sub_header_content_splitter(item):
+                if line.strip():
+                    find_page_number(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[125, 250, 500, 1000])
+    parser.add_argument("--lines-per-page", type=int, default=40)
+    parser.add_argument("--pages-per-header", type=int, default=2, help="0 for a single section per title")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--previous-lookup", action="store_true", help="Also time the previous page lookup")
+    args = parser.parse_args()
+
+    process_pdf.s3 = _NoUpload()
+
+    header = f"{'pages':>6} {'items':>7} {'chunking (s)':>13} {'per page (ms)':>14}"
+    print(header + (f" {'previous (s)':>13}" if args.previous_lookup else ""))
+
+    for pages in args.pages:
+        document_holder = make_document_holder(pages, args.lines_per_page, args.pages_per_header)
+        header_split, page_offsets = process_pdf.flatten_pages(document_holder)
+
+        chunking_time = min(
+            timeit.repeat(
+                lambda header_split=header_split, page_offsets=page_offsets: process_pdf.chunk_document(
+                    header_split, "chunking_benchmark.pdf", "bucket", page_offsets
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        items = sum(len(items) for items in document_holder.values())
+        row = f"{pages:>6} {items:>7} {chunking_time:>13.3f} {chunking_time / pages * 1000:>14.3f}"
+
+        if args.previous_lookup:
+            page_mapping = {page + 1: "\n".join(page_items) for page, page_items in document_holder.items()}
+            lookup_time = min(
+                timeit.repeat(
+                    lambda header_split=header_split, page_mapping=page_mapping: previous_page_lookup(header_split, page_mapping),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            row += f" {chunking_time + lookup_time:>13.3f}"
+
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
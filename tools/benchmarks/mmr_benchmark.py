@@ -0,0 +1,85 @@
+"""Micro-benchmark of the maximal marginal relevance selection used by PGVector.
+
+Compares the incremental NumPy implementation of the toolkit layer with the
+previous implementation, which recomputed the similarity to the whole selected
+set and scanned the candidates in Python at every step.
+
+Usage:
+    python tools/benchmarks/mmr_benchmark.py [--dimensions 1024] [--k 10] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), "..", "..", "lib", "backend", "layers", "toolkit-layer", "python"),
+)
+
+from francis_toolkit.pgvector._utils import cosine_similarity, maximal_marginal_relevance  # noqa: E402
+
+FETCH_K_VALUES = [20, 100, 500]
+
+
+def previous_maximal_marginal_relevance(query_embedding, embedding_list, lambda_mult=0.5, k=4):
+    if min(k, len(embedding_list)) <= 0:
+        return []
+    if query_embedding.ndim == 1:
+        query_embedding = np.expand_dims(query_embedding, axis=0)
+    similarity_to_query = cosine_similarity(query_embedding, embedding_list)[0]
+    most_similar = int(np.argmax(similarity_to_query))
+    idxs = [most_similar]
+    selected = np.array([embedding_list[most_similar]])
+    while len(idxs) < min(k, len(embedding_list)):
+        best_score = -np.inf
+        idx_to_add = -1
+        similarity_to_selected = cosine_similarity(embedding_list, selected)
+        for i, query_score in enumerate(similarity_to_query):
+            if i in idxs:
+                continue
+            redundant_score = max(similarity_to_selected[i])
+            equation_score = lambda_mult * query_score - (1 - lambda_mult) * redundant_score
+            if equation_score > best_score:
+                best_score = equation_score
+                idx_to_add = i
+        idxs.append(idx_to_add)
+        selected = np.append(selected, [embedding_list[idx_to_add]], axis=0)
+    return idxs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dimensions", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'fetch_k':>8} {'previous (ms)':>14} {'incremental (ms)':>17} {'speedup':>8} {'same selection':>15}")
+
+    for fetch_k in FETCH_K_VALUES:
+        query = rng.standard_normal(args.dimensions).astype(np.float32)
+        embeddings = rng.standard_normal((fetch_k, args.dimensions)).astype(np.float32)
+
+        previous_time = timeit.timeit(
+            lambda query=query, embeddings=embeddings: previous_maximal_marginal_relevance(query, embeddings, k=args.k),
+            number=args.repeat,
+        )
+        incremental_time = timeit.timeit(
+            lambda query=query, embeddings=embeddings: maximal_marginal_relevance(query, embeddings, k=args.k), number=args.repeat
+        )
+        same_selection = previous_maximal_marginal_relevance(query, embeddings, k=args.k) == maximal_marginal_relevance(
+            query, embeddings, k=args.k
+        )
+
+        print(
+            f"{fetch_k:>8} {previous_time / args.repeat * 1000:>14.2f} {incremental_time / args.repeat * 1000:>17.2f} "
+            f"{previous_time / incremental_time:>7.1f}x {str(same_selection):>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()